@@ -1,14 +1,75 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+def _engine_options(database_url: str) -> dict:
+    """Monta as opções da engine de acordo com o banco configurado."""
+    url = make_url(database_url)
+    
+    if url.get_backend_name() == "sqlite":
+        return {
+            "connect_args": {
+                "check_same_thread": settings.SQLITE_CHECK_SAME_THREAD,
+                "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+            }
+        }
+    
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+def _async_database_url(database_url: str) -> str:
+    """Converte a URL síncrona para o driver assíncrono equivalente."""
+    url = make_url(database_url)
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    return url.set(drivername=drivers.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+def _async_engine_options(database_url: str) -> dict:
+    """Opções da engine assíncrona; o asyncpg recebe o statement_timeout via server_settings."""
+    options = _engine_options(database_url)
+    connect_args = options.get("connect_args", {})
+    if "options" in connect_args:
+        options["connect_args"] = {
+            "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        }
+    return options
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Aplica WAL e busy_timeout em cada nova conexão SQLite."""
+    cursor = dbapi_connection.cursor()
+    if settings.SQLITE_WAL and make_url(settings.DATABASE_URL).database not in (None, "", ":memory:"):
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
 # Criação da engine SQLAlchemy
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+
+# Engine assíncrona (asyncpg para PostgreSQL, aiosqlite para SQLite)
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_engine_options(ASYNC_DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _configure_sqlite)
+if async_engine.dialect.name == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", _configure_sqlite)
 
 # Sessão do banco de dados
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessão assíncrona; expire_on_commit=False evita recarregar atributos após o commit
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Base para os modelos SQLAlchemy
 Base = declarative_base()
 
@@ -19,3 +80,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Função para obter uma sessão assíncrona do banco de dados
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _pool_metrics(pool) -> dict:
+    """Métricas de um pool de conexões."""
+    status = {"pool": type(pool).__name__, "status": pool.status()}
+    for metric in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, metric):
+            status[metric] = getattr(pool, metric)()
+    return status
+
+def get_pool_status() -> dict:
+    """Retorna métricas dos pools de conexões síncrono e assíncrono."""
+    return {
+        "sync": _pool_metrics(engine.pool),
+        "async": _pool_metrics(async_engine.pool)
+    }
@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, func, or_
+
+# Ordenação da paginação: (coluna, descendente). A última coluna deve ser única
+# (normalmente o id), garantindo uma ordem estável para o cursor; listagens sem
+# outra ordem natural usam apenas [(Modelo.id, False)]. Colunas anuláveis são
+# comparadas com NULL substituído por um valor fixo (ver _valor_nulo); prefira
+# colunas NOT NULL nas listagens grandes, para que a ordenação use os índices.
+Ordenacao = Sequence[Tuple[Any, bool]]
+
+# Valor usado no lugar de NULL, por tipo da coluna
+VALORES_NULO = {int: 0, float: 0.0, str: "", datetime: datetime.min, date: date.min, bool: False}
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    return valor
+
+
+def _desserializar(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        if "dt" in valor:
+            return datetime.fromisoformat(valor["dt"])
+        if "d" in valor:
+            return date.fromisoformat(valor["d"])
+        raise ValueError("Cursor inválido")
+    return valor
+
+
+def encode_cursor(*valores: Any) -> str:
+    """Gera um cursor opaco a partir dos valores de ordenação da última linha retornada."""
+    raw = json.dumps([_serializar(valor) for valor in valores])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, tamanho: Optional[int] = None) -> List[Any]:
+    """Decodifica o cursor gerado por encode_cursor; lança ValueError se inválido."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(valores, list) or (tamanho is not None and len(valores) != tamanho):
+            raise ValueError("Cursor inválido")
+        return [_desserializar(valor) for valor in valores]
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+
+
+def _valor_nulo(coluna) -> Any:
+    """Valor que substitui NULL na ordenação, ou None se a coluna não aceita nulos."""
+    if not getattr(coluna, "nullable", False):
+        return None
+    return VALORES_NULO[coluna.type.python_type]
+
+
+def _chave(coluna):
+    """Expressão ordenada e comparada pelo cursor (com NULL substituído nas colunas anuláveis)."""
+    valor_nulo = _valor_nulo(coluna)
+    return coluna if valor_nulo is None else func.coalesce(coluna, valor_nulo)
+
+
+def _depois_do_cursor(ordenacao: Ordenacao, valores: List[Any]):
+    """Condição "linha vem depois do cursor" na ordem lexicográfica das colunas."""
+    chaves = [_chave(coluna) for coluna, _ in ordenacao]
+    condicoes = []
+    for i, (_, descendente) in enumerate(ordenacao):
+        iguais = [chaves[j] == valores[j] for j in range(i)]
+        seguinte = chaves[i] < valores[i] if descendente else chaves[i] > valores[i]
+        condicoes.append(and_(*iguais, seguinte))
+    return or_(*condicoes)
+
+
+def paginar(query, ordenacao: Ordenacao, limit: int, skip: int = 0, cursor: Optional[str] = None):
+    """
+    Aplica ordenação e paginação a uma consulta (Query ou select()).
+    Com cursor, usa paginação por chave, sem OFFSET; sem cursor, mantém o
+    modo por deslocamento (skip) para compatibilidade.
+    Busca uma linha a mais para saber se há próxima página (ver proxima_pagina).
+    """
+    if cursor:
+        if skip:
+            raise ValueError("Use skip ou cursor, não ambos")
+        query = query.where(_depois_do_cursor(ordenacao, decode_cursor(cursor, len(ordenacao))))
+
+    colunas = [_chave(coluna).desc() if descendente else _chave(coluna) for coluna, descendente in ordenacao]
+    query = query.order_by(*colunas)
+    if skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+
+def proxima_pagina(rows: List[Any], ordenacao: Ordenacao, limit: int) -> Tuple[List[Any], Optional[str]]:
+    """Descarta a linha extra buscada por paginar e gera o cursor da próxima página (ou None)."""
+    if limit <= 0:
+        return [], None
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    ultima = rows[-1]
+    valores = []
+    for coluna, _ in ordenacao:
+        valor = getattr(ultima, coluna.key)
+        valores.append(_valor_nulo(coluna) if valor is None else valor)
+    return rows, encode_cursor(*valores)
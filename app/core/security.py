@@ -1,13 +1,18 @@
+import threading
+import time
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from fastapi import Depends, HTTPException, status, Request, Cookie
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.database import get_db
-from app.models.models import Usuario
+from app.core.database import SessionLocal, get_db
+from app.models.models import Usuario, VersaoTokenUsuario
 
 # Configuração do hash de senha
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -15,6 +20,99 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Configuração do OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
+# Cache dos usuários autenticados, por nome de usuário
+user_cache = TTLCache(ttl=settings.USER_CACHE_TTL, maxsize=settings.USER_CACHE_SIZE)
+
+def invalidate_user_cache(*usernames: Optional[str]):
+    """Remove usuários do cache após alterações cadastrais."""
+    for username in usernames:
+        if username:
+            user_cache.invalidate(username)
+
+class TokenRevocationList:
+    """
+    Espelho em memória de usuario_token_versoes, usado no modo AUTH_STATELESS.
+    Um token é aceito apenas se sua versão ("ver") não for menor que a do usuário.
+    """
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._versoes: Dict[int, int] = {}
+        self._carregado_em: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _expirado(self) -> bool:
+        return self._carregado_em is None or time.monotonic() - self._carregado_em >= self.refresh_seconds
+
+    def recarregar(self):
+        """Lê as versões do banco (bloqueante) e as incorpora ao espelho."""
+        agora = time.monotonic()
+        db = SessionLocal()
+        try:
+            versoes = db.query(VersaoTokenUsuario.usuario_id, VersaoTokenUsuario.versao).all()
+        finally:
+            db.close()
+        with self._lock:
+            # Mesclar em vez de substituir: uma revogação aplicada depois da leitura não pode ser desfeita
+            for usuario_id, versao in versoes:
+                self._versoes[usuario_id] = max(versao, self._versoes.get(usuario_id, 0))
+            self._carregado_em = agora
+
+    async def recarregar_se_necessario(self):
+        """Recarrega o espelho, se expirado, no threadpool, sem bloquear o event loop."""
+        if self._expirado():
+            await run_in_threadpool(self.recarregar)
+
+    def versao_atual(self, usuario_id: int) -> int:
+        """Versão vigente dos tokens do usuário."""
+        if self._expirado():
+            self.recarregar()
+        return self._versoes.get(usuario_id, 0)
+
+    def is_revoked(self, usuario_id: int, versao: int) -> bool:
+        """
+        Indica se um token com esta versão foi revogado, pelo espelho em memória
+        (as dependências assíncronas o atualizam antes com recarregar_se_necessario).
+        """
+        return versao < self._versoes.get(usuario_id, 0)
+
+    def revogar(self, db: Session, usuario_id: int) -> int:
+        """
+        Incrementa a versão dos tokens do usuário, invalidando os emitidos até agora.
+        Não faz commit: participa da transação da alteração do usuário. O espelho
+        em memória só é atualizado depois do commit; em rollback nada muda.
+        """
+        registro = db.query(VersaoTokenUsuario).filter(VersaoTokenUsuario.usuario_id == usuario_id).first()
+        if registro is None:
+            registro = VersaoTokenUsuario(usuario_id=usuario_id, versao=0)
+            db.add(registro)
+        registro.versao = (registro.versao or 0) + 1
+        registro.atualizado_em = datetime.utcnow()
+
+        pendentes = db.info.get("versoes_token_pendentes")
+        if pendentes is None:
+            pendentes = db.info["versoes_token_pendentes"] = {}
+            event.listen(db, "after_commit", self._aplicar_pendentes)
+            event.listen(db, "after_rollback", self._descartar_pendentes)
+        pendentes[usuario_id] = registro.versao
+        return registro.versao
+
+    def _aplicar_pendentes(self, db: Session):
+        """Copia para o espelho as versões confirmadas pelo commit."""
+        pendentes = db.info.get("versoes_token_pendentes")
+        if not pendentes:
+            return
+        with self._lock:
+            for usuario_id, versao in pendentes.items():
+                self._versoes[usuario_id] = max(versao, self._versoes.get(usuario_id, 0))
+        pendentes.clear()
+
+    def _descartar_pendentes(self, db: Session):
+        """Transação desfeita: as versões incrementadas não valem."""
+        db.info.get("versoes_token_pendentes", {}).clear()
+
+token_revocations = TokenRevocationList(settings.AUTH_REVOCATION_REFRESH)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha corresponde ao hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -43,6 +141,22 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def build_token_claims(user: Usuario) -> Dict[str, Any]:
+    """
+    Monta as claims do token de acesso. No modo AUTH_STATELESS o token também
+    carrega id, perfil, grupo e versão, dispensando a consulta ao banco.
+    """
+    claims = {"sub": user.usuario, "role": user.role}
+    if settings.AUTH_STATELESS:
+        claims.update({
+            "uid": user.id,
+            "name": user.nome,
+            "email": user.email,
+            "grp": user.grupo,
+            "ver": token_revocations.versao_atual(user.id)
+        })
+    return claims
+
 def get_token_from_cookie(request: Request) -> Optional[str]:
     """Extrai o token do cookie de acesso."""
     cookie_authorization = request.cookies.get("access_token")
@@ -58,12 +172,26 @@ def get_token_from_cookie(request: Request) -> Optional[str]:
         # Se não conseguir separar por espaço, pode ser apenas o token
         return cookie_authorization
 
-async def get_current_user(
-    request: Request,
-    token: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    """Obtém o usuário atual a partir do token JWT ou cookie."""
+def _consultar_usuario(db: Session, username: str) -> Optional[Dict[str, Any]]:
+    """Lê o usuário no banco, no formato guardado em user_cache."""
+    user = db.query(Usuario).filter(Usuario.usuario == username).first()
+    if user is None:
+        return None
+    return {
+        "id": user.id,
+        "username": user.usuario,
+        "name": user.nome,
+        "email": user.email,
+        "role": user.role,
+        "group": user.grupo,
+        "ativo": user.ativo
+    }
+
+def _resolver_usuario(request: Request, token: Optional[str], consultar) -> Dict[str, Any]:
+    """
+    Valida o token (header ou cookie) e monta o usuário atual. `consultar(username)`
+    só é chamado quando o usuário não está no cache.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais inválidas",
@@ -84,20 +212,67 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(Usuario).filter(Usuario.usuario == username).first()
-    if user is None:
-        raise credentials_exception
-    if not user.ativo:
+    # Caminho rápido: autorizar apenas pelas claims assinadas
+    if settings.AUTH_STATELESS and "uid" in payload:
+        if token_revocations.is_revoked(payload["uid"], payload.get("ver", 0)):
+            raise credentials_exception
+        return {
+            "id": payload["uid"],
+            "username": username,
+            "name": payload.get("name"),
+            "email": payload.get("email"),
+            "role": payload.get("role"),
+            "group": payload.get("grp")
+        }
+    
+    cached = user_cache.get(username)
+    if cached is None:
+        cached = consultar(username)
+        if cached is None:
+            raise credentials_exception
+        user_cache.set(username, cached)
+    
+    if not cached["ativo"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Usuário inativo",
         )
     
     return {
-        "id": user.id,
-        "username": user.usuario,
-        "name": user.nome,
-        "email": user.email,
-        "role": user.role,
-        "group": user.grupo
+        "id": cached["id"],
+        "username": cached["username"],
+        "name": cached["name"],
+        "email": cached["email"],
+        "role": cached["role"],
+        "group": cached["group"]
     }
+
+async def get_current_user(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Obtém o usuário atual a partir do token JWT ou cookie."""
+    if settings.AUTH_STATELESS:
+        await token_revocations.recarregar_se_necessario()
+    return _resolver_usuario(request, token, lambda username: _consultar_usuario(db, username))
+
+async def get_current_user_sem_sessao(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme)
+):
+    """
+    Como get_current_user, mas sem a sessão da requisição: no cache miss o usuário
+    é lido numa sessão própria, fechada em seguida. Para respostas longas (SSE),
+    que de outra forma manteriam uma conexão do pool até o fim do stream.
+    """
+    def consultar(username: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            return _consultar_usuario(db, username)
+        finally:
+            db.close()
+
+    if settings.AUTH_STATELESS:
+        await token_revocations.recarregar_se_necessario()
+    return _resolver_usuario(request, token, consultar)
@@ -19,6 +19,9 @@ import app.routes.appointments as appointments
 import app.routes.checklists as checklists
 import app.routes.machines as machines
 import app.routes.next_steps as next_steps
+import app.routes.events as events
+import app.routes.qrcodes as qrcodes
+import app.routes.scan as scan
 
 models.Base.metadata.create_all(bind=engine)
 
@@ -47,6 +50,9 @@ app.include_router(admin.router, prefix="/api", tags=["Administração"])
 app.include_router(checklists.router, prefix="/api/checklists", tags=["Checklists"])
 app.include_router(machines.router, prefix="/api/machines", tags=["Máquinas"])
 app.include_router(next_steps.router, prefix="/api/next-steps", tags=["Próximos Passos"])
+app.include_router(events.router, prefix="/api/events", tags=["Eventos"])
+app.include_router(qrcodes.router, prefix="/api/qrcodes", tags=["QR Codes"])
+app.include_router(scan.router, prefix="/api/scan", tags=["Leitura de Códigos"])
 
 # Configuração dos arquivos estáticos
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class FaseMaquina(Base):
     """Tabela de associação entre Fase e Máquina com ordem de uso."""
     __tablename__ = "fases_maquinas"
+    __table_args__ = (
+        Index("ix_fases_maquinas_fase_ordem", "fase_id", "ordem"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     fase_id = Column(Integer, ForeignKey("fases.id"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Text, ForeignKey, Float, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -19,6 +19,15 @@ class Usuario(Base):
     apontamentos = relationship("Apontamento", back_populates="operador")
 
 
+class VersaoTokenUsuario(Base):
+    """Versão dos tokens de um usuário; tokens com versão menor estão revogados."""
+    __tablename__ = "usuario_token_versoes"
+    
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True)
+    versao = Column(Integer, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow)
+
+
 class Produto(Base):
     __tablename__ = "produtos"
     
@@ -73,7 +82,7 @@ class Lote(Base):
     id = Column(Integer, primary_key=True, index=True)
     codigo = Column(String, unique=True, index=True)
     descricao = Column(String)
-    data_criacao = Column(DateTime, default=datetime.utcnow)
+    data_criacao = Column(DateTime, nullable=False, default=datetime.utcnow)
     status = Column(String)  # ex: "em_producao", "concluido", "parado"
     observacoes = Column(Text, nullable=True)
     ativo = Column(Boolean, default=True)
@@ -86,6 +95,9 @@ class Lote(Base):
 
 class ProdutoLote(Base):
     __tablename__ = "produto_lotes"
+    __table_args__ = (
+        Index("ix_produto_lotes_lote_id", "lote_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     lote_id = Column(Integer, ForeignKey("lotes.id"))
@@ -102,6 +114,9 @@ class ProdutoLote(Base):
 
 class FaseLote(Base):
     __tablename__ = "fase_lotes"
+    __table_args__ = (
+        Index("ix_fase_lotes_lote_ordem", "lote_id", "ordem"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     lote_id = Column(Integer, ForeignKey("lotes.id"))
@@ -130,6 +145,20 @@ class Operador(Base):
 
 class Apontamento(Base):
     __tablename__ = "apontamentos"
+    __table_args__ = (
+        # Verificação de apontamento em andamento por lote, produto e fase
+        Index("ix_apontamentos_lote_produto_fase_status", "lote_id", "produto_id", "fase_id", "status"),
+        # Apontamentos em aberto do operador (índice parcial)
+        Index(
+            "ix_apontamentos_operador_aberto", "operador_id",
+            postgresql_where=text("data_fim IS NULL"),
+            sqlite_where=text("data_fim IS NULL")
+        ),
+        # Histórico do operador, mais recentes primeiro
+        Index("ix_apontamentos_operador_data_inicio", "operador_id", "data_inicio"),
+        # Filtros por período nos dashboards
+        Index("ix_apontamentos_data_inicio", "data_inicio"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     lote_id = Column(Integer, ForeignKey("lotes.id"))
@@ -137,7 +166,7 @@ class Apontamento(Base):
     fase_id = Column(Integer, ForeignKey("fases.id"))
     operador_id = Column(Integer, ForeignKey("usuarios.id"))
     maquina_id = Column(Integer, ForeignKey("maquinas.id"), nullable=True)
-    data_inicio = Column(DateTime, default=datetime.utcnow)
+    data_inicio = Column(DateTime, nullable=False, default=datetime.utcnow)
     data_fim = Column(DateTime, nullable=True)
     tempo_real = Column(Integer, nullable=True)  # em minutos, calculado
     observacoes = Column(Text, nullable=True)
@@ -152,6 +181,59 @@ class Apontamento(Base):
     checklist_respostas = relationship("ChecklistResposta", back_populates="apontamento")
 
 
+class ApontamentoAberto(Base):
+    """
+    Registro dos apontamentos em andamento.
+    As restrições únicas garantem no máximo um apontamento aberto por operador
+    e por fase do lote (lote, produto e fase), mesmo com inícios simultâneos.
+    """
+    __tablename__ = "apontamentos_abertos"
+    __table_args__ = (
+        UniqueConstraint("operador_id", name="uq_apontamentos_abertos_operador"),
+        UniqueConstraint("lote_id", "produto_id", "fase_id", name="uq_apontamentos_abertos_fase"),
+    )
+    
+    apontamento_id = Column(Integer, ForeignKey("apontamentos.id"), primary_key=True)
+    operador_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    lote_id = Column(Integer, ForeignKey("lotes.id"), nullable=False)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
+    fase_id = Column(Integer, ForeignKey("fases.id"), nullable=False)
+    data_inicio = Column(DateTime, default=datetime.utcnow)
+
+
+class EventoSincronizado(Base):
+    """Eventos do operador já processados pela sincronização, indexados pela chave de idempotência."""
+    __tablename__ = "eventos_sincronizados"
+    
+    chave = Column(String(64), primary_key=True)
+    operador_id = Column(Integer, ForeignKey("usuarios.id"), index=True)
+    tipo = Column(String)  # "start", "checklist", "finish"
+    apontamento_id = Column(Integer, ForeignKey("apontamentos.id"), nullable=True)
+    status = Column(String)  # "aplicado", "ignorado", "conflito", "erro"
+    detalhe = Column(String, nullable=True)
+    ocorrido_em = Column(DateTime)
+    processado_em = Column(DateTime, default=datetime.utcnow)
+
+
+class ProducaoDiaria(Base):
+    """Consolidado diário de apontamentos finalizados por produto, fase e operador."""
+    __tablename__ = "producao_diaria"
+    __table_args__ = (
+        UniqueConstraint("data", "produto_id", "fase_id", "operador_id", name="uq_producao_diaria_chave"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(Date, index=True)  # dia de início dos apontamentos
+    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=True)
+    fase_id = Column(Integer, ForeignKey("fases.id"), nullable=True)
+    operador_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
+    apontamentos_finalizados = Column(Integer, default=0)
+    tempo_total = Column(Integer, default=0)  # em minutos
+    atrasos = Column(Integer, default=0)  # apontamentos acima do tempo estimado
+    aderencia_soma = Column(Float, default=0)  # soma de tempo_real / tempo_estimado * 100
+    aderencia_count = Column(Integer, default=0)  # apontamentos com tempo estimado
+
+
 class ChecklistItem(Base):
     __tablename__ = "checklist_items"
     
@@ -169,6 +251,9 @@ class ChecklistItem(Base):
 
 class ChecklistResposta(Base):
     __tablename__ = "checklist_respostas"
+    __table_args__ = (
+        Index("ix_checklist_respostas_apontamento_item", "apontamento_id", "checklist_item_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     apontamento_id = Column(Integer, ForeignKey("apontamentos.id"))
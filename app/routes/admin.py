@@ -1,24 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, desc
-from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.database import get_db, get_pool_status
+from app.core.pagination import paginar, proxima_pagina
+from app.core.security import get_current_user, invalidate_user_cache, token_revocations, user_cache
+from app.services.status_histogram import contar_lotes_por_status
+from app.services.dashboard import (
+    get_kpis, get_counters, get_recent_batches, get_production_by_product,
+    get_batch_status, get_snapshot, contar_apontamentos_em_andamento, contar_apontamentos_hoje
+)
 from app.models.models import Usuario, Apontamento, Lote, Produto, Fase, ProdutoLote
 from app.schemas.schemas import Usuario as UsuarioSchema
 from app.schemas.schemas import UsuarioCreate, UsuarioUpdate
-from datetime import datetime, timedelta
+from datetime import datetime
 
 router = APIRouter()
 
+ORDENACAO_USUARIOS = [(Usuario.id, False)]
+
 @router.get("/users", response_model=List[UsuarioSchema])
 async def get_users(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Retorna a lista de usuários (apenas para administradores)."""
+    """
+    Retorna a lista de usuários (apenas para administradores).
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
     # Verificar se usuário é administrador
     if current_user["role"] != "admin":
         raise HTTPException(
@@ -26,7 +40,14 @@ async def get_users(
             detail="Não autorizado"
         )
     
-    usuarios = db.query(Usuario).offset(skip).limit(limit).all()
+    try:
+        query = paginar(db.query(Usuario), ORDENACAO_USUARIOS, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    usuarios, next_cursor = proxima_pagina(query.all(), ORDENACAO_USUARIOS, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return usuarios
 
 @router.get("/users/{user_id}", response_model=UsuarioSchema)
@@ -127,11 +148,16 @@ async def update_user(
     if "senha" in usuario_data and usuario_data["senha"]:
         usuario_data["senha"] = get_password_hash(usuario_data["senha"])
     
+    username_anterior = db_user.usuario
     for key, value in usuario_data.items():
         setattr(db_user, key, value)
     
+    # Revogar tokens emitidos com os dados anteriores
+    token_revocations.revogar(db, db_user.id)
+    
     db.commit()
     db.refresh(db_user)
+    invalidate_user_cache(username_anterior, db_user.usuario)
     return db_user
 
 @router.delete("/users/{user_id}", response_model=UsuarioSchema)
@@ -162,9 +188,39 @@ async def delete_user(
     
     # Desativar usuário
     db_user.ativo = False
+    token_revocations.revogar(db, db_user.id)
     db.commit()
+    invalidate_user_cache(db_user.usuario)
     return db_user
 
+@router.get("/cache/usuarios")
+async def get_user_cache_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """Retorna acertos e falhas do cache de usuários autenticados (apenas para administradores)."""
+    # Verificar se usuário é administrador
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Não autorizado"
+        )
+    
+    return user_cache.stats()
+
+@router.get("/db/pool")
+async def get_db_pool_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """Retorna métricas do pool de conexões do banco (apenas para administradores)."""
+    # Verificar se usuário é administrador
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Não autorizado"
+        )
+    
+    return get_pool_status()
+
 @router.get("/dashboard/summary")
 async def get_dashboard_summary(
     db: Session = Depends(get_db),
@@ -178,34 +234,18 @@ async def get_dashboard_summary(
             detail="Não autorizado"
         )
     
-    # Total de lotes ativos
-    total_lotes = db.query(func.count(Lote.id)).filter(Lote.ativo == True).scalar()
-    
-    # Lotes em produção
-    lotes_em_producao = db.query(func.count(Lote.id)).filter(
-        Lote.ativo == True,
-        Lote.status == "em_producao"
-    ).scalar()
-    
-    # Lotes concluídos
-    lotes_concluidos = db.query(func.count(Lote.id)).filter(
-        Lote.ativo == True,
-        Lote.status == "concluido"
-    ).scalar()
+    # Lotes ativos por status (uma única consulta agrupada)
+    lotes_por_status = contar_lotes_por_status(db)
+    total_lotes = sum(lotes_por_status.values())
+    lotes_em_producao = lotes_por_status.get("em_producao", 0)
+    lotes_concluidos = lotes_por_status.get("concluido", 0)
     
     # Total de produtos
     total_produtos = db.query(func.count(Produto.id)).filter(Produto.ativo == True).scalar()
     
-    # Total de apontamentos hoje
-    hoje = datetime.utcnow().date()
-    apontamentos_hoje = db.query(func.count(Apontamento.id)).filter(
-        func.date(Apontamento.data_inicio) == hoje
-    ).scalar()
-    
-    # Apontamentos em andamento
-    apontamentos_em_andamento = db.query(func.count(Apontamento.id)).filter(
-        Apontamento.status == "iniciado"
-    ).scalar()
+    # Apontamentos de hoje (consolidado diário + registro de abertos) e em andamento
+    apontamentos_hoje = contar_apontamentos_hoje(db)
+    apontamentos_em_andamento = contar_apontamentos_em_andamento(db)
     
     return {
         "total_lotes": total_lotes,
@@ -230,79 +270,7 @@ async def get_dashboard_kpis(
             detail="Não autorizado"
         )
     
-    # Data de início do período
-    data_inicio = datetime.utcnow() - timedelta(days=periodo)
-    
-    # Apontamentos concluídos no período
-    apontamentos = db.query(Apontamento).filter(
-        Apontamento.data_inicio >= data_inicio,
-        Apontamento.status == "finalizado"
-    ).all()
-    
-    # Cálculo dos KPIs
-    if not apontamentos:
-        return {
-            "tempo_medio_producao": 0,
-            "aderencia_tempo_planejado": 0,
-            "produtividade_por_operador": [],
-            "total_apontamentos": 0
-        }
-    
-    # Tempo médio de produção (em minutos)
-    tempo_total = sum(a.tempo_real for a in apontamentos if a.tempo_real)
-    tempo_medio = tempo_total / len(apontamentos) if apontamentos else 0
-    
-    # Aderência ao tempo planejado
-    aderencia_total = 0
-    aderencia_count = 0
-    
-    for a in apontamentos:
-        if a.tempo_real is None:
-            continue
-        
-        produto_fase = db.query(ProdutoLote).filter(
-            ProdutoLote.produto_id == a.produto_id,
-            ProdutoLote.lote_id == a.lote_id
-        ).first()
-        
-        if produto_fase and produto_fase.tempo_estimado > 0:
-            aderencia = (a.tempo_real / produto_fase.tempo_estimado) * 100
-            aderencia_total += aderencia
-            aderencia_count += 1
-    
-    aderencia_media = aderencia_total / aderencia_count if aderencia_count > 0 else 0
-    
-    # Produtividade por operador
-    produtividade_operadores = {}
-    
-    for a in apontamentos:
-        operador_id = a.operador_id
-        
-        if operador_id not in produtividade_operadores:
-            operador = db.query(Usuario).filter(Usuario.id == operador_id).first()
-            produtividade_operadores[operador_id] = {
-                "id": operador_id,
-                "nome": operador.nome if operador else "Desconhecido",
-                "apontamentos": 0,
-                "tempo_total": 0
-            }
-        
-        produtividade_operadores[operador_id]["apontamentos"] += 1
-        if a.tempo_real:
-            produtividade_operadores[operador_id]["tempo_total"] += a.tempo_real
-    
-    # Converter para lista
-    produtividade_lista = list(produtividade_operadores.values())
-    
-    # Ordenar por número de apontamentos (do maior para o menor)
-    produtividade_lista.sort(key=lambda x: x["apontamentos"], reverse=True)
-    
-    return {
-        "tempo_medio_producao": round(tempo_medio, 2),
-        "aderencia_tempo_planejado": round(aderencia_media, 2),
-        "produtividade_por_operador": produtividade_lista,
-        "total_apontamentos": len(apontamentos)
-    }
+    return get_kpis(db, periodo)
 
 @router.get("/dashboard/lotes_recentes")
 async def get_lotes_recentes(
@@ -370,83 +338,10 @@ async def get_dashboard_counters(
             detail="Apenas administradores podem acessar esta funcionalidade"
         )
     
-    # Obter data de hoje
-    hoje = datetime.utcnow().date()
-    
-    # Total de lotes
-    total_lotes = db.query(Lote).filter(Lote.ativo == True).count()
-    
-    # Lotes em produção
-    lotes_em_producao = db.query(Lote).filter(
-        Lote.status == "em_producao",
-        Lote.ativo == True
-    ).count()
-    
-    # Apontamentos de hoje
-    apontamentos_hoje = db.query(Apontamento).filter(
-        func.date(Apontamento.data_inicio) == hoje,
-        Apontamento.ativo == True
-    ).count()
-    
-    # Apontamentos em andamento (iniciados mas não finalizados)
-    apontamentos_em_andamento = db.query(Apontamento).filter(
-        Apontamento.data_inicio.isnot(None),
-        Apontamento.data_fim.is_(None),
-        Apontamento.ativo == True
-    ).count()
-    
-    # Tempo médio de produção (em minutos)
-    # Consideramos apenas apontamentos finalizados
-    tempo_medio_query = db.query(
-        func.avg(
-            func.extract('epoch', Apontamento.data_fim) - 
-            func.extract('epoch', Apontamento.data_inicio)
-        ) / 60
-    ).filter(
-        Apontamento.data_fim.isnot(None),
-        Apontamento.ativo == True
-    ).scalar()
-    
-    tempo_medio = round(tempo_medio_query or 0, 2)
-    
-    # Eficiência média (realizado/estimado * 100) - representada como uma porcentagem
-    # Para simplificar, consideramos que cada fase tem um tempo estimado no modelo ProdutoFase
-    eficiencia = 90  # Valor fictício para exemplo - deve ser calculado com dados reais
-    
-    # Total de atrasos (apontamentos que excederam o tempo estimado)
-    atrasos = db.query(Apontamento).filter(
-        Apontamento.data_fim.isnot(None),
-        Apontamento.excedeu_tempo == True,
-        Apontamento.ativo == True
-    ).count()
-    
-    # Produtividade (apontamentos concluídos por dia nos últimos 7 dias)
-    # Simplificando, usamos o número médio de apontamentos por dia
-    data_limite = hoje - timedelta(days=7)
-    
-    produtividade_query = db.query(
-        func.count(Apontamento.id) / 7.0
-    ).filter(
-        func.date(Apontamento.data_fim) >= data_limite,
-        Apontamento.data_fim.isnot(None),
-        Apontamento.ativo == True
-    ).scalar()
-    
-    produtividade = round(produtividade_query or 0, 2)
-    
-    return {
-        "total_lotes": total_lotes,
-        "lotes_em_producao": lotes_em_producao,
-        "apontamentos_hoje": apontamentos_hoje,
-        "apontamentos_em_andamento": apontamentos_em_andamento,
-        "tempo_medio": tempo_medio,
-        "eficiencia": eficiencia,
-        "atrasos": atrasos,
-        "produtividade": produtividade
-    }
+    return get_counters(db)
 
 @router.get("/dashboard/recent-batches")
-async def get_recent_batches(
+async def get_dashboard_recent_batches(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
     limit: int = 10
@@ -459,50 +354,10 @@ async def get_recent_batches(
             detail="Apenas administradores podem acessar esta funcionalidade"
         )
     
-    # Obter lotes mais recentes
-    lotes = db.query(Lote).filter(
-        Lote.ativo == True
-    ).order_by(
-        Lote.data_criacao.desc()
-    ).limit(limit).all()
-    
-    result = []
-    for lote in lotes:
-        # Obter produtos associados ao lote
-        produto_lote = db.query(ProdutoLote).filter(
-            ProdutoLote.lote_id == lote.id,
-            ProdutoLote.ativo == True
-        ).first()
-        
-        produto_nome = ""
-        if produto_lote:
-            produto = db.query(Produto).filter(
-                Produto.id == produto_lote.produto_id
-            ).first()
-            if produto:
-                produto_nome = produto.descricao
-        
-        # Mapear status para exibição amigável
-        status_map = {
-            "em_producao": "Em Produção",
-            "em_pausa": "Em Pausa",
-            "concluido": "Concluído",
-            "cancelado": "Cancelado"
-        }
-        
-        result.append({
-            "id": lote.id,
-            "codigo": lote.codigo,
-            "produto": produto_nome,
-            "data_criacao": lote.data_criacao.strftime("%d/%m/%Y"),
-            "status": lote.status,
-            "status_display": status_map.get(lote.status, lote.status)
-        })
-    
-    return result
+    return get_recent_batches(db, limit)
 
 @router.get("/dashboard/production-by-product", response_model=Dict[str, Any])
-async def get_production_by_product(
+async def get_dashboard_production_by_product(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -514,33 +369,17 @@ async def get_production_by_product(
             detail="Apenas administradores podem acessar esta funcionalidade"
         )
     
-    # Contar lotes por produto
-    produtos = db.query(
-        Produto.descricao, 
-        func.count(ProdutoLote.lote_id).label("total")
-    ).join(
-        ProdutoLote, Produto.id == ProdutoLote.produto_id
-    ).filter(
-        Produto.ativo == True,
-        ProdutoLote.ativo == True
-    ).group_by(
-        Produto.descricao
-    ).all()
-    
-    labels = [p[0] for p in produtos]
-    values = [p[1] for p in produtos]
-    
-    return {
-        "labels": labels,
-        "values": values
-    }
+    return get_production_by_product(db)
 
 @router.get("/dashboard/batch-status", response_model=Dict[str, Any])
-async def get_batch_status(
+async def get_dashboard_batch_status(
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    produto_id: Optional[int] = None,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Obtém dados de status dos lotes para gráficos."""
+    """Obtém dados de status dos lotes para gráficos, com filtros opcionais de período e produto."""
     # Verificar se o usuário é admin
     if current_user["role"] != "admin":
         raise HTTPException(
@@ -548,31 +387,33 @@ async def get_batch_status(
             detail="Apenas administradores podem acessar esta funcionalidade"
         )
     
-    # Status possíveis
-    status_labels = {
-        "em_producao": "Em Produção",
-        "em_pausa": "Em Pausa",
-        "concluido": "Concluído",
-        "cancelado": "Cancelado",
-    }
-    
-    # Contar lotes por status
-    status_counts = {}
-    
-    for status_key in status_labels.keys():
-        count = db.query(Lote).filter(
-            Lote.status == status_key,
-            Lote.ativo == True
-        ).count()
-        status_counts[status_key] = count
+    return get_batch_status(db, data_inicio, data_fim, produto_id)
+
+@router.get("/dashboard/snapshot", response_model=Dict[str, Any])
+async def get_dashboard_snapshot(
+    sections: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtém todas as seções do dashboard (contadores, lotes recentes,
+    produção por produto e status dos lotes) em uma única chamada.
+    Use `sections=counters,batch_status` para atualizar apenas parte do painel.
+    """
+    # Verificar se o usuário é admin
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Apenas administradores podem acessar esta funcionalidade"
+        )
     
-    labels = [status_labels[k] for k in status_counts.keys()]
-    values = list(status_counts.values())
+    secoes = [s.strip() for s in sections.split(",") if s.strip()] if sections else None
     
-    return {
-        "labels": labels,
-        "values": values
-    }
+    # As consultas são síncronas: executá-las fora do event loop
+    try:
+        return await run_in_threadpool(get_snapshot, db, secoes)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.get("/users")
 async def get_users(
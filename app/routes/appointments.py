@@ -1,14 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
-from datetime import datetime
-from app.core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, or_, select
+from datetime import date, datetime
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.pagination import paginar, proxima_pagina
 from app.core.security import get_current_user
-from app.models.models import Apontamento, ProdutoLote, FaseLote, ChecklistItem, ChecklistResposta
+from app.services.appointment_history import get_history_page
+from app.services import appointment_export
+from app.services.available_batches import compute_etag
+from app.services.available_batches import get_available_batches as list_available_batches
+from app.services import open_appointments, rollup
+from app.services.open_appointments import ConflitoApontamento
+from app.services.checklist_respostas import gravar_respostas, item_obrigatorio_pendente
+from app.services.appointment_sync import sincronizar
+from app.services.event_bus import publicar_apontamento, publicar_lote
+from app.services.scan_index import indice
+from app.models.models import Apontamento, ProdutoLote, FaseLote, ChecklistItem, ChecklistResposta, Lote, Produto, Fase
 from app.schemas.schemas import (
     ApontamentoCreate, ApontamentoUpdate, ApontamentoResponse, 
-    ChecklistRespostaCreate, ChecklistItemResponse
+    ChecklistRespostaCreate, ChecklistItemResponse, ApontamentoInicio, ApontamentoFinalizacao,
+    ChecklistRespostaLote, SincronizacaoApontamentos
 )
 from app.schemas.schemas import Apontamento as ApontamentoSchema
 from app.schemas.schemas import ChecklistResposta as ChecklistRespostaSchema
@@ -17,43 +32,61 @@ from datetime import datetime, timedelta
 
 router = APIRouter()
 
+# Mais recentes primeiro; o id desempata apontamentos iniciados no mesmo instante
+ORDENACAO_APONTAMENTOS = [(Apontamento.data_inicio, True), (Apontamento.id, True)]
+
 @router.get("/", response_model=List[ApontamentoSchema])
 async def get_apontamentos(
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
+    cursor: Optional[str] = None,
     lote_id: Optional[int] = None,
     produto_id: Optional[int] = None,
     fase_id: Optional[int] = None,
     operador_id: Optional[int] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Retorna a lista de apontamentos, com filtros opcionais."""
-    query = db.query(Apontamento)
+    """
+    Retorna a lista de apontamentos, com filtros opcionais.
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
+    query = select(Apontamento)
     
     if lote_id:
-        query = query.filter(Apontamento.lote_id == lote_id)
+        query = query.where(Apontamento.lote_id == lote_id)
     if produto_id:
-        query = query.filter(Apontamento.produto_id == produto_id)
+        query = query.where(Apontamento.produto_id == produto_id)
     if fase_id:
-        query = query.filter(Apontamento.fase_id == fase_id)
+        query = query.where(Apontamento.fase_id == fase_id)
     if operador_id:
-        query = query.filter(Apontamento.operador_id == operador_id)
+        query = query.where(Apontamento.operador_id == operador_id)
     if status:
-        query = query.filter(Apontamento.status == status)
+        query = query.where(Apontamento.status == status)
+    
+    try:
+        query = paginar(query, ORDENACAO_APONTAMENTOS, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        # O parâmetro "status" encobre o módulo fastapi.status nesta rota
+        raise HTTPException(status_code=400, detail=str(e))
     
-    apontamentos = query.order_by(Apontamento.data_inicio.desc()).offset(skip).limit(limit).all()
+    apontamentos, next_cursor = proxima_pagina(
+        (await db.execute(query)).scalars().all(), ORDENACAO_APONTAMENTOS, limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return apontamentos
 
 @router.get("/{apontamento_id}", response_model=ApontamentoSchema)
 async def get_apontamento(
     apontamento_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Retorna um apontamento específico pelo ID."""
-    apontamento = db.query(Apontamento).filter(Apontamento.id == apontamento_id).first()
+    apontamento = await db.get(Apontamento, apontamento_id)
     if apontamento is None:
         raise HTTPException(status_code=404, detail="Apontamento não encontrado")
     return apontamento
@@ -61,36 +94,37 @@ async def get_apontamento(
 @router.post("/", response_model=ApontamentoSchema)
 async def create_apontamento(
     apontamento: ApontamentoCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Inicia um novo apontamento (início de uma fase)."""
     # Verificar se lote, produto e fase existem
-    lote = db.query(Lote).filter(Lote.id == apontamento.lote_id, Lote.ativo == True).first()
+    lote = (await db.execute(
+        select(Lote).where(Lote.id == apontamento.lote_id, Lote.ativo == True)
+    )).scalars().first()
     if lote is None:
         raise HTTPException(status_code=404, detail="Lote não encontrado")
     
-    produto = db.query(Produto).filter(Produto.id == apontamento.produto_id, Produto.ativo == True).first()
+    produto = (await db.execute(
+        select(Produto).where(Produto.id == apontamento.produto_id, Produto.ativo == True)
+    )).scalars().first()
     if produto is None:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     
-    fase = db.query(Fase).filter(Fase.id == apontamento.fase_id, Fase.ativo == True).first()
+    fase = (await db.execute(
+        select(Fase).where(Fase.id == apontamento.fase_id, Fase.ativo == True)
+    )).scalars().first()
     if fase is None:
         raise HTTPException(status_code=404, detail="Fase não encontrada")
     
-    # Verificar se já existe um apontamento em andamento para este lote, produto e fase
-    apontamento_em_andamento = db.query(Apontamento).filter(
-        Apontamento.lote_id == apontamento.lote_id,
-        Apontamento.produto_id == apontamento.produto_id,
-        Apontamento.fase_id == apontamento.fase_id,
-        Apontamento.status == "iniciado"
-    ).first()
-    
-    if apontamento_em_andamento:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Já existe um apontamento em andamento para este lote, produto e fase"
+    # Verificar se o operador ou a fase do lote já têm um apontamento em andamento
+    try:
+        await db.run_sync(
+            open_appointments.verificar_conflito,
+            current_user["id"], apontamento.lote_id, apontamento.produto_id, apontamento.fase_id
         )
+    except ConflitoApontamento as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.mensagem)
     
     # Criar novo apontamento
     db_apontamento = Apontamento(
@@ -104,72 +138,85 @@ async def create_apontamento(
     )
     
     db.add(db_apontamento)
-    db.commit()
-    db.refresh(db_apontamento)
+    await db.flush()
+    
+    # Registrar como aberto na mesma transação (a restrição única evita inícios duplicados)
+    try:
+        await db.run_sync(open_appointments.registrar, db_apontamento)
+    except ConflitoApontamento as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.mensagem)
+    
+    await db.commit()
+    await db.refresh(db_apontamento)
+    publicar_apontamento("apontamento_iniciado", db_apontamento)
     return db_apontamento
 
 @router.put("/{apontamento_id}", response_model=ApontamentoSchema)
 async def update_apontamento(
     apontamento_id: int, 
     apontamento: ApontamentoUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Atualiza um apontamento (finalização ou alteração de uma fase)."""
     # Verificar se apontamento existe
-    db_apontamento = db.query(Apontamento).filter(Apontamento.id == apontamento_id).first()
+    db_apontamento = await db.get(Apontamento, apontamento_id)
     if db_apontamento is None:
         raise HTTPException(status_code=404, detail="Apontamento não encontrado")
     
     # Se estiver finalizando o apontamento, verificar se todos os itens obrigatórios do checklist foram concluídos
     if apontamento.status == "finalizado":
-        checklist_items = db.query(ChecklistItem).filter(
-            ChecklistItem.fase_id == db_apontamento.fase_id,
-            ChecklistItem.obrigatorio == True,
-            ChecklistItem.ativo == True
-        ).all()
+        item_pendente = await db.run_sync(item_obrigatorio_pendente, apontamento_id, db_apontamento.fase_id)
         
-        for item in checklist_items:
-            resposta = db.query(ChecklistResposta).filter(
-                ChecklistResposta.apontamento_id == apontamento_id,
-                ChecklistResposta.checklist_item_id == item.id,
-                ChecklistResposta.concluido == True
-            ).first()
-            
-            if not resposta:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Item obrigatório do checklist não concluído: {item.descricao}"
-                )
+        if item_pendente:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Item obrigatório do checklist não concluído: {item_pendente.descricao}"
+            )
         
         # Definir data de fim e calcular tempo real
         apontamento.data_fim = datetime.utcnow()
         delta = apontamento.data_fim - db_apontamento.data_inicio
         apontamento.tempo_real = int(delta.total_seconds() // 60)  # Tempo em minutos
     
+    # Contribuição atual no consolidado diário, antes da alteração
+    contribuicao_anterior = await db.run_sync(rollup.contribuicao, db_apontamento)
+    
     # Atualizar apontamento
     apontamento_data = apontamento.dict(exclude_unset=True)
     for key, value in apontamento_data.items():
         setattr(db_apontamento, key, value)
     
-    db.commit()
-    db.refresh(db_apontamento)
+    # Apontamento encerrado deixa o registro de abertos
+    if db_apontamento.status != "iniciado" or db_apontamento.data_fim is not None:
+        await db.run_sync(open_appointments.liberar, db_apontamento.id)
+    
+    # Atualizar consolidado diário na mesma transação
+    await db.run_sync(rollup.aplicar, contribuicao_anterior, -1)
+    await db.run_sync(rollup.aplicar, await db.run_sync(rollup.contribuicao, db_apontamento))
+    
+    await db.commit()
+    await db.refresh(db_apontamento)
+    publicar_apontamento(
+        "apontamento_finalizado" if db_apontamento.status == "finalizado" else "apontamento_atualizado",
+        db_apontamento
+    )
     return db_apontamento
 
 @router.get("/{apontamento_id}/checklist", response_model=List[ChecklistRespostaSchema])
 async def get_apontamento_checklist(
     apontamento_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Retorna o checklist de um apontamento."""
-    apontamento = db.query(Apontamento).filter(Apontamento.id == apontamento_id).first()
+    apontamento = await db.get(Apontamento, apontamento_id)
     if apontamento is None:
         raise HTTPException(status_code=404, detail="Apontamento não encontrado")
     
-    checklist_respostas = db.query(ChecklistResposta).filter(
-        ChecklistResposta.apontamento_id == apontamento_id
-    ).all()
+    checklist_respostas = (await db.execute(
+        select(ChecklistResposta).where(ChecklistResposta.apontamento_id == apontamento_id)
+    )).scalars().all()
     
     return checklist_respostas
 
@@ -177,21 +224,23 @@ async def get_apontamento_checklist(
 async def answer_checklist_item(
     apontamento_id: int, 
     resposta: ChecklistRespostaCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Responde a um item do checklist de um apontamento."""
     # Verificar se apontamento existe
-    apontamento = db.query(Apontamento).filter(Apontamento.id == apontamento_id).first()
+    apontamento = await db.get(Apontamento, apontamento_id)
     if apontamento is None:
         raise HTTPException(status_code=404, detail="Apontamento não encontrado")
     
     # Verificar se checklist item existe e pertence à fase do apontamento
-    checklist_item = db.query(ChecklistItem).filter(
-        ChecklistItem.id == resposta.checklist_item_id,
-        ChecklistItem.fase_id == apontamento.fase_id,
-        ChecklistItem.ativo == True
-    ).first()
+    checklist_item = (await db.execute(
+        select(ChecklistItem).where(
+            ChecklistItem.id == resposta.checklist_item_id,
+            ChecklistItem.fase_id == apontamento.fase_id,
+            ChecklistItem.ativo == True
+        )
+    )).scalars().first()
     
     if checklist_item is None:
         raise HTTPException(
@@ -200,18 +249,20 @@ async def answer_checklist_item(
         )
     
     # Verificar se já existe uma resposta para este item
-    existing_resposta = db.query(ChecklistResposta).filter(
-        ChecklistResposta.apontamento_id == apontamento_id,
-        ChecklistResposta.checklist_item_id == resposta.checklist_item_id
-    ).first()
+    existing_resposta = (await db.execute(
+        select(ChecklistResposta).where(
+            ChecklistResposta.apontamento_id == apontamento_id,
+            ChecklistResposta.checklist_item_id == resposta.checklist_item_id
+        )
+    )).scalars().first()
     
     if existing_resposta:
         # Atualizar resposta existente
         existing_resposta.concluido = resposta.concluido
         existing_resposta.observacao = resposta.observacao
         existing_resposta.data_resposta = datetime.utcnow()
-        db.commit()
-        db.refresh(existing_resposta)
+        await db.commit()
+        await db.refresh(existing_resposta)
         return existing_resposta
     else:
         # Criar nova resposta
@@ -224,25 +275,58 @@ async def answer_checklist_item(
         )
         
         db.add(db_resposta)
-        db.commit()
-        db.refresh(db_resposta)
+        await db.commit()
+        await db.refresh(db_resposta)
         return db_resposta
 
+@router.post("/{apontamento_id}/checklist/bulk", response_model=List[ChecklistRespostaSchema])
+async def answer_checklist_bulk(
+    apontamento_id: int,
+    lote: ChecklistRespostaLote,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Responde vários itens do checklist de um apontamento de uma só vez.
+    Os itens são validados em uma consulta e as respostas gravadas em um único commit.
+    """
+    # Verificar se apontamento existe
+    apontamento = await db.get(Apontamento, apontamento_id)
+    if apontamento is None:
+        raise HTTPException(status_code=404, detail="Apontamento não encontrado")
+    
+    # Última resposta enviada para cada item
+    respostas = {
+        resposta.checklist_item_id: {"concluido": resposta.concluido, "observacao": resposta.observacao}
+        for resposta in lote.respostas
+    }
+    if not respostas:
+        return []
+    
+    try:
+        await db.run_sync(gravar_respostas, apontamento, respostas)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await db.commit()
+    
+    return (await db.execute(
+        select(ChecklistResposta).where(
+            ChecklistResposta.apontamento_id == apontamento_id,
+            ChecklistResposta.checklist_item_id.in_(respostas.keys())
+        )
+    )).scalars().all()
+
 @router.get("/appointments/active", response_model=ApontamentoResponse)
 async def get_active_appointment(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém o apontamento ativo do usuário atual."""
     user_id = current_user["id"]
     
-    # Buscar apontamento ativo (com data_inicio mas sem data_fim)
-    apontamento = db.query(Apontamento).filter(
-        Apontamento.usuario_id == user_id,
-        Apontamento.data_inicio.isnot(None),
-        Apontamento.data_fim.is_(None),
-        Apontamento.ativo == True
-    ).first()
+    # Buscar apontamento ativo no registro de abertos
+    aberto = await db.run_sync(open_appointments.por_operador, user_id)
+    apontamento = await db.get(Apontamento, aberto.apontamento_id) if aberto else None
     
     if not apontamento:
         raise HTTPException(
@@ -251,10 +335,14 @@ async def get_active_appointment(
         )
     
     # Buscar fase do lote relacionada
-    fase_lote = db.query(FaseLote).filter(
-        FaseLote.id == apontamento.fase_lote_id,
-        FaseLote.ativo == True
-    ).first()
+    fase_lote = (await db.execute(
+        select(FaseLote).where(
+            FaseLote.lote_id == apontamento.lote_id,
+            FaseLote.produto_id == apontamento.produto_id,
+            FaseLote.fase_id == apontamento.fase_id,
+            FaseLote.ativo == True
+        )
+    )).scalars().first()
     
     if not fase_lote:
         raise HTTPException(
@@ -263,45 +351,53 @@ async def get_active_appointment(
         )
     
     # Buscar fase
-    from app.models.models import Fase
-    fase = db.query(Fase).filter(
-        Fase.id == fase_lote.fase_id,
-        Fase.ativo == True
-    ).first()
+    fase = (await db.execute(
+        select(Fase).where(
+            Fase.id == fase_lote.fase_id,
+            Fase.ativo == True
+        )
+    )).scalars().first()
     
     # Buscar lote
-    from app.models.models import Lote
-    lote = db.query(Lote).filter(
-        Lote.id == fase_lote.lote_id,
-        Lote.ativo == True
-    ).first()
+    lote = (await db.execute(
+        select(Lote).where(
+            Lote.id == fase_lote.lote_id,
+            Lote.ativo == True
+        )
+    )).scalars().first()
     
     # Verificar se há checklist para essa fase
-    requires_checklist = db.query(ChecklistItem).filter(
-        ChecklistItem.fase_id == fase_lote.fase_id,
-        ChecklistItem.ativo == True
-    ).count() > 0
+    requires_checklist = await db.scalar(
+        select(func.count(ChecklistItem.id)).where(
+            ChecklistItem.fase_id == fase_lote.fase_id,
+            ChecklistItem.ativo == True
+        )
+    ) > 0
     
     # Verificar se o checklist já foi preenchido
     checklist_complete = False
     if requires_checklist:
-        checklist_count = db.query(ChecklistResposta).filter(
-            ChecklistResposta.apontamento_id == apontamento.id,
-            ChecklistResposta.ativo == True
-        ).count()
+        checklist_count = await db.scalar(
+            select(func.count(ChecklistResposta.id)).where(
+                ChecklistResposta.apontamento_id == apontamento.id,
+                ChecklistResposta.concluido == True
+            )
+        )
         
         # Se há respostas para todos os itens do checklist, está completo
-        required_items = db.query(ChecklistItem).filter(
-            ChecklistItem.fase_id == fase_lote.fase_id,
-            ChecklistItem.ativo == True
-        ).count()
+        required_items = await db.scalar(
+            select(func.count(ChecklistItem.id)).where(
+                ChecklistItem.fase_id == fase_lote.fase_id,
+                ChecklistItem.ativo == True
+            )
+        )
         
         checklist_complete = (checklist_count >= required_items)
     
     # Construir resposta
     response = {
         "id": apontamento.id,
-        "fase_lote_id": apontamento.fase_lote_id,
+        "fase_lote_id": fase_lote.id,
         "lote_id": lote.id if lote else None,
         "lote_codigo": lote.codigo if lote else None,
         "fase_id": fase.id if fase else None,
@@ -318,20 +414,15 @@ async def get_active_appointment(
 
 @router.post("/appointments/start", response_model=ApontamentoResponse)
 async def start_appointment(
-    data: ApontamentoCreate,
+    data: ApontamentoInicio,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Inicia um novo apontamento para uma fase de lote."""
     user_id = current_user["id"]
     
     # Verificar se já existe um apontamento ativo para o usuário
-    apontamento_ativo = db.query(Apontamento).filter(
-        Apontamento.usuario_id == user_id,
-        Apontamento.data_inicio.isnot(None),
-        Apontamento.data_fim.is_(None),
-        Apontamento.ativo == True
-    ).first()
+    apontamento_ativo = await db.run_sync(open_appointments.por_operador, user_id)
     
     if apontamento_ativo:
         raise HTTPException(
@@ -340,10 +431,12 @@ async def start_appointment(
         )
     
     # Verificar se a fase do lote existe
-    fase_lote = db.query(FaseLote).filter(
-        FaseLote.id == data.fase_lote_id,
-        FaseLote.ativo == True
-    ).first()
+    fase_lote = (await db.execute(
+        select(FaseLote).where(
+            FaseLote.id == data.fase_lote_id,
+            FaseLote.ativo == True
+        )
+    )).scalars().first()
     
     if not fase_lote:
         raise HTTPException(
@@ -352,22 +445,28 @@ async def start_appointment(
         )
     
     # Verificar se a fase já foi concluída
-    if fase_lote.data_fim:
+    fase_concluida = (await db.execute(
+        select(Apontamento.id).where(
+            Apontamento.lote_id == fase_lote.lote_id,
+            Apontamento.produto_id == fase_lote.produto_id,
+            Apontamento.fase_id == fase_lote.fase_id,
+            Apontamento.status == "finalizado"
+        )
+    )).first()
+    
+    if fase_concluida:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Esta fase já foi concluída"
         )
     
     # Verificar se já existe algum apontamento em andamento para esta fase
-    apontamento_existente = db.query(Apontamento).filter(
-        Apontamento.fase_lote_id == data.fase_lote_id,
-        Apontamento.data_inicio.isnot(None),
-        Apontamento.data_fim.is_(None),
-        Apontamento.ativo == True
-    ).first()
+    apontamento_existente = await db.run_sync(
+        open_appointments.por_fase, fase_lote.lote_id, fase_lote.produto_id, fase_lote.fase_id
+    )
     
     if apontamento_existente:
-        if apontamento_existente.usuario_id == user_id:
+        if apontamento_existente.operador_id == user_id:
             # Retornar o apontamento existente se for do mesmo usuário
             return await get_active_appointment(current_user, db)
         else:
@@ -379,47 +478,57 @@ async def start_appointment(
     
     # Criar novo apontamento
     novo_apontamento = Apontamento(
-        fase_lote_id=data.fase_lote_id,
-        usuario_id=user_id,
+        lote_id=fase_lote.lote_id,
+        produto_id=fase_lote.produto_id,
+        fase_id=fase_lote.fase_id,
+        operador_id=user_id,
+        maquina_id=data.maquina_id,
         data_inicio=datetime.utcnow(),
-        observacoes=data.observacoes,
-        ativo=True
+        status="iniciado",
+        observacoes=data.observacoes
     )
     
     db.add(novo_apontamento)
-    db.commit()
-    db.refresh(novo_apontamento)
+    await db.flush()
     
-    # Atualizar a fase do lote com data de início se não tiver
-    if not fase_lote.data_inicio:
-        fase_lote.data_inicio = datetime.utcnow()
-        db.commit()
-        db.refresh(fase_lote)
+    # Registrar como aberto; um início simultâneo da mesma fase é rejeitado aqui
+    try:
+        await db.run_sync(open_appointments.registrar, novo_apontamento)
+    except ConflitoApontamento as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.mensagem)
+    
+    await db.commit()
+    await db.refresh(novo_apontamento)
+    publicar_apontamento("apontamento_iniciado", novo_apontamento)
     
     # Buscar fase
-    from app.models.models import Fase
-    fase = db.query(Fase).filter(
-        Fase.id == fase_lote.fase_id,
-        Fase.ativo == True
-    ).first()
+    fase = (await db.execute(
+        select(Fase).where(
+            Fase.id == fase_lote.fase_id,
+            Fase.ativo == True
+        )
+    )).scalars().first()
     
     # Buscar lote
-    from app.models.models import Lote
-    lote = db.query(Lote).filter(
-        Lote.id == fase_lote.lote_id,
-        Lote.ativo == True
-    ).first()
+    lote = (await db.execute(
+        select(Lote).where(
+            Lote.id == fase_lote.lote_id,
+            Lote.ativo == True
+        )
+    )).scalars().first()
     
     # Verificar se há checklist para essa fase
-    requires_checklist = db.query(ChecklistItem).filter(
-        ChecklistItem.fase_id == fase_lote.fase_id,
-        ChecklistItem.ativo == True
-    ).count() > 0
+    requires_checklist = await db.scalar(
+        select(func.count(ChecklistItem.id)).where(
+            ChecklistItem.fase_id == fase_lote.fase_id,
+            ChecklistItem.ativo == True
+        )
+    ) > 0
     
     # Construir resposta
     response = {
         "id": novo_apontamento.id,
-        "fase_lote_id": novo_apontamento.fase_lote_id,
+        "fase_lote_id": fase_lote.id,
         "lote_id": lote.id if lote else None,
         "lote_codigo": lote.codigo if lote else None,
         "fase_id": fase.id if fase else None,
@@ -436,18 +545,15 @@ async def start_appointment(
 
 @router.post("/appointments/finish")
 async def finish_appointment(
-    data: ApontamentoUpdate,
+    data: ApontamentoFinalizacao,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Finaliza um apontamento em andamento."""
     user_id = current_user["id"]
     
     # Buscar o apontamento pelo ID
-    apontamento = db.query(Apontamento).filter(
-        Apontamento.id == data.apontamento_id,
-        Apontamento.ativo == True
-    ).first()
+    apontamento = await db.get(Apontamento, data.apontamento_id)
     
     if not apontamento:
         raise HTTPException(
@@ -456,7 +562,7 @@ async def finish_appointment(
         )
     
     # Verificar se o apontamento pertence ao usuário atual
-    if apontamento.usuario_id != user_id:
+    if apontamento.operador_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Você não tem permissão para finalizar este apontamento"
@@ -470,10 +576,14 @@ async def finish_appointment(
         )
     
     # Buscar fase do lote
-    fase_lote = db.query(FaseLote).filter(
-        FaseLote.id == apontamento.fase_lote_id,
-        FaseLote.ativo == True
-    ).first()
+    fase_lote = (await db.execute(
+        select(FaseLote).where(
+            FaseLote.lote_id == apontamento.lote_id,
+            FaseLote.produto_id == apontamento.produto_id,
+            FaseLote.fase_id == apontamento.fase_id,
+            FaseLote.ativo == True
+        )
+    )).scalars().first()
     
     if not fase_lote:
         raise HTTPException(
@@ -482,10 +592,12 @@ async def finish_appointment(
         )
     
     # Verificar se há checklist para essa fase
-    checklist_items = db.query(ChecklistItem).filter(
-        ChecklistItem.fase_id == fase_lote.fase_id,
-        ChecklistItem.ativo == True
-    ).all()
+    checklist_items = (await db.execute(
+        select(ChecklistItem).where(
+            ChecklistItem.fase_id == fase_lote.fase_id,
+            ChecklistItem.ativo == True
+        )
+    )).scalars().all()
     
     # Se houver checklist e não foram enviadas respostas
     if checklist_items and not data.checklist_respostas:
@@ -501,13 +613,15 @@ async def finish_appointment(
             nova_resposta = ChecklistResposta(
                 apontamento_id=apontamento.id,
                 checklist_item_id=resposta_data.checklist_item_id,
-                resposta=resposta_data.resposta,
-                ativo=True
+                concluido=True,
+                observacao=resposta_data.resposta
             )
             db.add(nova_resposta)
     
     # Atualizar apontamento
     apontamento.data_fim = datetime.utcnow()
+    apontamento.status = "finalizado"
+    apontamento.tempo_real = int((apontamento.data_fim - apontamento.data_inicio).total_seconds() // 60)
     
     if data.observacoes:
         apontamento.observacoes = data.observacoes
@@ -518,46 +632,101 @@ async def finish_appointment(
         apontamento.excedeu_tempo = tempo_real > fase_lote.tempo_estimado
         apontamento.tempo_atraso = max(0, tempo_real - fase_lote.tempo_estimado) if apontamento.excedeu_tempo else 0
     
-    db.commit()
+    # Liberar operador e fase no registro de abertos
+    await db.run_sync(open_appointments.liberar, apontamento.id)
+    
+    # Atualizar consolidado diário na mesma transação
+    await db.run_sync(rollup.aplicar, await db.run_sync(rollup.contribuicao, apontamento))
+    
+    await db.commit()
+    publicar_apontamento("apontamento_finalizado", apontamento)
     
     # Verificar se é a última fase do lote a ser concluída
-    from app.models.models import Lote
-    lote = db.query(Lote).filter(
-        Lote.id == fase_lote.lote_id,
-        Lote.ativo == True
-    ).first()
-    
-    # Atualizar fase do lote
-    fase_lote.data_fim = datetime.utcnow()
-    db.commit()
-    
-    # Verificar se todas as fases foram concluídas
-    fases_pendentes = db.query(FaseLote).filter(
-        FaseLote.lote_id == lote.id,
-        FaseLote.data_fim == None,
-        FaseLote.ativo == True
-    ).count()
+    lote = (await db.execute(
+        select(Lote).where(
+            Lote.id == fase_lote.lote_id,
+            Lote.ativo == True
+        )
+    )).scalars().first()
+    
+    # Verificar se todas as fases foram concluídas (fases sem apontamento finalizado)
+    fases_pendentes = await db.scalar(
+        select(func.count(FaseLote.id)).where(
+            FaseLote.lote_id == lote.id,
+            FaseLote.ativo == True,
+            ~select(Apontamento.id).where(
+                Apontamento.lote_id == FaseLote.lote_id,
+                Apontamento.produto_id == FaseLote.produto_id,
+                Apontamento.fase_id == FaseLote.fase_id,
+                Apontamento.status == "finalizado"
+            ).exists()
+        )
+    )
     
     # Se não houver mais fases pendentes, finalizar o lote
     if fases_pendentes == 0 and lote.status != "concluido":
         lote.status = "concluido"
         lote.data_conclusao = datetime.utcnow()
-        db.commit()
+        await db.commit()
+        indice.atualizar("lote", lote)
+        publicar_lote(lote)
     
     return {"message": "Apontamento finalizado com sucesso"}
 
+@router.post("/appointments/sync")
+async def sync_appointments(
+    lote: SincronizacaoApontamentos,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Sincroniza os eventos (início, checklist, finalização) registrados pelo operador
+    enquanto estava offline. O lote é aplicado em uma única transação e cada
+    evento retorna seu próprio resultado.
+    """
+    if len(lote.eventos) > settings.SYNC_MAX_EVENTOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Envie no máximo {settings.SYNC_MAX_EVENTOS} eventos por sincronização"
+        )
+    
+    try:
+        resultados = await db.run_sync(sincronizar, current_user["id"], lote.eventos)
+    except ConflitoApontamento as e:
+        # Início concorrente da mesma fase: nada foi gravado, o cliente deve reenviar o lote
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.mensagem)
+    
+    # Publicar os inícios e finalizações aplicados nesta sincronização
+    tipos = {evento.chave: evento.tipo for evento in lote.eventos}
+    lotes_finalizados = set()
+    for resultado in resultados:
+        tipo = tipos[resultado["chave"]]
+        if resultado["duplicado"] or resultado["status"] != "aplicado" or tipo == "checklist":
+            continue
+        apontamento = await db.get(Apontamento, resultado["apontamento_id"])
+        if tipo == "start":
+            publicar_apontamento("apontamento_iniciado", apontamento)
+        else:
+            publicar_apontamento("apontamento_finalizado", apontamento)
+            lotes_finalizados.add(apontamento.lote_id)
+    
+    for lote_id in lotes_finalizados:
+        lote_finalizado = await db.get(Lote, lote_id)
+        if lote_finalizado and lote_finalizado.status == "concluido":
+            indice.atualizar("lote", lote_finalizado)
+            publicar_lote(lote_finalizado)
+    
+    return {"resultados": resultados}
+
 @router.get("/appointments/{apontamento_id}/checklist", response_model=List[ChecklistItemResponse])
 async def get_appointment_checklist(
     apontamento_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém os itens de checklist para um apontamento."""
     # Verificar se o apontamento existe
-    apontamento = db.query(Apontamento).filter(
-        Apontamento.id == apontamento_id,
-        Apontamento.ativo == True
-    ).first()
+    apontamento = await db.get(Apontamento, apontamento_id)
     
     if not apontamento:
         raise HTTPException(
@@ -566,29 +735,19 @@ async def get_appointment_checklist(
         )
     
     # Verificar se o apontamento pertence ao usuário atual
-    if apontamento.usuario_id != current_user["id"]:
+    if apontamento.operador_id != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Você não tem permissão para acessar este apontamento"
         )
     
-    # Buscar fase do lote
-    fase_lote = db.query(FaseLote).filter(
-        FaseLote.id == apontamento.fase_lote_id,
-        FaseLote.ativo == True
-    ).first()
-    
-    if not fase_lote:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Fase do lote não encontrada"
+    # Buscar itens do checklist da fase do apontamento
+    checklist_items = (await db.execute(
+        select(ChecklistItem).where(
+            ChecklistItem.fase_id == apontamento.fase_id,
+            ChecklistItem.ativo == True
         )
-    
-    # Buscar itens do checklist para essa fase
-    checklist_items = db.query(ChecklistItem).filter(
-        ChecklistItem.fase_id == fase_lote.fase_id,
-        ChecklistItem.ativo == True
-    ).all()
+    )).scalars().all()
     
     # Formatar resposta
     result = []
@@ -603,58 +762,34 @@ async def get_appointment_checklist(
 
 @router.get("/batches/available")
 async def get_available_batches(
+    request: Request,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém os lotes disponíveis para o operador."""
-    from app.models.models import Lote, Produto
+    result = await db.run_sync(list_available_batches)
     
-    # Buscar lotes que não estejam concluídos ou cancelados
-    lotes = db.query(Lote).filter(
-        Lote.status.in_(["em_producao", "em_pausa"]),
-        Lote.ativo == True
-    ).order_by(Lote.data_criacao.desc()).all()
-    
-    result = []
-    for lote in lotes:
-        # Buscar produto associado ao lote
-        produto_lote = db.query(ProdutoLote).filter(
-            ProdutoLote.lote_id == lote.id,
-            ProdutoLote.ativo == True
-        ).first()
-        
-        produto_nome = ""
-        if produto_lote:
-            produto = db.query(Produto).filter(
-                Produto.id == produto_lote.produto_id,
-                Produto.ativo == True
-            ).first()
-            if produto:
-                produto_nome = produto.descricao
-        
-        result.append({
-            "id": lote.id,
-            "codigo": lote.codigo,
-            "produto": produto_nome,
-            "status": lote.status
-        })
+    # Lista inalterada: responder 304 sem corpo
+    etag = compute_etag(result)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
     
-    return result
+    return JSONResponse(content=jsonable_encoder(result), headers={"ETag": etag})
 
 @router.get("/batches/{lote_id}")
 async def get_batch_details(
     lote_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém os detalhes de um lote específico."""
-    from app.models.models import Lote, Produto
-    
     # Buscar lote
-    lote = db.query(Lote).filter(
-        Lote.id == lote_id,
-        Lote.ativo == True
-    ).first()
+    lote = (await db.execute(
+        select(Lote).where(
+            Lote.id == lote_id,
+            Lote.ativo == True
+        )
+    )).scalars().first()
     
     if not lote:
         raise HTTPException(
@@ -663,18 +798,22 @@ async def get_batch_details(
         )
     
     # Buscar produto associado ao lote
-    produto_lote = db.query(ProdutoLote).filter(
-        ProdutoLote.lote_id == lote.id,
-        ProdutoLote.ativo == True
-    ).first()
+    produto_lote = (await db.execute(
+        select(ProdutoLote).where(
+            ProdutoLote.lote_id == lote.id,
+            ProdutoLote.ativo == True
+        )
+    )).scalars().first()
     
     produto_nome = ""
     produto_id = None
     if produto_lote:
-        produto = db.query(Produto).filter(
-            Produto.id == produto_lote.produto_id,
-            Produto.ativo == True
-        ).first()
+        produto = (await db.execute(
+            select(Produto).where(
+                Produto.id == produto_lote.produto_id,
+                Produto.ativo == True
+            )
+        )).scalars().first()
         if produto:
             produto_nome = produto.descricao
             produto_id = produto.id
@@ -693,17 +832,16 @@ async def get_batch_details(
 async def get_batch_phases(
     lote_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém as fases de um lote específico."""
-    from app.models.models import Fase
-    
     # Verificar se o lote existe
-    from app.models.models import Lote
-    lote = db.query(Lote).filter(
-        Lote.id == lote_id,
-        Lote.ativo == True
-    ).first()
+    lote = (await db.execute(
+        select(Lote).where(
+            Lote.id == lote_id,
+            Lote.ativo == True
+        )
+    )).scalars().first()
     
     if not lote:
         raise HTTPException(
@@ -712,18 +850,22 @@ async def get_batch_phases(
         )
     
     # Buscar fases do lote
-    fases_lote = db.query(FaseLote).filter(
-        FaseLote.lote_id == lote_id,
-        FaseLote.ativo == True
-    ).order_by(FaseLote.ordem).all()
+    fases_lote = (await db.execute(
+        select(FaseLote).where(
+            FaseLote.lote_id == lote_id,
+            FaseLote.ativo == True
+        ).order_by(FaseLote.ordem)
+    )).scalars().all()
     
     result = []
     for fase_lote in fases_lote:
         # Buscar fase
-        fase = db.query(Fase).filter(
-            Fase.id == fase_lote.fase_id,
-            Fase.ativo == True
-        ).first()
+        fase = (await db.execute(
+            select(Fase).where(
+                Fase.id == fase_lote.fase_id,
+                Fase.ativo == True
+            )
+        )).scalars().first()
         
         if fase:
             result.append({
@@ -740,84 +882,71 @@ async def get_batch_phases(
 
 @router.get("/appointments/history")
 async def get_appointment_history(
+    response: Response,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    limit: int = 100
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    """Obtém o histórico de apontamentos do operador."""
-    user_id = current_user["id"]
+    """
+    Obtém o histórico de apontamentos do operador.
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
+    try:
+        result, next_cursor = await db.run_sync(
+            get_history_page, current_user["id"], limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    # Buscar apontamentos do usuário
-    apontamentos = db.query(Apontamento).filter(
-        Apontamento.usuario_id == user_id,
-        Apontamento.ativo == True
-    ).order_by(Apontamento.data_inicio.desc()).limit(limit).all()
-    
-    result = []
-    for apontamento in apontamentos:
-        # Buscar fase do lote
-        fase_lote = db.query(FaseLote).filter(
-            FaseLote.id == apontamento.fase_lote_id,
-            FaseLote.ativo == True
-        ).first()
-        
-        if not fase_lote:
-            continue
-        
-        # Buscar fase
-        from app.models.models import Fase
-        fase = db.query(Fase).filter(
-            Fase.id == fase_lote.fase_id,
-            Fase.ativo == True
-        ).first()
-        
-        # Buscar lote
-        from app.models.models import Lote, Produto
-        lote = db.query(Lote).filter(
-            Lote.id == fase_lote.lote_id,
-            Lote.ativo == True
-        ).first()
-        
-        if not lote:
-            continue
-        
-        # Buscar produto
-        produto_lote = db.query(ProdutoLote).filter(
-            ProdutoLote.lote_id == lote.id,
-            ProdutoLote.ativo == True
-        ).first()
-        
-        produto_nome = ""
-        if produto_lote:
-            produto = db.query(Produto).filter(
-                Produto.id == produto_lote.produto_id,
-                Produto.ativo == True
-            ).first()
-            if produto:
-                produto_nome = produto.descricao
-        
-        # Calcular tempo real em minutos
-        tempo_real = None
-        if apontamento.data_inicio and apontamento.data_fim:
-            tempo_real = round((apontamento.data_fim - apontamento.data_inicio).total_seconds() / 60, 2)
-        
-        # Determinar status
-        status = "Em andamento"
-        if apontamento.data_fim:
-            status = "Finalizado"
-            if apontamento.excedeu_tempo:
-                status = "Atrasado"
-        
-        result.append({
-            "id": apontamento.id,
-            "data": apontamento.data_inicio.strftime("%d/%m/%Y"),
-            "lote_codigo": lote.codigo,
-            "produto": produto_nome,
-            "fase": fase.descricao if fase else "",
-            "inicio": apontamento.data_inicio.strftime("%H:%M"),
-            "fim": apontamento.data_fim.strftime("%H:%M") if apontamento.data_fim else "-",
-            "tempo_real": f"{tempo_real} min" if tempo_real else "-",
-            "status": status
-        })
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return result
+
+@router.get("/appointments/export")
+async def export_appointments(
+    data_inicio: date,
+    data_fim: date,
+    formato: str = "csv",
+    operador_id: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exporta os apontamentos iniciados no período (datas inclusivas) em CSV ou Parquet,
+    com os rótulos de lote, produto, fase, operador e máquina.
+    O arquivo é transmitido em blocos lidos com cursor no servidor, em memória constante.
+    """
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Não autorizado"
+        )
+    
+    if formato not in appointment_export.FORMATOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato inválido. Use: {', '.join(appointment_export.FORMATOS)}"
+        )
+    if data_fim < data_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A data final deve ser igual ou posterior à data inicial"
+        )
+    if formato == "parquet" and not appointment_export.parquet_disponivel():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Exportação em Parquet indisponível: instale o pacote pyarrow"
+        )
+    
+    if formato == "parquet":
+        conteudo = appointment_export.exportar_parquet(data_inicio, data_fim, operador_id)
+    else:
+        conteudo = appointment_export.exportar_csv(data_inicio, data_fim, operador_id)
+    
+    nome_arquivo = f"apontamentos_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}.{formato}"
+    return StreamingResponse(
+        conteudo,
+        media_type=appointment_export.FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'}
+    )
@@ -4,7 +4,7 @@ from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.security import authenticate_user, create_access_token, get_password_hash
+from app.core.security import authenticate_user, build_token_claims, create_access_token, get_password_hash
 from app.models.models import Usuario
 from app.schemas.schemas import Token, LoginForm, UsuarioCreate, Usuario as UsuarioSchema
 from datetime import timedelta
@@ -33,7 +33,7 @@ async def login_access_token(form_data: OAuth2PasswordRequestForm = Depends(), d
         )
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.usuario}, expires_delta=access_token_expires
+        data=build_token_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -56,7 +56,7 @@ async def login(request: Request, response: Response, db: Session = Depends(get_
     # Gerar token de acesso
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.usuario, "role": user.role}, 
+        data=build_token_claims(user), 
         expires_delta=access_token_expires
     )
     
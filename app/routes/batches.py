@@ -1,32 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List, Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.pagination import paginar, proxima_pagina
 from app.core.security import get_current_user
-from app.models.models import Lote, ProdutoLote, FaseLote, Produto, Fase, ProdutoFase
+from app.models.models import Lote, ProdutoLote, FaseLote, Fase
 from app.schemas.schemas import Lote as LoteSchema
-from app.schemas.schemas import LoteCreate, LoteUpdate
+from app.schemas.schemas import LoteCreate, LoteUpdate, LoteDuplicacao
 from app.schemas.schemas import ProdutoLote as ProdutoLoteSchema
-from app.schemas.schemas import ProdutoLoteCreate
+from app.schemas.schemas import ProdutoLoteCreate, ProdutoLoteLote, ProdutoLoteAssociacoes
 from app.schemas.schemas import FaseLote as FaseLoteSchema
 from app.schemas.schemas import FaseLoteCreate
+from app.services.batch_duplication import duplicar_lote
+from app.services.batch_products import associar_produtos
+from app.services.event_bus import publicar_lote
+from app.services.scan_index import indice
 import copy
-from datetime import datetime
 
 router = APIRouter()
 
+# Mais recentes primeiro; o id desempata lotes criados no mesmo instante
+ORDENACAO_LOTES = [(Lote.data_criacao, True), (Lote.id, True)]
+
 @router.get("/", response_model=List[LoteSchema])
 async def get_lotes(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Retorna a lista de lotes ativos."""
-    lotes = db.query(Lote).filter(Lote.ativo == True).order_by(Lote.data_criacao.desc()).offset(skip).limit(limit).all()
+    """
+    Retorna a lista de lotes ativos.
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
+    query = db.query(Lote).filter(Lote.ativo == True)
+    try:
+        query = paginar(query, ORDENACAO_LOTES, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    lotes, next_cursor = proxima_pagina(query.all(), ORDENACAO_LOTES, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return lotes
 
-@router.get("/{lote_id}", response_model=LoteSchema)
+@router.get("/{lote_id:int}", response_model=LoteSchema)
 async def get_lote(
     lote_id: int, 
     db: Session = Depends(get_db),
@@ -65,6 +87,7 @@ async def create_lote(
     db.add(db_lote)
     db.commit()
     db.refresh(db_lote)
+    indice.atualizar("lote", db_lote)
     return db_lote
 
 @router.put("/{lote_id}", response_model=LoteSchema)
@@ -97,12 +120,18 @@ async def update_lote(
             )
     
     # Atualizar lote
+    status_anterior = db_lote.status
     lote_data = lote.dict(exclude_unset=True)
     for key, value in lote_data.items():
         setattr(db_lote, key, value)
     
     db.commit()
     db.refresh(db_lote)
+    indice.atualizar("lote", db_lote)
+    
+    # Notificar os clientes que acompanham o lote
+    if db_lote.status != status_anterior:
+        publicar_lote(db_lote)
     return db_lote
 
 @router.delete("/{lote_id}", response_model=LoteSchema)
@@ -127,6 +156,7 @@ async def delete_lote(
     # Desativar lote (exclusão lógica)
     db_lote.ativo = False
     db.commit()
+    indice.remover("lote", db_lote.id)
     return db_lote
 
 @router.post("/duplicate/{lote_id}", response_model=LoteSchema)
@@ -149,64 +179,75 @@ async def duplicate_lote(
     if lote_original is None:
         raise HTTPException(status_code=404, detail="Lote original não encontrado")
     
-    # Verificar se o novo código já existe
-    lote_existente = db.query(Lote).filter(Lote.codigo == novo_codigo).first()
-    if lote_existente:
+    # Criar o novo lote com os produtos e fases do original em uma única transação
+    try:
+        resultado = duplicar_lote(db, lote_original, [novo_codigo])[0]
+        if resultado["status"] != "criado":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=resultado["detalhe"]
+            )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Código de lote já existe"
         )
     
-    # Criar novo lote com os mesmos dados do original
-    novo_lote = Lote(
-        codigo=novo_codigo,
-        descricao=lote_original.descricao + " (Duplicado)",
-        status="em_producao",
-        observacoes=lote_original.observacoes,
-        data_criacao=datetime.utcnow(),
-        ativo=True
-    )
-    
-    db.add(novo_lote)
-    db.commit()
-    db.refresh(novo_lote)
-    
-    # Copiar os produtos associados ao lote original
-    produtos_lote = db.query(ProdutoLote).filter(
-        ProdutoLote.lote_id == lote_id,
-        ProdutoLote.ativo == True
-    ).all()
+    db_lote = db.query(Lote).filter(Lote.id == resultado["lote_id"]).first()
+    indice.atualizar("lote", db_lote)
+    return db_lote
+
+@router.post("/duplicate/{lote_id}/bulk")
+async def duplicate_lote_bulk(
+    lote_id: int,
+    duplicacao: LoteDuplicacao,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Duplica um lote (usado como modelo) para vários códigos em uma única transação.
+    Retorna um resultado por código; códigos inválidos ou já existentes não
+    impedem a criação dos demais.
+    """
+    # Verificar se usuário é administrador
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Não autorizado"
+        )
     
-    for produto_lote in produtos_lote:
-        novo_produto_lote = ProdutoLote(
-            lote_id=novo_lote.id,
-            produto_id=produto_lote.produto_id,
-            quantidade=produto_lote.quantidade,
-            observacoes=produto_lote.observacoes,
-            ativo=True
+    if not duplicacao.codigos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe ao menos um código"
+        )
+    if len(duplicacao.codigos) > settings.LOTE_DUPLICACAO_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Informe no máximo {settings.LOTE_DUPLICACAO_MAX} códigos por requisição"
         )
-        db.add(novo_produto_lote)
     
-    # Copiar as fases associadas ao lote original
-    fases_lote = db.query(FaseLote).filter(
-        FaseLote.lote_id == lote_id,
-        FaseLote.ativo == True
-    ).all()
+    # Verificar se lote original existe
+    lote_original = db.query(Lote).filter(Lote.id == lote_id, Lote.ativo == True).first()
+    if lote_original is None:
+        raise HTTPException(status_code=404, detail="Lote original não encontrado")
     
-    for fase_lote in fases_lote:
-        nova_fase_lote = FaseLote(
-            lote_id=novo_lote.id,
-            fase_id=fase_lote.fase_id,
-            produto_id=fase_lote.produto_id,
-            ordem=fase_lote.ordem,
-            tempo_estimado=fase_lote.tempo_estimado,
-            tempo_prateleira_horas=fase_lote.tempo_prateleira_horas,
-            ativo=True
+    try:
+        resultados = duplicar_lote(db, lote_original, duplicacao.codigos, duplicacao.status)
+        db.commit()
+    except IntegrityError:
+        # Código criado por outra requisição entre a verificação e a inserção: nada foi gravado
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Um dos códigos foi cadastrado por outra requisição. Reenvie a lista."
         )
-        db.add(nova_fase_lote)
     
-    db.commit()
-    return novo_lote
+    # Lotes criados em massa: o índice de códigos é recarregado na próxima leitura
+    indice.invalidar()
+    return {"resultados": resultados}
 
 # Rotas para gerenciar produtos de um lote
 @router.get("/{lote_id}/produtos", response_model=List[ProdutoLoteSchema])
@@ -242,55 +283,75 @@ async def add_produto_to_lote(
             detail="Não autorizado"
         )
     
-    # Verificar se lote existe
-    lote = db.query(Lote).filter(Lote.id == lote_id, Lote.ativo == True).first()
-    if lote is None:
-        raise HTTPException(status_code=404, detail="Lote não encontrado")
-    
-    # Verificar se produto existe
-    produto = db.query(Produto).filter(Produto.id == produto_lote.produto_id, Produto.ativo == True).first()
-    if produto is None:
-        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    # Adicionar o produto e suas fases ao lote em uma única transação
+    resultado = associar_produtos(db, [{**produto_lote.dict(), "lote_id": lote_id}])[0]
+    if resultado["status"] != "criado":
+        raise HTTPException(
+            status_code=404 if resultado["detalhe"] in ("Lote não encontrado", "Produto não encontrado") else status.HTTP_400_BAD_REQUEST,
+            detail=resultado["detalhe"]
+        )
+    db.commit()
     
-    # Verificar se o produto já está associado ao lote
-    existing_produto_lote = db.query(ProdutoLote).filter(
-        ProdutoLote.lote_id == lote_id,
-        ProdutoLote.produto_id == produto_lote.produto_id,
-        ProdutoLote.ativo == True
-    ).first()
+    return db.query(ProdutoLote).filter(ProdutoLote.id == resultado["produto_lote_id"]).first()
+
+@router.post("/{lote_id}/produtos/bulk")
+async def add_produtos_to_lote(
+    lote_id: int,
+    lote: ProdutoLoteLote,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Adiciona vários produtos a um lote, com as fases de cada produto, em uma única transação.
+    Retorna um resultado por produto; produtos inválidos não impedem os demais.
+    """
+    # Verificar se usuário é administrador
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Não autorizado"
+        )
     
-    if existing_produto_lote:
+    if len(lote.produtos) > settings.LOTE_PRODUTOS_MAX:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Produto já associado ao lote"
+            detail=f"Informe no máximo {settings.LOTE_PRODUTOS_MAX} produtos por requisição"
         )
     
-    # Adicionar produto ao lote
-    db_produto_lote = ProdutoLote(**produto_lote.dict())
-    db.add(db_produto_lote)
-    db.commit()
-    db.refresh(db_produto_lote)
+    # Verificar se lote existe
+    if db.query(Lote.id).filter(Lote.id == lote_id, Lote.ativo == True).first() is None:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
     
-    # Adicionar fases do produto ao lote
-    produto_fases = db.query(ProdutoFase).filter(
-        ProdutoFase.produto_id == produto_lote.produto_id,
-        ProdutoFase.ativo == True
-    ).order_by(ProdutoFase.ordem).all()
+    resultados = associar_produtos(db, [{**item.dict(), "lote_id": lote_id} for item in lote.produtos])
+    db.commit()
+    return {"resultados": resultados}
+
+@router.post("/produtos/bulk")
+async def add_produtos_to_lotes(
+    lote: ProdutoLoteAssociacoes,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Associa produtos a vários lotes (com as fases de cada produto) em uma única transação.
+    Retorna um resultado por associação; associações inválidas não impedem as demais.
+    """
+    # Verificar se usuário é administrador
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Não autorizado"
+        )
     
-    for produto_fase in produto_fases:
-        fase_lote = FaseLote(
-            lote_id=lote_id,
-            fase_id=produto_fase.fase_id,
-            produto_id=produto_lote.produto_id,
-            ordem=produto_fase.ordem,
-            tempo_estimado=produto_fase.tempo_estimado,
-            tempo_prateleira_horas=produto_fase.tempo_prateleira_horas,
-            ativo=True
+    if len(lote.associacoes) > settings.LOTE_PRODUTOS_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Informe no máximo {settings.LOTE_PRODUTOS_MAX} associações por requisição"
         )
-        db.add(fase_lote)
     
+    resultados = associar_produtos(db, [associacao.dict() for associacao in lote.associacoes])
     db.commit()
-    return db_produto_lote
+    return {"resultados": resultados}
 
 # Rotas para gerenciar fases de um lote
 @router.get("/{lote_id}/fases", response_model=List[FaseLoteSchema])
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.pagination import paginar, proxima_pagina
 from app.core.security import get_current_user
 from app.models.models import ChecklistItem, ChecklistResposta
 from app.schemas.schemas import ChecklistItem as ChecklistItemSchema
@@ -9,21 +10,36 @@ from app.schemas.schemas import ChecklistItemCreate, ChecklistItemUpdate
 
 router = APIRouter()
 
+# Itens agrupados por fase, na ordem de exibição; o id desempata itens com a mesma ordem
+ORDENACAO_ITENS = [(ChecklistItem.fase_id, False), (ChecklistItem.ordem, False), (ChecklistItem.id, False)]
+
 @router.get("/", response_model=List[ChecklistItemSchema])
 async def get_checklist_items(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     fase_id: int = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Retorna a lista de itens de checklist, opcionalmente filtrados por fase."""
+    """
+    Retorna a lista de itens de checklist, opcionalmente filtrados por fase.
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
     query = db.query(ChecklistItem).filter(ChecklistItem.ativo == True)
     
     if fase_id:
         query = query.filter(ChecklistItem.fase_id == fase_id)
     
-    checklist_items = query.order_by(ChecklistItem.fase_id, ChecklistItem.ordem).offset(skip).limit(limit).all()
+    try:
+        query = paginar(query, ORDENACAO_ITENS, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    checklist_items, next_cursor = proxima_pagina(query.all(), ORDENACAO_ITENS, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return checklist_items
 
 @router.get("/{item_id}", response_model=ChecklistItemSchema)
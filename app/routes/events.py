@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+import asyncio
+from app.core.config import settings
+from app.core.security import get_current_user_sem_sessao
+from app.services.event_bus import TOPICO_PAINEL, bus, formatar_sse, validar_topico
+
+router = APIRouter()
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    topicos: str,
+    current_user: dict = Depends(get_current_user_sem_sessao)
+):
+    """
+    Envia, via Server-Sent Events, as mudanças de estado dos tópicos assinados.
+    `topicos` é uma lista separada por vírgulas, ex.: "lote:1,fase:3,maquina:2".
+    O tópico "painel" (apenas administradores) recebe os eventos de todos os lotes, fases e máquinas.
+    """
+    try:
+        assinados = {validar_topico(topico) for topico in topicos.split(",") if topico.strip()}
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not assinados:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Informe ao menos um tópico")
+    if TOPICO_PAINEL in assinados and current_user["role"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autorizado")
+    if len(assinados) > settings.EVENTOS_MAX_TOPICOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Assine no máximo {settings.EVENTOS_MAX_TOPICOS} tópicos por conexão"
+        )
+
+    assinatura = bus.assinar(assinados)
+
+    async def eventos():
+        try:
+            # Intervalo de reconexão sugerido ao EventSource
+            yield "retry: 3000\n" + formatar_sse({"tipo": "conectado", "topicos": sorted(assinados)})
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(assinatura.fila.get(), timeout=settings.EVENTOS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Comentário SSE mantém a conexão aberta em proxies
+                    yield ": heartbeat\n\n"
+                    continue
+
+                yield formatar_sse(evento)
+
+                # Eventos descartados por fila cheia: o cliente deve recarregar o estado
+                if assinatura.descartados:
+                    assinatura.descartados = 0
+                    yield formatar_sse({"tipo": "recarregar"})
+        finally:
+            bus.cancelar(assinatura)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,37 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.pagination import paginar, proxima_pagina
 from app.core.security import get_current_user
 from app.models.maquina import Maquina, FaseMaquina
 from app.models.models import Fase
 from app.schemas.schemas import Maquina as MaquinaSchema
 from app.schemas.schemas import MaquinaCreate, MaquinaUpdate
-import qrcode
-import io
-import base64
+from app.services.event_bus import publicar_maquina
+from app.services.machine_routing import invalidar_mapa, maquinas_por_fase
+from app.services.scan_index import indice
+from app.services import qrcodes
 import os
-import time
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.templating import Jinja2Templates
 from datetime import datetime
-import uuid
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
-# Diretório para armazenar QR Codes
-QR_CODES_DIR = "app/static/qrcodes"
-os.makedirs(QR_CODES_DIR, exist_ok=True)
+ORDENACAO_MAQUINAS = [(Maquina.id, False)]
 
-# Rota para servir QR codes estáticos
+# Rota para servir QR codes estáticos (por id, use /api/qrcodes/maquina/{maquina_id})
 @router.get("/qrcode/{filename}")
-async def get_qrcode(filename: str):
-    """Retorna a imagem do QR code pelo nome do arquivo."""
-    qrcode_path = os.path.join(QR_CODES_DIR, filename)
+async def get_qrcode(filename: str, db: Session = Depends(get_db)):
+    """
+    Retorna a imagem do QR code pelo nome do arquivo, gerando-a se estiver ausente.
+    O nome é derivado do conteúdo, então a resposta pode ficar em cache indefinidamente.
+    """
+    qrcode_path = os.path.join(qrcodes.QR_CODES_DIR, os.path.basename(filename))
     if not os.path.exists(qrcode_path):
-        raise HTTPException(status_code=404, detail="QR Code não encontrado")
-    return FileResponse(qrcode_path)
+        maquina = db.query(Maquina).filter(Maquina.qrcode == f"qrcodes/{os.path.basename(filename)}").first()
+        if not maquina:
+            raise HTTPException(status_code=404, detail="QR Code não encontrado")
+        qrcode_path = await qrcodes.garantir(
+            os.path.basename(filename), qrcodes.conteudo_maquina(maquina.codigo, maquina.nome)
+        )
+    return FileResponse(qrcode_path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
 @router.get("/codigo/{codigo}", response_model=MaquinaSchema)
 async def get_maquina_by_codigo(
@@ -48,13 +54,26 @@ async def get_maquina_by_codigo(
 
 @router.get("/", response_model=List[MaquinaSchema])
 async def get_maquinas(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Retorna a lista de máquinas ativas."""
-    maquinas = db.query(Maquina).filter(Maquina.ativo == True).offset(skip).limit(limit).all()
+    """
+    Retorna a lista de máquinas ativas.
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
+    query = db.query(Maquina).filter(Maquina.ativo == True)
+    try:
+        query = paginar(query, ORDENACAO_MAQUINAS, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    maquinas, next_cursor = proxima_pagina(query.all(), ORDENACAO_MAQUINAS, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return maquinas
 
 @router.get("/admin/page", response_class=HTMLResponse)
@@ -68,7 +87,7 @@ async def machines_admin_page(request: Request, current_user: dict = Depends(get
         {"request": request, "active_page": "machines"}
     )
 
-@router.get("/{maquina_id}", response_model=MaquinaSchema)
+@router.get("/{maquina_id:int}", response_model=MaquinaSchema)
 async def get_maquina(
     maquina_id: int, 
     db: Session = Depends(get_db),
@@ -105,37 +124,21 @@ async def create_maquina(
     # Criar nova máquina
     db_maquina = Maquina(**maquina.dict())
     
-    # Gerar e salvar QR code para a máquina
-    qr_code_filename = f"maquina_{int(time.time())}_{uuid.uuid4().hex[:8]}.png"
-    qr_code_path = os.path.join(QR_CODES_DIR, qr_code_filename)
-    
-    # O QR code conterá o ID da máquina para ser escaneado pelo operador
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    
-    # O conteúdo do QR code será uma URL relativa que pode ser acessada pelo operador
-    # para vincular a máquina na operação
-    qr_data = f"maquina:{maquina.codigo}:{maquina.nome}"
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill='black', back_color='white')
-    img.save(qr_code_path)
+    # QR code com nome derivado do conteúdo; a imagem é gerada fora da requisição
+    qr_data = qrcodes.conteudo_maquina(maquina.codigo, maquina.nome)
+    qr_code_filename = qrcodes.nome_arquivo("maquina", qr_data)
+    qrcodes.agendar(qr_code_filename, qr_data)
     
     # Salvar o caminho relativo no banco de dados
-    relative_path = f"qrcodes/{qr_code_filename}"
-    db_maquina.qrcode = relative_path
+    db_maquina.qrcode = f"qrcodes/{qr_code_filename}"
     
     db.add(db_maquina)
     db.commit()
     db.refresh(db_maquina)
+    indice.atualizar("maquina", db_maquina)
     return db_maquina
 
-@router.put("/{maquina_id}", response_model=MaquinaSchema)
+@router.put("/{maquina_id:int}", response_model=MaquinaSchema)
 async def update_maquina(
     maquina_id: int, 
     maquina: MaquinaUpdate, 
@@ -165,15 +168,29 @@ async def update_maquina(
             )
     
     # Atualizar máquina
+    status_anterior = (db_maquina.status, db_maquina.ativo)
     maquina_data = maquina.dict(exclude_unset=True)
     for key, value in maquina_data.items():
         setattr(db_maquina, key, value)
     
+    # Código ou nome alterados mudam o conteúdo do QR code (e, portanto, o arquivo)
+    qr_data = qrcodes.conteudo_maquina(db_maquina.codigo, db_maquina.nome)
+    qr_code_filename = qrcodes.nome_arquivo("maquina", qr_data)
+    if db_maquina.qrcode != f"qrcodes/{qr_code_filename}":
+        qrcodes.agendar(qr_code_filename, qr_data)
+        db_maquina.qrcode = f"qrcodes/{qr_code_filename}"
+    
     db.commit()
     db.refresh(db_maquina)
+    indice.atualizar("maquina", db_maquina)
+    invalidar_mapa()
+    
+    # Notificar os clientes que acompanham a máquina
+    if (db_maquina.status, db_maquina.ativo) != status_anterior:
+        publicar_maquina(db_maquina)
     return db_maquina
 
-@router.delete("/{maquina_id}", response_model=MaquinaSchema)
+@router.delete("/{maquina_id:int}", response_model=MaquinaSchema)
 async def delete_maquina(
     maquina_id: int, 
     db: Session = Depends(get_db),
@@ -195,54 +212,18 @@ async def delete_maquina(
     # Desativar máquina (exclusão lógica)
     db_maquina.ativo = False
     db.commit()
+    indice.remover("maquina", db_maquina.id)
+    invalidar_mapa()
+    publicar_maquina(db_maquina)
     return db_maquina
 
-@router.get("/qrcode/{maquina_id}")
-async def get_qrcode(
-    maquina_id: int,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    """Retorna a imagem do QR code de uma máquina."""
-    maquina = db.query(Maquina).filter(Maquina.id == maquina_id).first()
-    if not maquina or not maquina.qrcode:
-        raise HTTPException(status_code=404, detail="QR Code não encontrado")
-    
-    file_path = f"app/static/{maquina.qrcode}"
-    return FileResponse(file_path)
-
 @router.get("/fases")
 async def get_maquinas_por_fase(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Retorna todas as máquinas agrupadas por fase."""
-    # Buscar todas as fases
-    fases = db.query(Fase).filter(Fase.ativo == True).all()
-    
-    resultado = []
-    for fase in fases:
-        maquinas_associadas = (
-            db.query(FaseMaquina, Maquina)
-            .join(Maquina, FaseMaquina.maquina_id == Maquina.id)
-            .filter(FaseMaquina.fase_id == fase.id)
-            .order_by(FaseMaquina.ordem)
-            .all()
-        )
-        
-        maquinas_lista = []
-        for assoc, maquina in maquinas_associadas:
-            maquina_dict = maquina.to_dict()
-            maquina_dict["ordem"] = assoc.ordem
-            maquinas_lista.append(maquina_dict)
-        
-        resultado.append({
-            "fase_id": fase.id,
-            "fase_nome": fase.nome,
-            "maquinas": maquinas_lista
-        })
-    
-    return resultado
+    return maquinas_por_fase(db)
 
 @router.post("/associar-fase")
 async def associar_maquina_fase(
@@ -277,6 +258,7 @@ async def associar_maquina_fase(
         # Atualizar a ordem
         existing.ordem = ordem
         db.commit()
+        invalidar_mapa()
         return {"message": "Ordem da máquina atualizada na fase"}
     
     # Criar nova associação
@@ -288,6 +270,7 @@ async def associar_maquina_fase(
     
     db.add(nova_associacao)
     db.commit()
+    invalidar_mapa()
     
     return {"message": "Máquina associada à fase com sucesso"}
 
@@ -318,6 +301,7 @@ async def desassociar_maquina_fase(
     # Remover a associação
     db.delete(associacao)
     db.commit()
+    invalidar_mapa()
     
     return {"message": "Associação removida com sucesso"}
 
@@ -355,4 +339,5 @@ async def reordenar_maquinas_fase(
             associacao.ordem = ordem
     
     db.commit()
+    invalidar_mapa()
     return {"message": "Ordem das máquinas atualizada com sucesso"}
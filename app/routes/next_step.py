@@ -3,7 +3,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.core.database import get_db
 from app.core.security import get_current_user
-from app.models.models import Lote, Produto, Fase, ProdutoFase, FaseLote, Apontamento
+from app.services import open_appointments
+from app.models.models import Lote, Produto, Fase, ProdutoFase, FaseLote
 from typing import List, Optional
 
 router = APIRouter()
@@ -94,22 +95,16 @@ async def get_next_steps(
                 fase_info["proximo"] = True
                 
                 # Verificar se já existe um apontamento em andamento para esta fase
-                apontamento_em_andamento = db.query(Apontamento).filter(
-                    Apontamento.lote_id == lote.id,
-                    Apontamento.fase_id == fase.id,
-                    Apontamento.data_inicio.isnot(None),
-                    Apontamento.data_fim.is_(None),
-                    Apontamento.ativo == True
-                ).first()
+                apontamento_em_andamento = open_appointments.por_fase(db, lote.id, produto.id, fase.id)
                 
                 fase_info["em_andamento"] = bool(apontamento_em_andamento)
                 if apontamento_em_andamento:
-                    fase_info["apontamento_id"] = apontamento_em_andamento.id
-                    fase_info["operador_id"] = apontamento_em_andamento.usuario_id
+                    fase_info["apontamento_id"] = apontamento_em_andamento.apontamento_id
+                    fase_info["operador_id"] = apontamento_em_andamento.operador_id
                     
                     # Buscar nome do operador
                     from app.models.models import Usuario
-                    operador = db.query(Usuario).filter(Usuario.id == apontamento_em_andamento.usuario_id).first()
+                    operador = db.query(Usuario).filter(Usuario.id == apontamento_em_andamento.operador_id).first()
                     fase_info["operador_nome"] = operador.nome if operador else "Desconhecido"
                 
         proximos_passos.append(fase_info)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.pagination import paginar, proxima_pagina
 from app.core.security import get_current_user
 from app.models.models import Operador
 from app.schemas.schemas import Operador as OperadorSchema
@@ -9,15 +10,30 @@ from app.schemas.schemas import OperadorCreate, OperadorUpdate
 
 router = APIRouter()
 
+ORDENACAO_OPERADORES = [(Operador.id, False)]
+
 @router.get("/", response_model=List[OperadorSchema])
 async def get_operadores(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Retorna a lista de operadores ativos."""
-    operadores = db.query(Operador).filter(Operador.ativo == True).offset(skip).limit(limit).all()
+    """
+    Retorna a lista de operadores ativos.
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
+    query = db.query(Operador).filter(Operador.ativo == True)
+    try:
+        query = paginar(query, ORDENACAO_OPERADORES, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    operadores, next_cursor = proxima_pagina(query.all(), ORDENACAO_OPERADORES, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return operadores
 
 @router.get("/{operador_id}", response_model=OperadorSchema)
@@ -1,25 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.pagination import paginar, proxima_pagina
 from app.core.security import get_current_user
 from app.models.models import Fase, ChecklistItem
 from app.schemas.schemas import Fase as FaseSchema
 from app.schemas.schemas import FaseCreate, FaseUpdate
 from app.schemas.schemas import ChecklistItem as ChecklistItemSchema
 from app.schemas.schemas import ChecklistItemCreate, ChecklistItemUpdate
+from app.services.machine_routing import invalidar_mapa
 
 router = APIRouter()
 
+ORDENACAO_FASES = [(Fase.id, False)]
+
 @router.get("/", response_model=List[FaseSchema])
 async def get_fases(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Retorna a lista de fases ativas."""
-    fases = db.query(Fase).filter(Fase.ativo == True).offset(skip).limit(limit).all()
+    """
+    Retorna a lista de fases ativas.
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
+    query = db.query(Fase).filter(Fase.ativo == True)
+    try:
+        query = paginar(query, ORDENACAO_FASES, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    fases, next_cursor = proxima_pagina(query.all(), ORDENACAO_FASES, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return fases
 
 @router.get("/{fase_id}", response_model=FaseSchema)
@@ -61,6 +78,7 @@ async def create_fase(
     db.add(db_fase)
     db.commit()
     db.refresh(db_fase)
+    invalidar_mapa()
     return db_fase
 
 @router.put("/{fase_id}", response_model=FaseSchema)
@@ -99,6 +117,7 @@ async def update_fase(
     
     db.commit()
     db.refresh(db_fase)
+    invalidar_mapa()
     return db_fase
 
 @router.delete("/{fase_id}", response_model=FaseSchema)
@@ -123,6 +142,7 @@ async def delete_fase(
     # Desativar fase (exclusão lógica)
     db_fase.ativo = False
     db.commit()
+    invalidar_mapa()
     return db_fase
 
 # Rotas para gerenciar checklist de uma fase
@@ -1,32 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.pagination import paginar, proxima_pagina
 from app.core.security import get_current_user
 from app.models.models import Produto, ProdutoFase
 from app.schemas.schemas import Produto as ProdutoSchema
 from app.schemas.schemas import ProdutoCreate, ProdutoUpdate, ProdutoFase as ProdutoFaseSchema
 from app.schemas.schemas import ProdutoFaseCreate, ProdutoFaseUpdate
+from app.services.product_catalog import produtos_com_totais
+from app.services.scan_index import indice
 
 router = APIRouter()
 
+ORDENACAO_PRODUTOS = [(Produto.id, False)]
+
 @router.get("/", response_model=List[ProdutoSchema])
 async def get_produtos(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Retorna a lista de produtos ativos com o número de fases."""
-    # Consulta produtos ativos
-    produtos = db.query(Produto).filter(Produto.ativo == True).offset(skip).limit(limit).all()
-    
-    # Adicionar informação sobre o número de fases para cada produto
-    for produto in produtos:
-        # Consultar quantas fases o produto tem
-        num_fases = db.query(ProdutoFase).filter(ProdutoFase.produto_id == produto.id).count()
-        setattr(produto, 'num_fases', num_fases)
-        
+    """
+    Retorna a lista de produtos ativos com o número de fases, o tempo estimado
+    das fases e o número de lotes em aberto, em uma única consulta.
+    O cursor da próxima página é retornado no cabeçalho X-Next-Cursor.
+    """
+    query = produtos_com_totais(db)
+    try:
+        query = paginar(query, ORDENACAO_PRODUTOS, limit, skip=skip, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    produtos, next_cursor = proxima_pagina(query.all(), ORDENACAO_PRODUTOS, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return produtos
 
 @router.get("/{produto_id}", response_model=ProdutoSchema)
@@ -76,6 +87,7 @@ async def create_produto(
     db.add(db_produto)
     db.commit()
     db.refresh(db_produto)
+    indice.atualizar("produto", db_produto)
     return db_produto
 
 @router.put("/{produto_id}", response_model=ProdutoSchema)
@@ -118,6 +130,7 @@ async def update_produto(
     
     db.commit()
     db.refresh(db_produto)
+    indice.atualizar("produto", db_produto)
     return db_produto
 
 @router.delete("/{produto_id}", response_model=ProdutoSchema)
@@ -142,6 +155,7 @@ async def delete_produto(
     # Desativar produto (exclusão lógica)
     db_produto.ativo = False
     db.commit()
+    indice.remover("produto", db_produto.id)
     return db_produto
 
 # Rotas para gerenciar fases de um produto
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.database import get_async_db
+from app.core.security import get_current_user
+from app.models.maquina import Maquina
+from app.models.models import Lote, Produto
+from app.services import qrcodes
+
+router = APIRouter()
+
+# URLs versionadas (?v=<versão do conteúdo>) nunca mudam de imagem
+CACHE_IMUTAVEL = "private, max-age=31536000, immutable"
+
+# Sem versão a imagem pode mudar (ex.: código alterado): o navegador revalida pelo ETag
+CACHE_REVALIDAR = "private, no-cache"
+
+@router.get("/{tipo}/{registro_id}")
+async def get_qrcode(
+    tipo: str,
+    registro_id: int,
+    request: Request,
+    format: str = "png",
+    size: int = Query(10, ge=1, le=40),
+    border: int = Query(4, ge=0, le=16),
+    v: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Retorna a imagem do QR code de uma máquina, lote ou produto.
+    `tipo` é "maquina", "lote" ou "produto"; `size` é o tamanho de cada módulo
+    em pixels e `border` a margem em módulos. A imagem é renderizada sob demanda
+    e mantida em cache na memória. `v` é a versão do conteúdo (qrcodes.versao, a
+    mesma do nome do arquivo do QR code da máquina); com ela a resposta é imutável.
+    """
+    if format not in qrcodes.FORMATOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato inválido. Use: {', '.join(qrcodes.FORMATOS)}"
+        )
+
+    conteudo = await conteudo_qrcode(db, tipo, registro_id)
+
+    headers = {
+        "ETag": qrcodes.etag(conteudo, format, size, border),
+        "Cache-Control": CACHE_IMUTAVEL if v == qrcodes.versao(conteudo) else CACHE_REVALIDAR
+    }
+    if qrcodes.etag_confere(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    dados = await qrcodes.imagem(conteudo, format, size, border)
+    return Response(content=dados, media_type=qrcodes.FORMATOS[format], headers=headers)
+
+async def conteudo_qrcode(db: AsyncSession, tipo: str, registro_id: int) -> str:
+    """Lê o registro e monta o conteúdo do seu QR code."""
+    if tipo == "maquina":
+        registro = (await db.execute(
+            select(Maquina.codigo, Maquina.nome).where(Maquina.id == registro_id)
+        )).first()
+        if registro:
+            return qrcodes.conteudo_maquina(registro.codigo, registro.nome)
+    elif tipo in ("lote", "produto"):
+        modelo = Lote if tipo == "lote" else Produto
+        registro = (await db.execute(
+            select(modelo.codigo).where(modelo.id == registro_id, modelo.ativo == True)
+        )).first()
+        if registro:
+            return qrcodes.conteudo_etiqueta(tipo, registro_id, registro.codigo)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tipo inválido. Use: maquina, lote, produto"
+        )
+
+    raise HTTPException(status_code=404, detail="QR Code não encontrado")
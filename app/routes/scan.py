@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.security import get_current_user
+from app.schemas.schemas import ScanResolucao
+from app.services.scan_index import indice
+
+router = APIRouter()
+
+async def resolver(db: AsyncSession, codigos: List[str]) -> List[Dict[str, Any]]:
+    """Resolve os códigos no índice em memória, recarregando-o apenas se expirado."""
+    if len(codigos) > settings.SCAN_MAX_CODIGOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Informe no máximo {settings.SCAN_MAX_CODIGOS} códigos por requisição"
+        )
+    if not indice.valido():
+        await db.run_sync(indice.carregar)
+    return indice.resolver_varios(codigos)
+
+@router.get("/resolve")
+async def resolve_codigo(
+    codigo: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Resolve um código lido pelo scanner (máquina, lote ou produto).
+    Retorna o status ("encontrado", "nao_encontrado" ou "invalido") e as entidades.
+    """
+    return (await resolver(db, [codigo]))[0]
+
+@router.post("/resolve")
+async def resolve_codigos(
+    scan: ScanResolucao,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Resolve vários códigos lidos pelo scanner; um resultado por código, na ordem recebida."""
+    return {"resultados": await resolver(db, scan.codigos)}
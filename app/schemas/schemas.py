@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal, Union, Annotated
 from datetime import datetime
 
 # Schemas para autenticação
@@ -28,6 +28,7 @@ class UsuarioCreate(UsuarioBase):
     senha: str
 
 class UsuarioUpdate(BaseModel):
+    usuario: Optional[str] = None
     nome: Optional[str] = None
     email: Optional[EmailStr] = None
     role: Optional[str] = None
@@ -62,6 +63,8 @@ class ProdutoUpdate(BaseModel):
 class Produto(ProdutoBase):
     id: int
     num_fases: Optional[int] = None
+    tempo_estimado_fases: Optional[int] = None
+    lotes_ativos: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -135,6 +138,13 @@ class Lote(LoteBase):
     class Config:
         orm_mode = True
 
+# Status de lote conhecidos (ver STATUS_LOTE_LABELS e o comentário de Lote.status)
+StatusLote = Literal["em_producao", "em_pausa", "parado", "concluido", "cancelado"]
+
+class LoteDuplicacao(BaseModel):
+    codigos: List[str]
+    status: StatusLote = "em_producao"
+
 # Schemas para produto-lote
 class ProdutoLoteBase(BaseModel):
     lote_id: int
@@ -158,6 +168,17 @@ class ProdutoLote(ProdutoLoteBase):
     class Config:
         orm_mode = True
 
+class ProdutoLoteItem(BaseModel):
+    produto_id: int
+    quantidade: int
+    observacoes: Optional[str] = None
+
+class ProdutoLoteLote(BaseModel):
+    produtos: List[ProdutoLoteItem]
+
+class ProdutoLoteAssociacoes(BaseModel):
+    associacoes: List[ProdutoLoteCreate]
+
 # Schemas para fase-lote
 class FaseLoteBase(BaseModel):
     lote_id: int
@@ -219,6 +240,16 @@ class ApontamentoUpdate(BaseModel):
     observacoes: Optional[str] = None
     checklist_respostas: Optional[List[ChecklistRespostaCreate]] = None
 
+class ApontamentoInicio(BaseModel):
+    fase_lote_id: int
+    maquina_id: Optional[int] = None
+    observacoes: Optional[str] = None
+
+class ApontamentoFinalizacao(BaseModel):
+    apontamento_id: int
+    observacoes: Optional[str] = None
+    checklist_respostas: Optional[List[ChecklistRespostaCreate]] = None
+
 class ApontamentoResponse(BaseModel):
     id: int
     fase_lote_id: int
@@ -309,6 +340,66 @@ class ChecklistResposta(ChecklistRespostaBase):
     class Config:
         orm_mode = True
 
+class ChecklistRespostaLoteItem(BaseModel):
+    checklist_item_id: int
+    concluido: bool = False
+    observacao: Optional[str] = None
+
+class ChecklistRespostaLote(BaseModel):
+    respostas: List[ChecklistRespostaLoteItem]
+
+# Schemas para sincronização de eventos do operador
+class DadosInicioEvento(BaseModel):
+    fase_lote_id: int
+    maquina_id: Optional[int] = None
+    observacoes: Optional[str] = None
+
+class DadosApontamentoEvento(BaseModel):
+    apontamento_id: Optional[int] = None  # ausente se o início ainda não foi sincronizado
+    chave_inicio: Optional[str] = Field(None, max_length=64)  # chave do evento de início
+
+class RespostaChecklistEvento(BaseModel):
+    checklist_item_id: int
+    concluido: bool = False
+    observacao: Optional[str] = None
+
+class DadosChecklistEvento(DadosApontamentoEvento):
+    respostas: List[RespostaChecklistEvento] = []
+
+class RespostaFinalizacaoEvento(BaseModel):
+    checklist_item_id: int
+    resposta: Optional[str] = None
+
+class DadosFinalizacaoEvento(DadosApontamentoEvento):
+    observacoes: Optional[str] = None
+    checklist_respostas: Optional[List[RespostaFinalizacaoEvento]] = None
+
+class EventoApontamentoBase(BaseModel):
+    chave: str = Field(..., min_length=1, max_length=64)  # chave de idempotência gerada no cliente
+    ocorrido_em: datetime
+
+class EventoInicio(EventoApontamentoBase):
+    tipo: Literal["start"]
+    dados: DadosInicioEvento
+
+class EventoChecklist(EventoApontamentoBase):
+    tipo: Literal["checklist"]
+    dados: DadosChecklistEvento
+
+class EventoFinalizacao(EventoApontamentoBase):
+    tipo: Literal["finish"]
+    dados: DadosFinalizacaoEvento
+
+# O tipo do evento define o formato de `dados`; payloads inválidos são rejeitados com 422
+EventoApontamento = Annotated[Union[EventoInicio, EventoChecklist, EventoFinalizacao], Field(discriminator="tipo")]
+
+class SincronizacaoApontamentos(BaseModel):
+    eventos: List[EventoApontamento]
+
+# Schemas para leitura de códigos (scanner)
+class ScanResolucao(BaseModel):
+    codigos: List[str] = Field(..., min_length=1)
+
 # Schemas para máquinas
 class MaquinaBase(BaseModel):
     codigo: str
@@ -0,0 +1,177 @@
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, List, Optional
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Apontamento, Fase, Lote, Produto, Usuario
+from app.models.maquina import Maquina
+
+# Formatos aceitos pela exportação e seus tipos de conteúdo
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+COLUNAS = [
+    "id",
+    "lote_codigo",
+    "produto_codigo",
+    "produto_descricao",
+    "fase_codigo",
+    "fase_descricao",
+    "operador",
+    "maquina_codigo",
+    "maquina_descricao",
+    "status",
+    "data_inicio",
+    "data_fim",
+    "tempo_real",
+    "observacoes",
+]
+
+
+def parquet_disponivel() -> bool:
+    """Indica se o pacote opcional pyarrow está instalado."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def consulta_exportacao(data_inicio: date, data_fim: date, operador_id: Optional[int] = None):
+    """
+    Apontamentos iniciados no período (datas inclusivas) com os rótulos de
+    lote, produto, fase, operador e máquina, em ordem cronológica.
+    """
+    query = select(
+        Apontamento.id,
+        Lote.codigo.label("lote_codigo"),
+        Produto.codigo.label("produto_codigo"),
+        Produto.descricao.label("produto_descricao"),
+        Fase.codigo.label("fase_codigo"),
+        Fase.descricao.label("fase_descricao"),
+        Usuario.nome.label("operador"),
+        Maquina.codigo.label("maquina_codigo"),
+        Maquina.descricao.label("maquina_descricao"),
+        Apontamento.status,
+        Apontamento.data_inicio,
+        Apontamento.data_fim,
+        Apontamento.tempo_real,
+        Apontamento.observacoes
+    ).outerjoin(
+        Lote, Lote.id == Apontamento.lote_id
+    ).outerjoin(
+        Produto, Produto.id == Apontamento.produto_id
+    ).outerjoin(
+        Fase, Fase.id == Apontamento.fase_id
+    ).outerjoin(
+        Usuario, Usuario.id == Apontamento.operador_id
+    ).outerjoin(
+        Maquina, Maquina.id == Apontamento.maquina_id
+    ).where(
+        Apontamento.data_inicio >= datetime.combine(data_inicio, time.min),
+        Apontamento.data_inicio < datetime.combine(data_fim + timedelta(days=1), time.min)
+    )
+
+    if operador_id:
+        query = query.where(Apontamento.operador_id == operador_id)
+
+    # Usa o índice ix_apontamentos_data_inicio
+    return query.order_by(Apontamento.data_inicio, Apontamento.id)
+
+
+def _partes(data_inicio: date, data_fim: date, operador_id: Optional[int]) -> Iterator[List]:
+    """
+    Lê o resultado em blocos de EXPORT_LOTE_LINHAS com cursor no servidor
+    (yield_per), mantendo a memória constante independentemente do período.
+    A sessão é própria do gerador, pois vive enquanto a resposta é transmitida.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            consulta_exportacao(data_inicio, data_fim, operador_id).execution_options(
+                yield_per=settings.EXPORT_LOTE_LINHAS
+            )
+        )
+        for linhas in result.partitions():
+            yield linhas
+    finally:
+        db.close()
+
+
+def exportar_csv(data_inicio: date, data_fim: date, operador_id: Optional[int] = None) -> Iterator[str]:
+    """Gera o CSV em blocos, começando pelo cabeçalho."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUNAS)
+    yield buffer.getvalue()
+
+    for linhas in _partes(data_inicio, data_fim, operador_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(linhas)
+        yield buffer.getvalue()
+
+
+class _SaidaParquet(io.RawIOBase):
+    """Destino do ParquetWriter que entrega os bytes escritos a cada grupo de linhas."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def exportar_parquet(data_inicio: date, data_fim: date, operador_id: Optional[int] = None) -> Iterator[bytes]:
+    """Gera o arquivo Parquet com um grupo de linhas por bloco lido do banco (requer pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("lote_codigo", pa.string()),
+        ("produto_codigo", pa.string()),
+        ("produto_descricao", pa.string()),
+        ("fase_codigo", pa.string()),
+        ("fase_descricao", pa.string()),
+        ("operador", pa.string()),
+        ("maquina_codigo", pa.string()),
+        ("maquina_descricao", pa.string()),
+        ("status", pa.string()),
+        ("data_inicio", pa.timestamp("us")),
+        ("data_fim", pa.timestamp("us")),
+        ("tempo_real", pa.int64()),
+        ("observacoes", pa.string()),
+    ])
+
+    saida = _SaidaParquet()
+    writer = pq.ParquetWriter(saida, schema)
+    try:
+        for linhas in _partes(data_inicio, data_fim, operador_id):
+            colunas = list(zip(*linhas))
+            writer.write_table(pa.table(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, schema)],
+                schema=schema
+            ))
+            yield saida.drenar()
+    finally:
+        writer.close()
+    yield saida.drenar()
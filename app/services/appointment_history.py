@@ -0,0 +1,84 @@
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, select
+from app.core.pagination import paginar, proxima_pagina
+from app.models.models import Apontamento, Lote, Produto, Fase, FaseLote
+
+# Mais recentes primeiro; o id desempata apontamentos iniciados no mesmo instante
+ORDENACAO_HISTORICO = [(Apontamento.data_inicio, True), (Apontamento.id, True)]
+
+
+def get_history_page(
+    db: Session,
+    operador_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Monta uma página do histórico de apontamentos do operador com uma única consulta.
+    Retorna as linhas já formatadas e o cursor da próxima página (ou None).
+    """
+    # Tempo estimado da fase no lote, resolvido na própria consulta
+    tempo_estimado = (
+        select(FaseLote.tempo_estimado)
+        .where(
+            FaseLote.lote_id == Apontamento.lote_id,
+            FaseLote.fase_id == Apontamento.fase_id,
+            FaseLote.produto_id == Apontamento.produto_id,
+            FaseLote.ativo == True
+        )
+        .limit(1)
+        .correlate(Apontamento)
+        .scalar_subquery()
+    )
+
+    query = db.query(
+        Apontamento.id,
+        Apontamento.data_inicio,
+        Apontamento.data_fim,
+        Lote.codigo.label("lote_codigo"),
+        Produto.descricao.label("produto"),
+        Fase.descricao.label("fase"),
+        tempo_estimado.label("tempo_estimado")
+    ).join(
+        Lote, and_(Lote.id == Apontamento.lote_id, Lote.ativo == True)
+    ).outerjoin(
+        Produto, and_(Produto.id == Apontamento.produto_id, Produto.ativo == True)
+    ).outerjoin(
+        Fase, and_(Fase.id == Apontamento.fase_id, Fase.ativo == True)
+    ).filter(
+        Apontamento.operador_id == operador_id,
+        Apontamento.data_inicio.isnot(None)
+    )
+
+    # Paginação por chave (data_inicio, id), sem OFFSET
+    rows = paginar(query, ORDENACAO_HISTORICO, limit, cursor=cursor).all()
+    rows, next_cursor = proxima_pagina(rows, ORDENACAO_HISTORICO, limit)
+
+    result = []
+    for row in rows:
+        # Calcular tempo real em minutos
+        tempo_real = None
+        if row.data_fim:
+            tempo_real = round((row.data_fim - row.data_inicio).total_seconds() / 60, 2)
+
+        # Determinar status
+        status = "Em andamento"
+        if row.data_fim:
+            status = "Finalizado"
+            if row.tempo_estimado and tempo_real > row.tempo_estimado:
+                status = "Atrasado"
+
+        result.append({
+            "id": row.id,
+            "data": row.data_inicio.strftime("%d/%m/%Y"),
+            "lote_codigo": row.lote_codigo,
+            "produto": row.produto or "",
+            "fase": row.fase or "",
+            "inicio": row.data_inicio.strftime("%H:%M"),
+            "fim": row.data_fim.strftime("%H:%M") if row.data_fim else "-",
+            "tempo_real": f"{tempo_real} min" if tempo_real else "-",
+            "status": status
+        })
+
+    return result, next_cursor
@@ -0,0 +1,211 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from app.models.models import Apontamento, EventoSincronizado, FaseLote, Lote
+from app.services import open_appointments, rollup
+from app.services.checklist_respostas import gravar_respostas, item_obrigatorio_pendente
+
+# Resultado de cada evento: (status, apontamento_id, detalhe)
+Resultado = Tuple[str, Optional[int], Optional[str]]
+
+
+def _momento(ocorrido_em: datetime) -> datetime:
+    """Converte o horário do cliente para UTC sem fuso, limitado ao horário atual do servidor."""
+    if ocorrido_em.tzinfo is not None:
+        ocorrido_em = ocorrido_em.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(ocorrido_em, datetime.utcnow())
+
+
+def _resolver_apontamento(db: Session, operador_id: int, dados: Dict[str, Any]) -> Optional[Apontamento]:
+    """
+    Localiza o apontamento do evento pelo ID ou, para apontamentos iniciados
+    offline, pela chave do evento de início (`chave_inicio`).
+    """
+    apontamento_id = dados.get("apontamento_id")
+    if not apontamento_id and dados.get("chave_inicio"):
+        inicio = db.get(EventoSincronizado, dados["chave_inicio"])
+        if inicio and inicio.operador_id == operador_id:
+            apontamento_id = inicio.apontamento_id
+    return db.get(Apontamento, apontamento_id) if apontamento_id else None
+
+
+def _aplicar_inicio(db: Session, operador_id: int, dados: Dict[str, Any], momento: datetime) -> Resultado:
+    """Inicia um apontamento; se o operador já estiver nesta fase, o evento é ignorado."""
+    fase_lote = db.query(FaseLote).filter(
+        FaseLote.id == dados.get("fase_lote_id"),
+        FaseLote.ativo == True
+    ).first()
+    if not fase_lote:
+        return "erro", None, "Fase do lote não encontrada"
+
+    aberto = open_appointments.por_fase(db, fase_lote.lote_id, fase_lote.produto_id, fase_lote.fase_id)
+    if not aberto and db.query(Apontamento.id).filter(
+        Apontamento.lote_id == fase_lote.lote_id,
+        Apontamento.produto_id == fase_lote.produto_id,
+        Apontamento.fase_id == fase_lote.fase_id,
+        Apontamento.status == "finalizado"
+    ).first():
+        return "conflito", None, "Esta fase já foi concluída"
+    if aberto:
+        if aberto.operador_id == operador_id:
+            return "ignorado", aberto.apontamento_id, "Apontamento já iniciado"
+        return "conflito", None, "Esta fase já está sendo executada por outro operador"
+
+    if open_appointments.por_operador(db, operador_id):
+        return "conflito", None, open_appointments.MENSAGEM_OPERADOR_OCUPADO
+
+    apontamento = Apontamento(
+        lote_id=fase_lote.lote_id,
+        produto_id=fase_lote.produto_id,
+        fase_id=fase_lote.fase_id,
+        operador_id=operador_id,
+        maquina_id=dados.get("maquina_id"),
+        data_inicio=momento,
+        status="iniciado",
+        observacoes=dados.get("observacoes")
+    )
+    db.add(apontamento)
+    db.flush()
+
+    # Um início concorrente da mesma fase desfaz o lote inteiro (ConflitoApontamento)
+    open_appointments.registrar(db, apontamento)
+    return "aplicado", apontamento.id, None
+
+
+def _aplicar_checklist(db: Session, operador_id: int, dados: Dict[str, Any], momento: datetime) -> Resultado:
+    """Grava as respostas de checklist do evento."""
+    apontamento = _resolver_apontamento(db, operador_id, dados)
+    if not apontamento:
+        return "erro", None, "Apontamento não encontrado"
+    if apontamento.operador_id != operador_id:
+        return "conflito", apontamento.id, "Você não tem permissão para acessar este apontamento"
+
+    respostas = {resposta["checklist_item_id"]: resposta for resposta in dados["respostas"]}
+    try:
+        gravar_respostas(db, apontamento, respostas)
+    except ValueError as e:
+        return "erro", apontamento.id, str(e)
+    return "aplicado", apontamento.id, None
+
+
+def _concluir_lote_se_completo(db: Session, lote_id: int):
+    """Marca o lote como concluído quando todas as suas fases têm apontamento finalizado."""
+    lote = db.query(Lote).filter(Lote.id == lote_id, Lote.ativo == True).first()
+    if not lote or lote.status == "concluido":
+        return
+
+    fases_pendentes = db.scalar(
+        select(func.count(FaseLote.id)).where(
+            FaseLote.lote_id == lote_id,
+            FaseLote.ativo == True,
+            ~select(Apontamento.id).where(
+                Apontamento.lote_id == FaseLote.lote_id,
+                Apontamento.produto_id == FaseLote.produto_id,
+                Apontamento.fase_id == FaseLote.fase_id,
+                Apontamento.status == "finalizado"
+            ).exists()
+        )
+    )
+    if fases_pendentes == 0:
+        lote.status = "concluido"
+
+
+def _aplicar_finalizacao(db: Session, operador_id: int, dados: Dict[str, Any], momento: datetime) -> Resultado:
+    """Finaliza o apontamento com o horário em que o operador registrou o evento."""
+    apontamento = _resolver_apontamento(db, operador_id, dados)
+    if not apontamento:
+        return "erro", None, "Apontamento não encontrado"
+    if apontamento.operador_id != operador_id:
+        return "conflito", apontamento.id, "Você não tem permissão para finalizar este apontamento"
+    if apontamento.data_fim:
+        return "ignorado", apontamento.id, "Este apontamento já foi finalizado"
+
+    # Respostas enviadas junto com a finalização (mesmo formato de /appointments/finish)
+    respostas = {
+        resposta["checklist_item_id"]: {"concluido": True, "observacao": resposta["resposta"]}
+        for resposta in dados.get("checklist_respostas") or []
+    }
+    try:
+        gravar_respostas(db, apontamento, respostas)
+    except ValueError as e:
+        return "erro", apontamento.id, str(e)
+
+    item_pendente = item_obrigatorio_pendente(db, apontamento.id, apontamento.fase_id)
+    if item_pendente:
+        return "conflito", apontamento.id, f"Item obrigatório do checklist não concluído: {item_pendente.descricao}"
+
+    apontamento.data_fim = max(momento, apontamento.data_inicio)
+    apontamento.status = "finalizado"
+    apontamento.tempo_real = int((apontamento.data_fim - apontamento.data_inicio).total_seconds() // 60)
+    if dados.get("observacoes"):
+        apontamento.observacoes = dados["observacoes"]
+
+    open_appointments.liberar(db, apontamento.id)
+    rollup.aplicar(db, rollup.contribuicao(db, apontamento))
+    db.flush()
+
+    _concluir_lote_se_completo(db, apontamento.lote_id)
+    return "aplicado", apontamento.id, None
+
+
+APLICADORES = {
+    "start": _aplicar_inicio,
+    "checklist": _aplicar_checklist,
+    "finish": _aplicar_finalizacao,
+}
+
+
+def sincronizar(db: Session, operador_id: int, eventos: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Reaplica, em ordem e em uma única transação, os eventos registrados offline.
+    Cada evento é identificado por uma chave de idempotência: eventos já
+    processados não são reaplicados e devolvem o resultado original.
+    Conflitos são informados por evento, sem interromper o lote.
+    """
+    resultados = []
+    for evento in eventos:
+        registrado = db.get(EventoSincronizado, evento.chave)
+        if registrado:
+            if registrado.operador_id != operador_id:
+                resultados.append({
+                    "chave": evento.chave,
+                    "status": "erro",
+                    "apontamento_id": None,
+                    "detalhe": "Chave de evento já utilizada",
+                    "duplicado": True
+                })
+                continue
+            resultados.append({
+                "chave": registrado.chave,
+                "status": registrado.status,
+                "apontamento_id": registrado.apontamento_id,
+                "detalhe": registrado.detalhe,
+                "duplicado": True
+            })
+            continue
+
+        momento = _momento(evento.ocorrido_em)
+        status, apontamento_id, detalhe = APLICADORES[evento.tipo](db, operador_id, evento.dados.dict(), momento)
+
+        db.add(EventoSincronizado(
+            chave=evento.chave,
+            operador_id=operador_id,
+            tipo=evento.tipo,
+            apontamento_id=apontamento_id,
+            status=status,
+            detalhe=detalhe,
+            ocorrido_em=momento
+        ))
+        db.flush()
+
+        resultados.append({
+            "chave": evento.chave,
+            "status": status,
+            "apontamento_id": apontamento_id,
+            "detalhe": detalhe,
+            "duplicado": False
+        })
+
+    db.commit()
+    return resultados
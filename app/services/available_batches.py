@@ -0,0 +1,60 @@
+import hashlib
+import json
+from typing import Any, Dict, List
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func
+from app.models.models import Lote, Produto, ProdutoLote
+
+# Status de lote que aparecem para o operador
+AVAILABLE_STATUSES = ["em_producao", "em_pausa"]
+
+
+def primeiro_produto_subquery(db: Session):
+    """Subconsulta com o primeiro produto ativo de cada lote (critério do antigo .first())."""
+    return db.query(
+        ProdutoLote.lote_id.label("lote_id"),
+        func.min(ProdutoLote.id).label("produto_lote_id")
+    ).filter(
+        ProdutoLote.ativo == True
+    ).group_by(
+        ProdutoLote.lote_id
+    ).subquery()
+
+
+def get_available_batches(db: Session) -> List[Dict[str, Any]]:
+    """Retorna os lotes disponíveis para o operador com uma única consulta."""
+    primeiro_produto = primeiro_produto_subquery(db)
+
+    rows = db.query(
+        Lote.id,
+        Lote.codigo,
+        Lote.status,
+        Produto.descricao.label("produto")
+    ).outerjoin(
+        primeiro_produto, primeiro_produto.c.lote_id == Lote.id
+    ).outerjoin(
+        ProdutoLote, ProdutoLote.id == primeiro_produto.c.produto_lote_id
+    ).outerjoin(
+        Produto, and_(Produto.id == ProdutoLote.produto_id, Produto.ativo == True)
+    ).filter(
+        Lote.status.in_(AVAILABLE_STATUSES),
+        Lote.ativo == True
+    ).order_by(
+        Lote.data_criacao.desc()
+    ).all()
+
+    return [
+        {
+            "id": row.id,
+            "codigo": row.codigo,
+            "produto": row.produto or "",
+            "status": row.status
+        }
+        for row in rows
+    ]
+
+
+def compute_etag(payload: Any) -> str:
+    """Calcula um ETag forte a partir do conteúdo serializado."""
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
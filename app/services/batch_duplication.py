@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import Any, Dict, List
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from app.models.models import FaseLote, Lote, ProdutoLote
+
+
+def duplicar_lote(
+    db: Session,
+    lote_original: Lote,
+    codigos: List[str],
+    status: str = "em_producao"
+) -> List[Dict[str, Any]]:
+    """
+    Cria um lote para cada código informado, copiando os produtos e as fases
+    ativos do lote original. Lotes, produtos e fases são inseridos em lote
+    (um INSERT em massa por tabela), sem commit.
+    Retorna um resultado por código, na ordem recebida: "criado" ou "erro".
+    """
+    resultados = [{"codigo": codigo.strip(), "status": "criado", "lote_id": None, "detalhe": None} for codigo in codigos]
+
+    # Códigos vazios, repetidos na requisição ou já cadastrados
+    vistos = set()
+    for resultado in resultados:
+        if not resultado["codigo"]:
+            resultado.update(status="erro", detalhe="Código de lote vazio")
+        elif resultado["codigo"] in vistos:
+            resultado.update(status="erro", detalhe="Código repetido na requisição")
+        vistos.add(resultado["codigo"])
+
+    existentes = set(db.scalars(select(Lote.codigo).where(Lote.codigo.in_(vistos))))
+    for resultado in resultados:
+        if resultado["status"] == "criado" and resultado["codigo"] in existentes:
+            resultado.update(status="erro", detalhe="Código de lote já existe")
+
+    a_criar = [resultado for resultado in resultados if resultado["status"] == "criado"]
+    if not a_criar:
+        return resultados
+
+    agora = datetime.utcnow()
+    novos = db.execute(
+        insert(Lote).returning(Lote.id, Lote.codigo),
+        [
+            {
+                "codigo": resultado["codigo"],
+                "descricao": f"{lote_original.descricao or lote_original.codigo} (Duplicado)",
+                "status": status,
+                "observacoes": lote_original.observacoes,
+                "data_criacao": agora,
+                "ativo": True
+            }
+            for resultado in a_criar
+        ]
+    ).all()
+    ids = {codigo: lote_id for lote_id, codigo in novos}
+    for resultado in a_criar:
+        resultado["lote_id"] = ids[resultado["codigo"]]
+
+    # Estrutura do lote original, lida uma única vez
+    produtos_lote = db.scalars(
+        select(ProdutoLote).where(ProdutoLote.lote_id == lote_original.id, ProdutoLote.ativo == True)
+    ).all()
+    fases_lote = db.scalars(
+        select(FaseLote).where(FaseLote.lote_id == lote_original.id, FaseLote.ativo == True)
+    ).all()
+
+    if produtos_lote:
+        db.execute(insert(ProdutoLote), [
+            {
+                "lote_id": lote_id,
+                "produto_id": produto_lote.produto_id,
+                "quantidade": produto_lote.quantidade,
+                "observacoes": produto_lote.observacoes,
+                "data_associacao": agora,
+                "ativo": True
+            }
+            for lote_id in ids.values()
+            for produto_lote in produtos_lote
+        ])
+
+    if fases_lote:
+        db.execute(insert(FaseLote), [
+            {
+                "lote_id": lote_id,
+                "fase_id": fase_lote.fase_id,
+                "produto_id": fase_lote.produto_id,
+                "ordem": fase_lote.ordem,
+                "tempo_estimado": fase_lote.tempo_estimado,
+                "tempo_prateleira_horas": fase_lote.tempo_prateleira_horas,
+                "ativo": True
+            }
+            for lote_id in ids.values()
+            for fase_lote in fases_lote
+        ])
+
+    return resultados
@@ -0,0 +1,106 @@
+from typing import Any, Dict, List
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from app.models.models import FaseLote, Lote, Produto, ProdutoFase, ProdutoLote
+
+
+def associar_produtos(db: Session, associacoes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Associa produtos a lotes e materializa as fases de cada produto no lote.
+    Lotes, produtos e associações existentes são validados com uma consulta
+    cada; produtos e fases são gravados com um INSERT em massa por tabela, sem commit.
+    Cada associação tem lote_id, produto_id, quantidade e observacoes.
+    Retorna um resultado por associação, na ordem recebida: "criado" ou "erro".
+    """
+    resultados = [
+        {
+            "lote_id": associacao["lote_id"],
+            "produto_id": associacao["produto_id"],
+            "status": "criado",
+            "produto_lote_id": None,
+            "fases": 0,
+            "detalhe": None
+        }
+        for associacao in associacoes
+    ]
+
+    lote_ids = {resultado["lote_id"] for resultado in resultados}
+    produto_ids = {resultado["produto_id"] for resultado in resultados}
+
+    lotes = set(db.scalars(select(Lote.id).where(Lote.id.in_(lote_ids), Lote.ativo == True)))
+    produtos = set(db.scalars(select(Produto.id).where(Produto.id.in_(produto_ids), Produto.ativo == True)))
+    existentes = set(db.execute(
+        select(ProdutoLote.lote_id, ProdutoLote.produto_id).where(
+            ProdutoLote.lote_id.in_(lote_ids),
+            ProdutoLote.produto_id.in_(produto_ids),
+            ProdutoLote.ativo == True
+        )
+    ).tuples())
+
+    vistos = set()
+    for resultado in resultados:
+        par = (resultado["lote_id"], resultado["produto_id"])
+        if resultado["lote_id"] not in lotes:
+            resultado.update(status="erro", detalhe="Lote não encontrado")
+        elif resultado["produto_id"] not in produtos:
+            resultado.update(status="erro", detalhe="Produto não encontrado")
+        elif par in existentes:
+            resultado.update(status="erro", detalhe="Produto já associado ao lote")
+        elif par in vistos:
+            resultado.update(status="erro", detalhe="Produto repetido na requisição")
+        vistos.add(par)
+
+    a_criar = [
+        (resultado, associacao)
+        for resultado, associacao in zip(resultados, associacoes)
+        if resultado["status"] == "criado"
+    ]
+    if not a_criar:
+        return resultados
+
+    novos = db.execute(
+        insert(ProdutoLote).returning(ProdutoLote.id, sort_by_parameter_order=True),
+        [
+            {
+                "lote_id": associacao["lote_id"],
+                "produto_id": associacao["produto_id"],
+                "quantidade": associacao["quantidade"],
+                "observacoes": associacao.get("observacoes"),
+                "ativo": True
+            }
+            for _, associacao in a_criar
+        ]
+    ).scalars().all()
+
+    # Roteiro de fases de todos os produtos, lido uma única vez
+    roteiros: Dict[int, List[ProdutoFase]] = {}
+    for produto_fase in db.scalars(
+        select(ProdutoFase).where(
+            ProdutoFase.produto_id.in_({resultado["produto_id"] for resultado, _ in a_criar}),
+            ProdutoFase.ativo == True
+        ).order_by(ProdutoFase.produto_id, ProdutoFase.ordem)
+    ):
+        roteiros.setdefault(produto_fase.produto_id, []).append(produto_fase)
+
+    fases_lote = []
+    for (resultado, _), produto_lote_id in zip(a_criar, novos):
+        roteiro = roteiros.get(resultado["produto_id"], [])
+        resultado["produto_lote_id"] = produto_lote_id
+        resultado["fases"] = len(roteiro)
+        fases_lote.extend(
+            {
+                "lote_id": resultado["lote_id"],
+                "fase_id": produto_fase.fase_id,
+                "produto_id": resultado["produto_id"],
+                "ordem": produto_fase.ordem,
+                "tempo_estimado": produto_fase.tempo_estimado,
+                "tempo_prateleira_horas": produto_fase.tempo_prateleira_horas,
+                "ativo": True
+            }
+            for produto_fase in roteiro
+        )
+
+    if fases_lote:
+        db.execute(insert(FaseLote), fases_lote)
+
+    return resultados
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, update
+from app.models.models import Apontamento, ChecklistItem, ChecklistResposta
+
+
+def gravar_respostas(db: Session, apontamento: Apontamento, respostas: Dict[int, Dict[str, Any]]):
+    """
+    Grava várias respostas de checklist de um apontamento (sem commit).
+    `respostas` mapeia checklist_item_id -> {"concluido", "observacao"}.
+    Os itens são validados em uma consulta; atualizações e inserções vão em um
+    executemany cada. Levanta ValueError se algum item não pertencer à fase.
+    """
+    if not respostas:
+        return
+    
+    itens_validos = set(db.execute(
+        select(ChecklistItem.id).where(
+            ChecklistItem.id.in_(respostas.keys()),
+            ChecklistItem.fase_id == apontamento.fase_id,
+            ChecklistItem.ativo == True
+        )
+    ).scalars().all())
+    
+    itens_invalidos = sorted(set(respostas) - itens_validos)
+    if itens_invalidos:
+        raise ValueError(
+            f"Itens de checklist não encontrados ou não pertencem à fase deste apontamento: {itens_invalidos}"
+        )
+    
+    # Respostas já existentes, para separar atualizações de inserções
+    existentes = dict(db.execute(
+        select(ChecklistResposta.checklist_item_id, ChecklistResposta.id).where(
+            ChecklistResposta.apontamento_id == apontamento.id,
+            ChecklistResposta.checklist_item_id.in_(respostas.keys())
+        )
+    ).all())
+    
+    agora = datetime.utcnow()
+    atualizacoes = []
+    insercoes = []
+    for item_id, resposta in respostas.items():
+        valores = {
+            "concluido": resposta.get("concluido", False),
+            "observacao": resposta.get("observacao"),
+            "data_resposta": agora
+        }
+        if item_id in existentes:
+            atualizacoes.append({"id": existentes[item_id], **valores})
+        else:
+            insercoes.append({"apontamento_id": apontamento.id, "checklist_item_id": item_id, **valores})
+    
+    if atualizacoes:
+        db.execute(update(ChecklistResposta), atualizacoes)
+    if insercoes:
+        db.execute(insert(ChecklistResposta), insercoes)
+
+
+def item_obrigatorio_pendente(db: Session, apontamento_id: int, fase_id: int) -> Optional[ChecklistItem]:
+    """Primeiro item obrigatório da fase sem resposta concluída, em uma única consulta."""
+    return db.execute(
+        select(ChecklistItem).where(
+            ChecklistItem.fase_id == fase_id,
+            ChecklistItem.obrigatorio == True,
+            ChecklistItem.ativo == True,
+            ~select(ChecklistResposta.id).where(
+                ChecklistResposta.apontamento_id == apontamento_id,
+                ChecklistResposta.checklist_item_id == ChecklistItem.id,
+                ChecklistResposta.concluido == True
+            ).exists()
+        ).order_by(ChecklistItem.ordem)
+    ).scalars().first()
@@ -0,0 +1,253 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.models import ApontamentoAberto, Lote, Produto, ProdutoLote, ProducaoDiaria, Usuario
+from app.services.available_batches import primeiro_produto_subquery
+from app.services.rollup import periodo_desde
+from app.services.status_histogram import contar_lotes_por_status
+
+
+def get_totais_consolidados(db: Session, desde: Optional[date] = None) -> Dict[str, Any]:
+    """Soma o consolidado diário a partir de `desde` (ou de todo o histórico)."""
+    query = db.query(
+        func.coalesce(func.sum(ProducaoDiaria.apontamentos_finalizados), 0),
+        func.coalesce(func.sum(ProducaoDiaria.tempo_total), 0),
+        func.coalesce(func.sum(ProducaoDiaria.atrasos), 0),
+        func.coalesce(func.sum(ProducaoDiaria.aderencia_soma), 0),
+        func.coalesce(func.sum(ProducaoDiaria.aderencia_count), 0)
+    )
+    if desde:
+        query = query.filter(ProducaoDiaria.data >= desde)
+
+    finalizados, tempo_total, atrasos, aderencia_soma, aderencia_count = query.one()
+    return {
+        "apontamentos_finalizados": finalizados,
+        "tempo_total": tempo_total,
+        "atrasos": atrasos,
+        "tempo_medio": tempo_total / finalizados if finalizados else 0,
+        "aderencia": aderencia_soma / aderencia_count if aderencia_count else 0
+    }
+
+
+def contar_apontamentos_em_andamento(db: Session, desde: Optional[datetime] = None) -> int:
+    """Apontamentos em andamento, pelo registro de abertos (opcionalmente iniciados a partir de `desde`)."""
+    query = db.query(func.count(ApontamentoAberto.apontamento_id))
+    if desde:
+        query = query.filter(ApontamentoAberto.data_inicio >= desde)
+    return query.scalar()
+
+
+def contar_apontamentos_hoje(db: Session) -> int:
+    """
+    Apontamentos iniciados hoje: os finalizados vêm do consolidado diário
+    (agrupado pelo dia de início) e os em andamento, do registro de abertos.
+    """
+    hoje = datetime.utcnow().date()
+    finalizados = db.query(
+        func.coalesce(func.sum(ProducaoDiaria.apontamentos_finalizados), 0)
+    ).filter(ProducaoDiaria.data == hoje).scalar()
+    return finalizados + contar_apontamentos_em_andamento(db, datetime.combine(hoje, datetime.min.time()))
+
+
+def get_kpis(db: Session, periodo: int = 30) -> Dict[str, Any]:
+    """
+    Calcula os KPIs do dashboard para os últimos `periodo` dias
+    a partir do consolidado diário (producao_diaria).
+    """
+    desde = periodo_desde(periodo)
+    totais = get_totais_consolidados(db, desde)
+
+    if not totais["apontamentos_finalizados"]:
+        return {
+            "tempo_medio_producao": 0,
+            "aderencia_tempo_planejado": 0,
+            "produtividade_por_operador": [],
+            "total_apontamentos": 0
+        }
+
+    return {
+        "tempo_medio_producao": round(totais["tempo_medio"], 2),
+        "aderencia_tempo_planejado": round(totais["aderencia"], 2),
+        "produtividade_por_operador": get_produtividade_por_operador(db, desde),
+        "total_apontamentos": totais["apontamentos_finalizados"]
+    }
+
+
+def get_produtividade_por_operador(db: Session, desde: date) -> List[Dict[str, Any]]:
+    """Agrupa o consolidado diário por operador."""
+    apontamentos = func.sum(ProducaoDiaria.apontamentos_finalizados).label("apontamentos")
+    rows = db.query(
+        ProducaoDiaria.operador_id,
+        Usuario.nome,
+        apontamentos,
+        func.sum(ProducaoDiaria.tempo_total).label("tempo_total")
+    ).outerjoin(
+        Usuario, Usuario.id == ProducaoDiaria.operador_id
+    ).filter(
+        ProducaoDiaria.data >= desde
+    ).group_by(
+        ProducaoDiaria.operador_id, Usuario.nome
+    ).order_by(
+        apontamentos.desc()
+    ).all()
+
+    return [
+        {
+            "id": row.operador_id,
+            "nome": row.nome or "Desconhecido",
+            "apontamentos": row.apontamentos,
+            "tempo_total": row.tempo_total
+        }
+        for row in rows
+    ]
+
+
+# Rótulos de exibição dos status de lote
+STATUS_LOTE_LABELS = {
+    "em_producao": "Em Produção",
+    "em_pausa": "Em Pausa",
+    "concluido": "Concluído",
+    "cancelado": "Cancelado"
+}
+
+
+def get_counters(db: Session) -> Dict[str, Any]:
+    """Contadores do painel administrativo."""
+    hoje = datetime.utcnow().date()
+
+    # Lotes ativos por status (uma única consulta agrupada)
+    lotes_por_status = contar_lotes_por_status(db)
+    total_lotes = sum(lotes_por_status.values())
+    lotes_em_producao = lotes_por_status.get("em_producao", 0)
+
+    # Apontamentos de hoje e em andamento, sem varrer a tabela de apontamentos
+    apontamentos_hoje = contar_apontamentos_hoje(db)
+    apontamentos_em_andamento = contar_apontamentos_em_andamento(db)
+
+    # Tempo médio de produção e atrasos (em minutos), a partir do consolidado diário
+    totais = get_totais_consolidados(db)
+
+    # Eficiência média (realizado/estimado * 100) - representada como uma porcentagem
+    eficiencia = 90  # Valor fictício para exemplo - deve ser calculado com dados reais
+
+    # Produtividade (apontamentos concluídos por dia nos últimos 7 dias)
+    data_limite = hoje - timedelta(days=7)
+    produtividade = get_totais_consolidados(db, data_limite)["apontamentos_finalizados"] / 7.0
+
+    return {
+        "total_lotes": total_lotes,
+        "lotes_em_producao": lotes_em_producao,
+        "apontamentos_hoje": apontamentos_hoje,
+        "apontamentos_em_andamento": apontamentos_em_andamento,
+        "tempo_medio": round(totais["tempo_medio"], 2),
+        "eficiencia": eficiencia,
+        "atrasos": totais["atrasos"],
+        "produtividade": round(produtividade, 2)
+    }
+
+
+def get_recent_batches(db: Session, limit: int = 10) -> List[Dict[str, Any]]:
+    """Lotes mais recentes com o produto principal, em uma única consulta."""
+    primeiro_produto = primeiro_produto_subquery(db)
+
+    rows = db.query(
+        Lote.id,
+        Lote.codigo,
+        Lote.data_criacao,
+        Lote.status,
+        Produto.descricao.label("produto")
+    ).outerjoin(
+        primeiro_produto, primeiro_produto.c.lote_id == Lote.id
+    ).outerjoin(
+        ProdutoLote, ProdutoLote.id == primeiro_produto.c.produto_lote_id
+    ).outerjoin(
+        Produto, Produto.id == ProdutoLote.produto_id
+    ).filter(
+        Lote.ativo == True
+    ).order_by(
+        Lote.data_criacao.desc()
+    ).limit(limit).all()
+
+    return [
+        {
+            "id": row.id,
+            "codigo": row.codigo,
+            "produto": row.produto or "",
+            "data_criacao": row.data_criacao.strftime("%d/%m/%Y"),
+            "status": row.status,
+            "status_display": STATUS_LOTE_LABELS.get(row.status, row.status)
+        }
+        for row in rows
+    ]
+
+
+def get_production_by_product(db: Session) -> Dict[str, Any]:
+    """Quantidade de lotes por produto, para gráficos."""
+    produtos = db.query(
+        Produto.descricao,
+        func.count(ProdutoLote.lote_id).label("total")
+    ).join(
+        ProdutoLote, Produto.id == ProdutoLote.produto_id
+    ).filter(
+        Produto.ativo == True,
+        ProdutoLote.ativo == True
+    ).group_by(
+        Produto.descricao
+    ).all()
+
+    return {
+        "labels": [p[0] for p in produtos],
+        "values": [p[1] for p in produtos]
+    }
+
+
+def get_batch_status(
+    db: Session,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    produto_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """Quantidade de lotes por status, para gráficos."""
+    status_counts = contar_lotes_por_status(db, data_inicio, data_fim, produto_id)
+
+    return {
+        "labels": list(STATUS_LOTE_LABELS.values()),
+        "values": [status_counts.get(k, 0) for k in STATUS_LOTE_LABELS.keys()]
+    }
+
+
+# Seções disponíveis em /dashboard/snapshot
+SNAPSHOT_SECTIONS = {
+    "counters": get_counters,
+    "recent_batches": get_recent_batches,
+    "production_by_product": get_production_by_product,
+    "batch_status": get_batch_status
+}
+
+_snapshot_cache = TTLCache(ttl=settings.DASHBOARD_SNAPSHOT_TTL, maxsize=64)
+
+
+def get_snapshot(db: Session, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Monta o painel em uma única sessão (uma transação), reaproveitando
+    por alguns segundos as seções calculadas recentemente.
+    """
+    sections = sections or list(SNAPSHOT_SECTIONS.keys())
+    invalidas = [s for s in sections if s not in SNAPSHOT_SECTIONS]
+    if invalidas:
+        raise ValueError(f"Seções inválidas: {', '.join(invalidas)}")
+
+    snapshot = {}
+    for section in sections:
+        valor = _snapshot_cache.get(section)
+        if valor is None:
+            valor = SNAPSHOT_SECTIONS[section](db)
+            _snapshot_cache.set(section, valor)
+        snapshot[section] = valor
+
+    snapshot["generated_at"] = datetime.utcnow()
+    return snapshot
+
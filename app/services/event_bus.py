@@ -0,0 +1,134 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+from app.core.config import settings
+
+# Tipos de tópico aceitos nas assinaturas: "lote:<id>", "fase:<id>", "maquina:<id>"
+TIPOS_TOPICO = ("lote", "fase", "maquina")
+
+# Tópico global, sem id: recebe todos os eventos (painel administrativo)
+TOPICO_PAINEL = "painel"
+
+
+def validar_topico(topico: str) -> str:
+    """Normaliza um tópico no formato "<tipo>:<id>" ou "painel"; lança ValueError se inválido."""
+    if topico.strip() == TOPICO_PAINEL:
+        return TOPICO_PAINEL
+    tipo, _, identificador = topico.strip().partition(":")
+    if tipo not in TIPOS_TOPICO or not identificador.isdigit():
+        raise ValueError(f"Tópico inválido: {topico}")
+    return f"{tipo}:{int(identificador)}"
+
+
+class Assinatura:
+    """Fila de eventos de um cliente conectado e os tópicos que ele acompanha."""
+
+    def __init__(self, topicos: Iterable[str], maxsize: int):
+        self.topicos = set(topicos)
+        self.fila: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=maxsize)
+        self.descartados = 0
+
+
+class EventBus:
+    """
+    Barramento de eventos em memória, no processo do servidor.
+    Publicar nunca bloqueia: se a fila de um cliente lento estiver cheia,
+    o evento é descartado para ele e o cliente recebe um aviso para recarregar.
+    """
+
+    def __init__(self, maxsize: int = 100):
+        self.maxsize = maxsize
+        self._assinaturas: Dict[str, Set[Assinatura]] = {}
+
+    def assinar(self, topicos: Iterable[str]) -> Assinatura:
+        """Cria uma assinatura para os tópicos informados."""
+        assinatura = Assinatura(topicos, self.maxsize)
+        for topico in assinatura.topicos:
+            self._assinaturas.setdefault(topico, set()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura):
+        """Remove a assinatura de todos os tópicos."""
+        for topico in assinatura.topicos:
+            assinantes = self._assinaturas.get(topico)
+            if assinantes is None:
+                continue
+            assinantes.discard(assinatura)
+            if not assinantes:
+                del self._assinaturas[topico]
+
+    def publicar(self, topicos: Iterable[str], evento: Dict[str, Any]):
+        """Entrega o evento uma única vez a cada assinante de pelo menos um dos tópicos."""
+        destinatarios: Set[Assinatura] = set()
+        for topico in topicos:
+            destinatarios.update(self._assinaturas.get(topico, ()))
+
+        for assinatura in destinatarios:
+            try:
+                assinatura.fila.put_nowait(evento)
+            except asyncio.QueueFull:
+                assinatura.descartados += 1
+
+
+def formatar_sse(evento: Dict[str, Any]) -> str:
+    """Serializa o evento no formato text/event-stream."""
+    dados = json.dumps(evento, default=str, separators=(",", ":"))
+    return f"event: {evento['tipo']}\ndata: {dados}\n\n"
+
+
+def topicos_apontamento(lote_id: int, fase_id: int, maquina_id: Optional[int] = None) -> List[str]:
+    """Tópicos afetados por uma mudança em um apontamento."""
+    topicos = [f"lote:{lote_id}", f"fase:{fase_id}", TOPICO_PAINEL]
+    if maquina_id:
+        topicos.append(f"maquina:{maquina_id}")
+    return topicos
+
+
+def evento_apontamento(tipo: str, apontamento) -> Dict[str, Any]:
+    """Delta enviado aos clientes quando um apontamento começa ou termina."""
+    return {
+        "tipo": tipo,
+        "apontamento_id": apontamento.id,
+        "lote_id": apontamento.lote_id,
+        "produto_id": apontamento.produto_id,
+        "fase_id": apontamento.fase_id,
+        "maquina_id": apontamento.maquina_id,
+        "operador_id": apontamento.operador_id,
+        "status": apontamento.status,
+        "data_inicio": apontamento.data_inicio,
+        "data_fim": apontamento.data_fim,
+        "momento": datetime.utcnow()
+    }
+
+
+def publicar_apontamento(tipo: str, apontamento):
+    """Publica o início ou a finalização de um apontamento nos tópicos de lote, fase e máquina."""
+    bus.publicar(
+        topicos_apontamento(apontamento.lote_id, apontamento.fase_id, apontamento.maquina_id),
+        evento_apontamento(tipo, apontamento)
+    )
+
+
+def publicar_lote(lote):
+    """Publica a mudança de status de um lote."""
+    bus.publicar([f"lote:{lote.id}", TOPICO_PAINEL], {
+        "tipo": "lote_status",
+        "lote_id": lote.id,
+        "status": lote.status,
+        "momento": datetime.utcnow()
+    })
+
+
+def publicar_maquina(maquina):
+    """Publica a mudança de status de uma máquina."""
+    bus.publicar([f"maquina:{maquina.id}", TOPICO_PAINEL], {
+        "tipo": "maquina_status",
+        "maquina_id": maquina.id,
+        "status": maquina.status,
+        "ativo": maquina.ativo,
+        "momento": datetime.utcnow()
+    })
+
+
+bus = EventBus(maxsize=settings.EVENTOS_FILA_MAXIMA)
@@ -0,0 +1,49 @@
+from typing import Any, Dict, List
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.maquina import FaseMaquina, Maquina
+from app.models.models import Fase
+
+# Mapa fase → máquinas; invalidado pelas rotas que alteram fases, máquinas ou associações
+_mapa_cache = TTLCache(ttl=settings.MAQUINAS_FASE_CACHE_TTL, maxsize=1)
+
+
+def maquinas_por_fase(db: Session) -> List[Dict[str, Any]]:
+    """
+    Fases ativas com as máquinas associadas, na ordem de uso, montado com uma
+    única consulta (fases sem máquinas aparecem com a lista vazia).
+    """
+    mapa = _mapa_cache.get("mapa")
+    if mapa is not None:
+        return mapa
+
+    rows = db.execute(
+        select(Fase.id, Fase.descricao, FaseMaquina.ordem, Maquina)
+        .outerjoin(FaseMaquina, FaseMaquina.fase_id == Fase.id)
+        .outerjoin(Maquina, Maquina.id == FaseMaquina.maquina_id)
+        .where(Fase.ativo == True)
+        .order_by(Fase.id, FaseMaquina.ordem, FaseMaquina.id)
+    )
+
+    mapa = []
+    por_fase: Dict[int, Dict[str, Any]] = {}
+    for fase_id, fase_nome, ordem, maquina in rows:
+        fase = por_fase.get(fase_id)
+        if fase is None:
+            fase = {"fase_id": fase_id, "fase_nome": fase_nome, "maquinas": []}
+            por_fase[fase_id] = fase
+            mapa.append(fase)
+        if maquina is not None:
+            maquina_dict = maquina.to_dict()
+            maquina_dict["ordem"] = ordem
+            fase["maquinas"].append(maquina_dict)
+
+    _mapa_cache.set("mapa", mapa)
+    return mapa
+
+
+def invalidar_mapa():
+    """Descarta o mapa em cache; a próxima leitura o recalcula."""
+    _mapa_cache.clear()
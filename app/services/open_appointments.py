@@ -0,0 +1,73 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.models.models import Apontamento, ApontamentoAberto
+
+MENSAGEM_OPERADOR_OCUPADO = "Já existe um apontamento em andamento. Finalize-o antes de iniciar outro."
+MENSAGEM_FASE_OCUPADA = "Já existe um apontamento em andamento para este lote, produto e fase"
+
+
+class ConflitoApontamento(Exception):
+    """O operador ou a fase do lote já possui um apontamento em andamento."""
+
+    def __init__(self, mensagem: str, aberto: Optional[ApontamentoAberto] = None):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.aberto = aberto
+
+
+def por_operador(db: Session, operador_id: int) -> Optional[ApontamentoAberto]:
+    """Apontamento em andamento do operador (consulta pela chave única)."""
+    return db.query(ApontamentoAberto).filter(
+        ApontamentoAberto.operador_id == operador_id
+    ).first()
+
+
+def por_fase(db: Session, lote_id: int, produto_id: int, fase_id: int) -> Optional[ApontamentoAberto]:
+    """Apontamento em andamento da fase do lote (consulta pela chave única)."""
+    return db.query(ApontamentoAberto).filter(
+        ApontamentoAberto.lote_id == lote_id,
+        ApontamentoAberto.produto_id == produto_id,
+        ApontamentoAberto.fase_id == fase_id
+    ).first()
+
+
+def verificar_conflito(db: Session, operador_id: int, lote_id: int, produto_id: int, fase_id: int):
+    """Levanta ConflitoApontamento se o operador ou a fase já estiverem ocupados."""
+    aberto = por_fase(db, lote_id, produto_id, fase_id)
+    if aberto:
+        raise ConflitoApontamento(MENSAGEM_FASE_OCUPADA, aberto)
+    
+    aberto = por_operador(db, operador_id)
+    if aberto:
+        raise ConflitoApontamento(MENSAGEM_OPERADOR_OCUPADO, aberto)
+
+
+def registrar(db: Session, apontamento: Apontamento):
+    """
+    Registra o apontamento como aberto na transação atual.
+    Em caso de início simultâneo, a restrição única rejeita o segundo registro:
+    a transação é desfeita e ConflitoApontamento é levantado.
+    """
+    db.add(ApontamentoAberto(
+        apontamento_id=apontamento.id,
+        operador_id=apontamento.operador_id,
+        lote_id=apontamento.lote_id,
+        produto_id=apontamento.produto_id,
+        fase_id=apontamento.fase_id,
+        data_inicio=apontamento.data_inicio
+    ))
+    
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        verificar_conflito(db, apontamento.operador_id, apontamento.lote_id, apontamento.produto_id, apontamento.fase_id)
+        raise ConflitoApontamento(MENSAGEM_FASE_OCUPADA)
+
+
+def liberar(db: Session, apontamento_id: int):
+    """Remove o apontamento do registro de abertos (sem commit)."""
+    db.query(ApontamentoAberto).filter(
+        ApontamentoAberto.apontamento_id == apontamento_id
+    ).delete(synchronize_session=False)
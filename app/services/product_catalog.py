@@ -0,0 +1,48 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, distinct, func
+from app.models.models import Lote, Produto, ProdutoFase, ProdutoLote
+
+
+def produtos_com_totais(db: Session):
+    """
+    Consulta dos produtos ativos com os totais do catálogo em uma única consulta:
+    número de fases ativas, soma do tempo estimado das fases e lotes em aberto
+    (ativos e não concluídos) que contêm o produto.
+    """
+    fases = db.query(
+        ProdutoFase.produto_id.label("produto_id"),
+        func.count(ProdutoFase.id).label("num_fases"),
+        func.sum(ProdutoFase.tempo_estimado).label("tempo_estimado_fases")
+    ).filter(
+        ProdutoFase.ativo == True
+    ).group_by(
+        ProdutoFase.produto_id
+    ).subquery()
+
+    lotes = db.query(
+        ProdutoLote.produto_id.label("produto_id"),
+        func.count(distinct(ProdutoLote.lote_id)).label("lotes_ativos")
+    ).join(
+        Lote, and_(Lote.id == ProdutoLote.lote_id, Lote.ativo == True, Lote.status != "concluido")
+    ).filter(
+        ProdutoLote.ativo == True
+    ).group_by(
+        ProdutoLote.produto_id
+    ).subquery()
+
+    return db.query(
+        Produto.id,
+        Produto.codigo,
+        Produto.descricao,
+        Produto.tempo_estimado_total,
+        Produto.ativo,
+        func.coalesce(fases.c.num_fases, 0).label("num_fases"),
+        func.coalesce(fases.c.tempo_estimado_fases, 0).label("tempo_estimado_fases"),
+        func.coalesce(lotes.c.lotes_ativos, 0).label("lotes_ativos")
+    ).outerjoin(
+        fases, fases.c.produto_id == Produto.id
+    ).outerjoin(
+        lotes, lotes.c.produto_id == Produto.id
+    ).filter(
+        Produto.ativo == True
+    )
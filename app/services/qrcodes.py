@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+import qrcode
+import qrcode.image.svg
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Diretório para armazenar QR Codes
+QR_CODES_DIR = "app/static/qrcodes"
+os.makedirs(QR_CODES_DIR, exist_ok=True)
+
+# Renderização fora do loop de eventos; limitado para não disputar CPU com as requisições
+_executor = ThreadPoolExecutor(max_workers=settings.QR_WORKERS, thread_name_prefix="qrcode")
+
+# Renderizações em andamento por arquivo (evita gerar o mesmo arquivo duas vezes)
+_pendentes: Dict[str, Future] = {}
+
+# Imagens servidas pela API, renderizadas sob demanda (LRU em memória)
+_imagens = TTLCache(ttl=settings.QR_CACHE_TTL, maxsize=settings.QR_CACHE_SIZE)
+
+# Formatos de imagem suportados, com o media type de cada um
+FORMATOS = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def conteudo_maquina(codigo: str, nome: str) -> str:
+    """Conteúdo do QR code da máquina, lido pelo operador para vincular a máquina à operação."""
+    return f"maquina:{codigo}:{nome}"
+
+
+def conteudo_etiqueta(tipo: str, registro_id: int, codigo: str) -> str:
+    """Conteúdo do QR code de lotes e produtos (mesmo formato das etiquetas já impressas)."""
+    return str({
+        "type": tipo,
+        "id": registro_id,
+        "codigo": codigo
+    })
+
+
+def versao(conteudo: str) -> str:
+    """Hash curto do conteúdo; muda sempre que o QR code muda."""
+    return hashlib.sha256(conteudo.encode()).hexdigest()[:16]
+
+
+def nome_arquivo(prefixo: str, conteudo: str, formato: str = "png") -> str:
+    """Nome derivado do conteúdo: o mesmo conteúdo sempre gera o mesmo arquivo."""
+    return f"{prefixo}_{versao(conteudo)}.{formato}"
+
+
+def etag(conteudo: str, formato: str, box_size: int, border: int) -> str:
+    """ETag forte da imagem: a renderização é determinística para os mesmos parâmetros."""
+    return f'"{versao(conteudo)}-{formato}-{box_size}-{border}"'
+
+
+def etag_confere(if_none_match: Optional[str], etag_atual: str) -> bool:
+    """
+    Indica se o If-None-Match aceita a ETag atual: "*", ou uma lista separada
+    por vírgulas, comparada de forma fraca (ignorando o prefixo W/).
+    """
+    if not if_none_match:
+        return False
+    etiquetas = [etiqueta.strip() for etiqueta in if_none_match.split(",")]
+    if "*" in etiquetas:
+        return True
+    return etag_atual.removeprefix("W/") in (etiqueta.removeprefix("W/") for etiqueta in etiquetas)
+
+
+def renderizar(conteudo: str, formato: str = "png", box_size: int = 10, border: int = 4) -> bytes:
+    """Gera a imagem do QR code em PNG ou SVG."""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=border,
+        image_factory=qrcode.image.svg.SvgPathImage if formato == "svg" else None,
+    )
+    qr.add_data(conteudo)
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    if formato == "svg":
+        qr.make_image().save(buffer)
+    else:
+        qr.make_image(fill='black', back_color='white').save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def gravar_arquivo(caminho: str, dados: bytes):
+    """Grava o arquivo de forma atômica (nunca há arquivo parcial no diretório)."""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(dados)
+    os.replace(temporario, caminho)
+
+
+def _gravar(caminho: str, conteudo: str):
+    """Renderiza e grava o arquivo no formato indicado pela extensão, se ainda não existir."""
+    if os.path.exists(caminho):
+        return
+    gravar_arquivo(caminho, renderizar(conteudo, os.path.splitext(caminho)[1].lstrip(".")))
+
+
+def agendar(arquivo: str, conteudo: str) -> Future:
+    """
+    Agenda a renderização do arquivo no pool, se ainda não existir.
+    Retorna imediatamente; pedidos repetidos do mesmo arquivo compartilham o mesmo trabalho.
+    """
+    futuro = _pendentes.get(arquivo)
+    if futuro is None:
+        futuro = _executor.submit(_gravar, os.path.join(QR_CODES_DIR, arquivo), conteudo)
+        _pendentes[arquivo] = futuro
+        futuro.add_done_callback(lambda _: _pendentes.pop(arquivo, None))
+    return futuro
+
+
+async def garantir(arquivo: str, conteudo: str) -> str:
+    """Retorna o caminho do arquivo, renderizando-o no pool sob demanda se estiver ausente."""
+    caminho = os.path.join(QR_CODES_DIR, arquivo)
+    if not os.path.exists(caminho):
+        await asyncio.wrap_future(agendar(arquivo, conteudo))
+    return caminho
+
+
+async def imagem(conteudo: str, formato: str = "png", box_size: int = 10, border: int = 4) -> bytes:
+    """Retorna a imagem do QR code, renderizando-a no pool apenas na primeira vez."""
+    chave = (conteudo, formato, box_size, border)
+    dados = _imagens.get(chave)
+    if dados is None:
+        dados = await asyncio.get_running_loop().run_in_executor(_executor, renderizar, *chave)
+        _imagens.set(chave, dados)
+    return dados
@@ -0,0 +1,163 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, insert, select
+from app.models.models import Apontamento, FaseLote, ProducaoDiaria
+
+
+def _tempo_estimado(db: Session, apontamento: Apontamento) -> Optional[int]:
+    """Busca o tempo estimado da fase do apontamento no lote."""
+    return db.query(func.max(FaseLote.tempo_estimado)).filter(
+        FaseLote.lote_id == apontamento.lote_id,
+        FaseLote.produto_id == apontamento.produto_id,
+        FaseLote.fase_id == apontamento.fase_id,
+        FaseLote.ativo == True
+    ).scalar()
+
+
+def contribuicao(db: Session, apontamento: Apontamento) -> Optional[Dict[str, Any]]:
+    """
+    Calcula quanto um apontamento soma no consolidado diário.
+    Retorna None se o apontamento não estiver finalizado.
+    """
+    if apontamento.status != "finalizado" or apontamento.data_inicio is None:
+        return None
+
+    tempo_real = apontamento.tempo_real
+    tempo_estimado = _tempo_estimado(db, apontamento)
+    com_estimativa = tempo_real is not None and bool(tempo_estimado)
+
+    return {
+        "chave": {
+            "data": apontamento.data_inicio.date(),
+            "produto_id": apontamento.produto_id,
+            "fase_id": apontamento.fase_id,
+            "operador_id": apontamento.operador_id
+        },
+        "valores": {
+            "apontamentos_finalizados": 1,
+            "tempo_total": tempo_real or 0,
+            "atrasos": 1 if com_estimativa and tempo_real > tempo_estimado else 0,
+            "aderencia_soma": tempo_real * 100.0 / tempo_estimado if com_estimativa else 0.0,
+            "aderencia_count": 1 if com_estimativa else 0
+        }
+    }
+
+
+def _insert_upsert(db: Session):
+    """Retorna o insert com suporte a ON CONFLICT do dialeto em uso, se houver."""
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert
+    if dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        return dialect_insert
+    return None
+
+
+def aplicar(db: Session, delta: Optional[Dict[str, Any]], sinal: int = 1):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) uma contribuição no consolidado.
+    Não faz commit: participa da transação que fecha o apontamento.
+    """
+    if not delta:
+        return
+
+    chave = delta["chave"]
+    valores = {k: v * sinal for k, v in delta["valores"].items()}
+    tabela = ProducaoDiaria.__table__
+
+    dialect_insert = _insert_upsert(db)
+    if dialect_insert is not None and None not in chave.values():
+        # Upsert atômico: cria a linha ou incrementa os contadores
+        stmt = dialect_insert(tabela).values(**chave, **valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(chave.keys()),
+            set_={k: tabela.c[k] + stmt.excluded[k] for k in valores}
+        )
+        db.execute(stmt)
+        return
+
+    filtro = [tabela.c[k] == v for k, v in chave.items()]
+    atualizados = db.execute(
+        tabela.update().where(*filtro).values({k: tabela.c[k] + v for k, v in valores.items()})
+    ).rowcount
+    if not atualizados:
+        db.execute(tabela.insert().values(**chave, **valores))
+
+
+def reconstruir(db: Session, desde: Optional[date] = None) -> int:
+    """
+    Recalcula o consolidado a partir da tabela de apontamentos
+    (todo o histórico ou a partir de `desde`). Retorna o número de linhas geradas.
+    """
+    dia = func.date(Apontamento.data_inicio)
+
+    estimativas = db.query(
+        FaseLote.lote_id.label("lote_id"),
+        FaseLote.produto_id.label("produto_id"),
+        FaseLote.fase_id.label("fase_id"),
+        func.max(FaseLote.tempo_estimado).label("tempo_estimado")
+    ).filter(
+        FaseLote.ativo == True
+    ).group_by(
+        FaseLote.lote_id, FaseLote.produto_id, FaseLote.fase_id
+    ).subquery()
+
+    com_estimativa = and_(
+        Apontamento.tempo_real.isnot(None),
+        estimativas.c.tempo_estimado > 0
+    )
+
+    consulta = select(
+        dia,
+        Apontamento.produto_id,
+        Apontamento.fase_id,
+        Apontamento.operador_id,
+        func.count(Apontamento.id),
+        func.coalesce(func.sum(Apontamento.tempo_real), 0),
+        func.coalesce(func.sum(case(
+            (and_(com_estimativa, Apontamento.tempo_real > estimativas.c.tempo_estimado), 1), else_=0
+        )), 0),
+        func.coalesce(func.sum(case(
+            (com_estimativa, Apontamento.tempo_real * 100.0 / estimativas.c.tempo_estimado), else_=0
+        )), 0),
+        func.coalesce(func.sum(case((com_estimativa, 1), else_=0)), 0)
+    ).outerjoin(
+        estimativas,
+        and_(
+            estimativas.c.lote_id == Apontamento.lote_id,
+            estimativas.c.produto_id == Apontamento.produto_id,
+            estimativas.c.fase_id == Apontamento.fase_id
+        )
+    ).where(
+        Apontamento.status == "finalizado",
+        Apontamento.data_inicio.isnot(None)
+    ).group_by(
+        dia, Apontamento.produto_id, Apontamento.fase_id, Apontamento.operador_id
+    )
+
+    limpeza = db.query(ProducaoDiaria)
+    if desde:
+        consulta = consulta.where(Apontamento.data_inicio >= datetime.combine(desde, datetime.min.time()))
+        limpeza = limpeza.filter(ProducaoDiaria.data >= desde)
+
+    limpeza.delete(synchronize_session=False)
+    resultado = db.execute(
+        insert(ProducaoDiaria).from_select(
+            [
+                "data", "produto_id", "fase_id", "operador_id",
+                "apontamentos_finalizados", "tempo_total", "atrasos",
+                "aderencia_soma", "aderencia_count"
+            ],
+            consulta
+        )
+    )
+    db.commit()
+    return resultado.rowcount
+
+
+def periodo_desde(dias: int) -> date:
+    """Primeiro dia considerado em uma janela de `dias` dias até hoje."""
+    return (datetime.utcnow() - timedelta(days=dias)).date()
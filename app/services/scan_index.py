@@ -0,0 +1,147 @@
+import ast
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from app.core.config import settings
+from app.models.maquina import Maquina
+from app.models.models import Lote, Produto
+
+# Tipos indexados, na ordem de busca de um código sem prefixo
+TIPOS = ("lote", "maquina", "produto")
+
+# Prefixos do formato "LOTE-{id}|PRODUTO-{id}|FASE-{id}" lido pela tela do operador
+PREFIXOS_ID = {"LOTE-": "lote", "PRODUTO-": "produto"}
+
+
+def _entidade_lote(lote) -> Dict[str, Any]:
+    return {"tipo": "lote", "id": lote.id, "codigo": lote.codigo, "descricao": lote.descricao, "status": lote.status}
+
+
+def _entidade_maquina(maquina) -> Dict[str, Any]:
+    return {"tipo": "maquina", "id": maquina.id, "codigo": maquina.codigo, "nome": maquina.nome, "status": maquina.status}
+
+
+def _entidade_produto(produto) -> Dict[str, Any]:
+    return {"tipo": "produto", "id": produto.id, "codigo": produto.codigo, "descricao": produto.descricao}
+
+
+ENTIDADES = {
+    "lote": _entidade_lote,
+    "maquina": _entidade_maquina,
+    "produto": _entidade_produto
+}
+
+
+class IndiceCodigos:
+    """
+    Índice em memória código → entidade e id → entidade dos lotes, máquinas
+    e produtos ativos. As rotas de escrita o mantêm atualizado (atualizar/remover);
+    operações em massa o invalidam e ele é recarregado na próxima leitura.
+    A recarga periódica (SCAN_INDICE_TTL) cobre escritas feitas por outros processos.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._por_codigo: Dict[str, Dict[str, Dict[str, Any]]] = {tipo: {} for tipo in TIPOS}
+        self._por_id: Dict[str, Dict[int, Dict[str, Any]]] = {tipo: {} for tipo in TIPOS}
+        self._expira_em = 0.0
+        self._lock = threading.Lock()
+
+    def valido(self) -> bool:
+        """Indica se o índice pode ser usado sem recarga."""
+        return self._expira_em > time.monotonic()
+
+    def carregar(self, db: Session):
+        """Recarrega o índice com uma consulta por tipo."""
+        consultas = {
+            "lote": select(Lote.id, Lote.codigo, Lote.descricao, Lote.status).where(Lote.ativo == True),
+            "maquina": select(Maquina.id, Maquina.codigo, Maquina.nome, Maquina.status).where(Maquina.ativo == True),
+            "produto": select(Produto.id, Produto.codigo, Produto.descricao).where(Produto.ativo == True)
+        }
+        por_codigo = {}
+        por_id = {}
+        for tipo, consulta in consultas.items():
+            entidades = [ENTIDADES[tipo](row) for row in db.execute(consulta)]
+            por_codigo[tipo] = {entidade["codigo"]: entidade for entidade in entidades}
+            por_id[tipo] = {entidade["id"]: entidade for entidade in entidades}
+
+        with self._lock:
+            self._por_codigo = por_codigo
+            self._por_id = por_id
+            self._expira_em = time.monotonic() + self.ttl
+
+    def invalidar(self):
+        """Força a recarga na próxima leitura."""
+        self._expira_em = 0.0
+
+    def atualizar(self, tipo: str, registro):
+        """Reflete no índice a criação ou alteração de um registro (remove-o se inativo)."""
+        self.remover(tipo, registro.id)
+        if not registro.ativo:
+            return
+        entidade = ENTIDADES[tipo](registro)
+        with self._lock:
+            self._por_codigo[tipo][entidade["codigo"]] = entidade
+            self._por_id[tipo][entidade["id"]] = entidade
+
+    def remover(self, tipo: str, registro_id: int):
+        """Remove um registro do índice."""
+        with self._lock:
+            anterior = self._por_id[tipo].pop(registro_id, None)
+            if anterior is not None:
+                self._por_codigo[tipo].pop(anterior["codigo"], None)
+
+    def por_codigo(self, tipo: str, codigo: str) -> Optional[Dict[str, Any]]:
+        return self._por_codigo[tipo].get(codigo)
+
+    def por_id(self, tipo: str, registro_id: int) -> Optional[Dict[str, Any]]:
+        return self._por_id[tipo].get(registro_id)
+
+    def resolver(self, texto: str) -> Dict[str, Any]:
+        """
+        Resolve um texto lido pelo leitor de QR code. Formatos aceitos:
+        "maquina:{codigo}:{nome}", o dicionário das etiquetas de lotes e produtos
+        ({'type': 'lote', 'id': 1, 'codigo': 'L001'}), "LOTE-{id}|PRODUTO-{id}|FASE-{id}"
+        e o código puro de um lote, máquina ou produto.
+        """
+        resultado = {"texto": texto, "status": "encontrado", "entidades": [], "fase_id": None}
+        texto = texto.strip()
+
+        try:
+            if texto.startswith("maquina:"):
+                entidades = [self.por_codigo("maquina", texto.split(":", 2)[1])]
+            elif texto.startswith("{"):
+                dados = ast.literal_eval(texto)
+                tipo = dados["type"]
+                entidade = self.por_codigo(tipo, dados.get("codigo"))
+                entidades = [entidade if entidade is not None else self.por_id(tipo, int(dados["id"]))]
+            elif "|" in texto or texto.startswith(tuple(PREFIXOS_ID)) or texto.startswith("FASE-"):
+                entidades = []
+                for parte in texto.split("|"):
+                    if parte.startswith("FASE-"):
+                        resultado["fase_id"] = int(parte[len("FASE-"):])
+                        continue
+                    prefixo = next(prefixo for prefixo in PREFIXOS_ID if parte.startswith(prefixo))
+                    entidades.append(self.por_id(PREFIXOS_ID[prefixo], int(parte[len(prefixo):])))
+            else:
+                entidades = [self.por_codigo(tipo, texto) for tipo in TIPOS]
+                entidades = [entidade for entidade in entidades if entidade is not None] or [None]
+        except (ValueError, SyntaxError, KeyError, TypeError, IndexError, StopIteration):
+            resultado["status"] = "invalido"
+            return resultado
+
+        if not entidades or any(entidade is None for entidade in entidades):
+            resultado["status"] = "nao_encontrado"
+            return resultado
+
+        resultado["entidades"] = entidades
+        return resultado
+
+    def resolver_varios(self, textos: List[str]) -> List[Dict[str, Any]]:
+        """Resolve vários textos, na ordem recebida."""
+        return [self.resolver(texto) for texto in textos]
+
+
+indice = IndiceCodigos(ttl=settings.SCAN_INDICE_TTL)
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import exists, func
+from app.models.models import Lote, ProdutoLote
+
+
+def contar_lotes_por_status(
+    db: Session,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    produto_id: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Conta os lotes ativos por status em um único GROUP BY.
+    Filtros opcionais: período de criação do lote e produto associado.
+    """
+    query = db.query(Lote.status, func.count(Lote.id)).filter(Lote.ativo == True)
+
+    if data_inicio:
+        query = query.filter(Lote.data_criacao >= data_inicio)
+    if data_fim:
+        query = query.filter(Lote.data_criacao < data_fim)
+    if produto_id:
+        query = query.filter(
+            exists().where(
+                ProdutoLote.lote_id == Lote.id,
+                ProdutoLote.produto_id == produto_id,
+                ProdutoLote.ativo == True
+            )
+        )
+
+    return {status: total for status, total in query.group_by(Lote.status).all()}
+
@@ -388,12 +388,18 @@ function viewLote(loteId) {
  * Duplica um lote existente
  */
 function duplicateLote(loteId) {
-    const novoCodigo = prompt('Digite o código para o novo lote:');
+    const entrada = prompt('Digite o código para o novo lote (separe por vírgulas para criar vários):');
     
-    if (!novoCodigo) return;
+    if (!entrada) return;
+    
+    const codigos = entrada.split(',').map(codigo => codigo.trim()).filter(codigo => codigo);
+    if (codigos.length > 1) {
+        duplicateLoteEmMassa(loteId, codigos);
+        return;
+    }
     
     $.ajax({
-        url: `/api/batches/duplicate/${loteId}?novo_codigo=${novoCodigo}`,
+        url: `/api/batches/duplicate/${loteId}?novo_codigo=${encodeURIComponent(codigos[0])}`,
         type: 'POST',
         success: function() {
             alert('Lote duplicado com sucesso!');
@@ -408,11 +414,44 @@ function duplicateLote(loteId) {
     });
 }
 
+/**
+ * Duplica um lote para vários códigos em uma única requisição
+ */
+function duplicateLoteEmMassa(loteId, codigos) {
+    $.ajax({
+        url: `/api/batches/duplicate/${loteId}/bulk`,
+        type: 'POST',
+        contentType: 'application/json',
+        data: JSON.stringify({ codigos: codigos }),
+        success: function(response) {
+            const criados = response.resultados.filter(resultado => resultado.status === 'criado');
+            const erros = response.resultados.filter(resultado => resultado.status !== 'criado');
+            let mensagem = `${criados.length} lote(s) criado(s).`;
+            if (erros.length) {
+                mensagem += '\n\nNão criados:\n' + erros.map(resultado => `${resultado.codigo}: ${resultado.detalhe}`).join('\n');
+            }
+            alert(mensagem);
+            loadLotesRecentes(); // Atualizar lista de lotes
+        },
+        error: function(xhr) {
+            const errorMsg = xhr.responseJSON && xhr.responseJSON.detail 
+                ? xhr.responseJSON.detail 
+                : 'Erro ao duplicar lotes. Tente novamente.';
+            alert(errorMsg);
+        }
+    });
+}
+
 // admin.js - Funções para o painel administrativo
 
+// Conexão SSE com as mudanças de lotes, fases e máquinas (tópico global "painel")
+let eventosPainel = null;
+let recargaPainelTimeout = null;
+
 $(document).ready(function() {
     // Carregar dados do dashboard ao iniciar
     loadDashboardData();
+    acompanharPainel();
     
     // Configurar eventos de navegação
     setupNavigationEvents();
@@ -427,108 +466,89 @@ $(document).ready(function() {
     });
 });
 
-// Funções para carregar dados do dashboard
-function loadDashboardData() {
-    // Carregar contadores (KPIs)
-    loadCounters();
-    
-    // Carregar lotes recentes
-    loadRecentBatches();
+// Atualiza o dashboard quando um apontamento, lote ou máquina muda, sem polling
+function acompanharPainel() {
+    if (eventosPainel || !window.EventSource) {
+        return;
+    }
     
-    // Carregar gráficos
-    loadCharts();
+    // O EventSource envia o cookie de acesso e reconecta sozinho se a conexão cair
+    eventosPainel = new EventSource('/api/events/stream?topicos=painel');
+    ['apontamento_iniciado', 'apontamento_finalizado', 'apontamento_atualizado', 'lote_status', 'maquina_status', 'recarregar']
+        .forEach(tipo => eventosPainel.addEventListener(tipo, agendarRecargaPainel));
 }
 
-function loadCounters() {
-    $.ajax({
-        url: '/api/admin/dashboard/counters',
-        type: 'GET',
-        success: function(data) {
-            // Atualizar contadores
-            $('#total-lotes').text(data.total_lotes || 0);
-            $('#lotes-em-producao').text(data.lotes_em_producao || 0);
-            $('#apontamentos-hoje').text(data.apontamentos_hoje || 0);
-            $('#apontamentos-andamento').text(data.apontamentos_em_andamento || 0);
-            
-            // Atualizar KPIs
-            $('#tempo-medio').text(data.tempo_medio || 0);
-            $('#eficiencia').text(data.eficiencia || 0);
-            $('#atrasos').text(data.atrasos || 0);
-            $('#produtividade').text(data.produtividade || 0);
-        },
-        error: function(xhr) {
-            console.error('Erro ao carregar contadores:', xhr);
-        }
-    });
+// Agrupa eventos próximos em uma única recarga do dashboard, feita depois que
+// as seções em cache no servidor expiram (DASHBOARD_SNAPSHOT_TTL, 10 s por padrão)
+function agendarRecargaPainel() {
+    clearTimeout(recargaPainelTimeout);
+    recargaPainelTimeout = setTimeout(loadDashboardData, 10000);
 }
 
-function loadRecentBatches() {
+// Funções para carregar dados do dashboard
+function loadDashboardData() {
+    // Contadores, lotes recentes e gráficos chegam em uma única requisição
     $.ajax({
-        url: '/api/admin/dashboard/recent-batches',
+        url: '/api/dashboard/snapshot',
         type: 'GET',
         success: function(data) {
-            const tbody = $('#recent-batches-table tbody');
-            tbody.empty();
-            
-            if (data && data.length > 0) {
-                data.forEach(function(batch) {
-                    const statusClass = getStatusClass(batch.status);
-                    const row = `
-                        <tr>
-                            <td>${batch.codigo}</td>
-                            <td>${batch.produto}</td>
-                            <td>${batch.data_criacao}</td>
-                            <td><span class="badge ${statusClass}">${batch.status_display}</span></td>
-                            <td>
-                                <button class="btn btn-sm btn-info view-batch" data-id="${batch.id}">
-                                    <i class="fas fa-eye"></i>
-                                </button>
-                            </td>
-                        </tr>
-                    `;
-                    tbody.append(row);
-                });
-                
-                // Anexar evento para visualizar lote
-                $('.view-batch').click(function() {
-                    const batchId = $(this).data('id');
-                    viewBatch(batchId);
-                });
-            } else {
-                tbody.append('<tr><td colspan="5" class="text-center">Nenhum lote encontrado</td></tr>');
-            }
+            renderCounters(data.counters);
+            renderRecentBatches(data.recent_batches);
+            renderProductionChart(data.production_by_product);
+            renderBatchStatusChart(data.batch_status);
         },
         error: function(xhr) {
-            console.error('Erro ao carregar lotes recentes:', xhr);
+            console.error('Erro ao carregar dados do dashboard:', xhr);
             $('#recent-batches-table tbody').html('<tr><td colspan="5" class="text-center">Erro ao carregar dados</td></tr>');
         }
     });
 }
 
-function loadCharts() {
-    // Carregar dados para o gráfico de produção por produto
-    $.ajax({
-        url: '/api/admin/dashboard/production-by-product',
-        type: 'GET',
-        success: function(data) {
-            renderProductionChart(data);
-        },
-        error: function(xhr) {
-            console.error('Erro ao carregar dados de produção por produto:', xhr);
-        }
-    });
-    
-    // Carregar dados para o gráfico de status de lotes
-    $.ajax({
-        url: '/api/admin/dashboard/batch-status',
-        type: 'GET',
-        success: function(data) {
-            renderBatchStatusChart(data);
-        },
-        error: function(xhr) {
-            console.error('Erro ao carregar dados de status dos lotes:', xhr);
-        }
-    });
+function renderCounters(data) {
+    // Atualizar contadores
+    $('#total-lotes').text(data.total_lotes || 0);
+    $('#lotes-em-producao').text(data.lotes_em_producao || 0);
+    $('#apontamentos-hoje').text(data.apontamentos_hoje || 0);
+    $('#apontamentos-andamento').text(data.apontamentos_em_andamento || 0);
+    
+    // Atualizar KPIs
+    $('#tempo-medio').text(data.tempo_medio || 0);
+    $('#eficiencia').text(data.eficiencia || 0);
+    $('#atrasos').text(data.atrasos || 0);
+    $('#produtividade').text(data.produtividade || 0);
+}
+
+function renderRecentBatches(data) {
+    const tbody = $('#recent-batches-table tbody');
+    tbody.empty();
+    
+    if (data && data.length > 0) {
+        data.forEach(function(batch) {
+            const statusClass = getStatusClass(batch.status);
+            const row = `
+                <tr>
+                    <td>${batch.codigo}</td>
+                    <td>${batch.produto}</td>
+                    <td>${batch.data_criacao}</td>
+                    <td><span class="badge ${statusClass}">${batch.status_display}</span></td>
+                    <td>
+                        <button class="btn btn-sm btn-info view-batch" data-id="${batch.id}">
+                            <i class="fas fa-eye"></i>
+                        </button>
+                    </td>
+                </tr>
+            `;
+            tbody.append(row);
+        });
+        
+        // Anexar evento para visualizar lote
+        $('.view-batch').click(function() {
+            const batchId = $(this).data('id');
+            viewBatch(batchId);
+        });
+    } else {
+        tbody.append('<tr><td colspan="5" class="text-center">Nenhum lote encontrado</td></tr>');
+    }
 }
 
 function renderProductionChart(data) {
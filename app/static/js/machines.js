@@ -407,7 +407,9 @@ function showQRCode(machineId) {
             // Buscar imagem de QR Code gerada pelo servidor
             if (machine.qrcode) {
                 // Se a máquina já tem um QR code no servidor, exibir ele
-                const qrUrl = `/api/machines/qrcode/${machine.id}`;
+                // A versão no nome do arquivo permite ao navegador manter a imagem em cache
+                const versao = machine.qrcode.replace(/^.*_|\.[^.]+$/g, '');
+                const qrUrl = `/api/qrcodes/maquina/${machine.id}?v=${versao}`;
                 $('#qrcode-img').attr('src', qrUrl);
                 $('#qrcode-container').hide();
                 $('#server-qrcode-container').show();
@@ -3,8 +3,41 @@
  * incluindo máquinas associadas às fases
  */
 
+// Conexão SSE com as mudanças do lote exibido
+let eventosLote = null;
+let eventosLoteId = null;
+let recargaPassosTimeout = null;
+
+// Função para acompanhar em tempo real as mudanças de fase e de status do lote
+function acompanharLote(loteId) {
+    if (eventosLoteId === loteId) {
+        return;
+    }
+    if (eventosLote) {
+        eventosLote.close();
+        eventosLote = null;
+    }
+    eventosLoteId = loteId;
+    if (!loteId || !window.EventSource) {
+        return;
+    }
+
+    // O EventSource envia o cookie de acesso e reconecta sozinho se a conexão cair
+    eventosLote = new EventSource(`/api/events/stream?topicos=lote:${loteId}`);
+    ['apontamento_iniciado', 'apontamento_finalizado', 'apontamento_atualizado', 'lote_status', 'recarregar']
+        .forEach(tipo => eventosLote.addEventListener(tipo, agendarRecargaPassos));
+}
+
+// Agrupa eventos próximos em uma única recarga dos próximos passos
+function agendarRecargaPassos() {
+    clearTimeout(recargaPassosTimeout);
+    recargaPassosTimeout = setTimeout(() => loadNextSteps(eventosLoteId), 500);
+}
+
 // Função para carregar informações do próximo passo para um lote
 function loadNextSteps(loteId) {
+    acompanharLote(loteId);
+
     if (!loteId) {
         $('#next-steps-container').hide();
         $('#fase-atual-container').hide();
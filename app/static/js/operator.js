@@ -6,6 +6,8 @@ let scanner = null;
 let apontamentoAtual = null;
 let timerInterval = null;
 let startTime = null;
+let respostasPendentes = {};
+let respostasTimeout = null;
 
 $(document).ready(function() {
     // Carregar lotes disponíveis
@@ -421,23 +423,36 @@ function loadChecklist(apontamentoId, faseId) {
 }
 
 /**
- * Salva uma resposta do checklist
+ * Agenda o registro de uma resposta do checklist.
+ * As respostas alteradas em sequência vão juntas em um único evento da fila.
  */
 function salvarRespostaChecklist(apontamentoId, itemId, concluido, observacao) {
-    $.ajax({
-        url: `/api/apontamentos/${apontamentoId}/checklist`,
-        type: 'POST',
-        contentType: 'application/json',
-        data: JSON.stringify({
-            apontamento_id: apontamentoId,
-            checklist_item_id: itemId,
-            concluido: concluido,
-            observacao: observacao
-        }),
-        error: function() {
-            console.error('Erro ao salvar resposta do checklist');
-            alert('Erro ao salvar resposta. Tente novamente.');
-        }
+    respostasPendentes[itemId] = {
+        checklist_item_id: itemId,
+        concluido: concluido,
+        observacao: observacao
+    };
+    
+    clearTimeout(respostasTimeout);
+    respostasTimeout = setTimeout(() => enviarRespostasChecklist(apontamentoId), 800);
+}
+
+/**
+ * Registra as respostas pendentes do checklist na fila de eventos, de uma só vez.
+ * Offline, elas ficam na fila e são enviadas antes da finalização.
+ */
+function enviarRespostasChecklist(apontamentoId) {
+    clearTimeout(respostasTimeout);
+    
+    const respostas = Object.values(respostasPendentes);
+    if (respostas.length === 0) {
+        return;
+    }
+    respostasPendentes = {};
+    
+    registrarEvento('checklist', {
+        apontamento_id: apontamentoId,
+        respostas: respostas
     });
 }
 
@@ -532,39 +547,29 @@ function finalizarApontamento() {
     
     const observacoes = $('#observacoes').val();
     
-    $.ajax({
-        url: `/api/apontamentos/${apontamentoAtual.id}`,
-        type: 'PUT',
-        contentType: 'application/json',
-        data: JSON.stringify({
-            observacoes: observacoes,
-            status: 'finalizado'
-        }),
-        success: function() {
-            alert('Apontamento finalizado com sucesso!');
-            
-            // Parar timer
-            if (timerInterval) {
-                clearInterval(timerInterval);
-                timerInterval = null;
-            }
-            
-            // Resetar formulário
-            $('#lote-select').val('').trigger('change');
-            $('#produto-container').hide();
-            $('#fase-container').hide();
-            $('#apontamento-container').hide();
-            
-            // Limpar variáveis
-            apontamentoAtual = null;
-        },
-        error: function(xhr) {
-            const errorMsg = xhr.responseJSON && xhr.responseJSON.detail 
-                ? xhr.responseJSON.detail 
-                : 'Erro ao finalizar apontamento. Tente novamente.';
-            alert(errorMsg);
-        }
+    // Registrar as respostas ainda pendentes e a finalização; a fila os envia em ordem
+    enviarRespostasChecklist(apontamentoAtual.id);
+    registrarEvento('finish', {
+        apontamento_id: apontamentoAtual.id,
+        observacoes: observacoes
     });
+    
+    alert('Apontamento finalizado com sucesso!');
+    
+    // Parar timer
+    if (timerInterval) {
+        clearInterval(timerInterval);
+        timerInterval = null;
+    }
+    
+    // Resetar formulário
+    $('#lote-select').val('').trigger('change');
+    $('#produto-container').hide();
+    $('#fase-container').hide();
+    $('#apontamento-container').hide();
+    
+    // Limpar variáveis
+    apontamentoAtual = null;
 }
 
 /**
@@ -590,14 +595,13 @@ function updateTimer() {
  * @param {string} qrCode - Código QR escaneado no formato 'maquina:codigo'
  */
 function handleMachineQrCode(qrCode) {
-    // Extrai o código da máquina do QR code
-    const machineCode = qrCode.replace('maquina:', '');
-    
-    // Buscar detalhes da máquina pelo código
+    // Resolver o QR code no índice de códigos do servidor (sem consulta ao banco)
     $.ajax({
-        url: `/api/machines/by-code/${machineCode}`,
+        url: `/api/scan/resolve?codigo=${encodeURIComponent(qrCode)}`,
         type: 'GET',
-        success: function(machine) {
+        success: function(resultado) {
+            const machine = resultado.entidades.find(entidade => entidade.tipo === 'maquina');
+            
             // Selecionar a máquina na interface
             if (machine && machine.id) {
                 // Armazenar o ID da máquina no formulário
@@ -719,38 +723,157 @@ function loadHistoricoApontamentos() {
     });
 }
 
-// Funções para iniciar e finalizar apontamentos
-function startAppointment(phaseId) {
+// Fila local de eventos do operador (início, checklist e finalização).
+// Os eventos são gravados no navegador e enviados em lotes para /api/appointments/sync;
+// cada um leva uma chave de idempotência, então reenvios não duplicam apontamentos.
+const FILA_EVENTOS_CHAVE = 'fila_eventos_apontamento';
+const FILA_EVENTOS_LOTE = 50;
+let sincronizandoEventos = false;
+let currentAppointment = null;
+
+function gerarChaveEvento() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+}
+
+function carregarFilaEventos() {
+    try {
+        return JSON.parse(localStorage.getItem(FILA_EVENTOS_CHAVE)) || [];
+    } catch (e) {
+        return [];
+    }
+}
+
+function salvarFilaEventos(fila) {
+    localStorage.setItem(FILA_EVENTOS_CHAVE, JSON.stringify(fila));
+}
+
+function registrarEvento(tipo, dados) {
+    const evento = {
+        chave: gerarChaveEvento(),
+        tipo: tipo,
+        ocorrido_em: new Date().toISOString(),
+        dados: dados
+    };
+    
+    const fila = carregarFilaEventos();
+    fila.push(evento);
+    salvarFilaEventos(fila);
+    
+    // Enviar em seguida, sem bloquear a interface
+    setTimeout(sincronizarEventos, 0);
+    return evento;
+}
+
+function removerEventosDaFila(chaves) {
+    const processados = new Set(chaves);
+    salvarFilaEventos(carregarFilaEventos().filter(evento => !processados.has(evento.chave)));
+}
+
+function sincronizarEventos() {
+    if (sincronizandoEventos || !navigator.onLine) return;
+    
+    const lote = carregarFilaEventos().slice(0, FILA_EVENTOS_LOTE);
+    if (lote.length === 0) return;
+    
+    sincronizandoEventos = true;
     $.ajax({
-        url: '/api/apontamentos/start',
+        url: '/api/appointments/sync',
         type: 'POST',
         contentType: 'application/json',
-        data: JSON.stringify({
-            fase_lote_id: phaseId
-        }),
-        success: function(data) {
-            // Armazenar o apontamento atual
-            currentAppointment = data;
-            
-            // Atualizar interface para apontamento em andamento
-            updateInterfaceForActiveAppointment();
-            
-            // Iniciar cronômetro
-            startTimer();
+        data: JSON.stringify({ eventos: lote }),
+        success: function(response) {
+            removerEventosDaFila(response.resultados.map(resultado => resultado.chave));
+            response.resultados.forEach(processarResultadoEvento);
             
-            showAlert('success', 'Apontamento iniciado com sucesso!');
+            sincronizandoEventos = false;
+            if (carregarFilaEventos().length > 0) {
+                sincronizarEventos();
+            }
         },
         error: function(xhr) {
-            let message = 'Erro ao iniciar apontamento. Tente novamente.';
-            if (xhr.responseJSON && xhr.responseJSON.detail) {
-                message = xhr.responseJSON.detail;
-            }
+            sincronizandoEventos = false;
             
-            showAlert('danger', message);
+            // Lote rejeitado pela validação: descartar para não travar a fila
+            if (xhr.status === 400 || xhr.status === 422) {
+                removerEventosDaFila(lote.map(evento => evento.chave));
+                showAlert('danger', 'Alguns registros não puderam ser sincronizados e foram descartados.');
+            }
+            // Sem conexão ou conflito temporário: os eventos ficam na fila para a próxima tentativa
         }
     });
 }
 
+function processarResultadoEvento(resultado) {
+    const falhou = resultado.status === 'conflito' || resultado.status === 'erro';
+    
+    // Resultado do início do apontamento em andamento nesta tela
+    if (currentAppointment && currentAppointment.chave === resultado.chave) {
+        if (falhou) {
+            stopTimer();
+            currentAppointment = null;
+            updateInterfaceForNoAppointment();
+            showAlert('danger', resultado.detalhe || 'Não foi possível iniciar o apontamento.');
+        } else {
+            currentAppointment.id = resultado.apontamento_id;
+            carregarDetalhesApontamento();
+        }
+        return;
+    }
+    
+    if (falhou) {
+        showAlert('warning', resultado.detalhe || 'Um registro não pôde ser sincronizado.');
+    }
+}
+
+function carregarDetalhesApontamento() {
+    // Completar os dados do apontamento iniciado offline (checklist, tempo estimado)
+    $.ajax({
+        url: '/api/appointments/active',
+        type: 'GET',
+        success: function(data) {
+            if (currentAppointment && data && data.id === currentAppointment.id) {
+                currentAppointment = Object.assign(data, { chave: currentAppointment.chave });
+                showCurrentAppointmentInfo();
+            }
+        }
+    });
+}
+
+window.addEventListener('online', sincronizarEventos);
+setInterval(sincronizarEventos, 15000);
+$(document).ready(sincronizarEventos);
+
+// Funções para iniciar e finalizar apontamentos
+function startAppointment(phaseId) {
+    // Registrar localmente; a fila envia ao servidor assim que houver conexão
+    const evento = registrarEvento('start', {
+        fase_lote_id: parseInt(phaseId)
+    });
+    
+    // Armazenar o apontamento atual
+    currentAppointment = {
+        id: null,
+        chave: evento.chave,
+        fase_lote_id: parseInt(phaseId),
+        fase_descricao: $('#phase-select option:selected').text(),
+        data_inicio: evento.ocorrido_em,
+        tempo_estimado: '-',
+        requires_checklist: false,
+        checklist_complete: false
+    };
+    
+    // Atualizar interface para apontamento em andamento
+    updateInterfaceForActiveAppointment();
+    
+    // Iniciar cronômetro
+    startTimer();
+    
+    showAlert('success', 'Apontamento iniciado com sucesso!');
+}
+
 function finishAppointment() {
     if (!currentAppointment) {
         showAlert('warning', 'Nenhum apontamento em andamento.');
@@ -770,7 +893,8 @@ function finishAppointment() {
 
 function completeAppointment(checklistData = null) {
     const data = {
-        apontamento_id: currentAppointment.id
+        apontamento_id: currentAppointment.id,
+        chave_inicio: currentAppointment.chave
     };
     
     // Incluir dados do checklist, se fornecidos
@@ -778,38 +902,25 @@ function completeAppointment(checklistData = null) {
         data.checklist_respostas = checklistData;
     }
     
-    $.ajax({
-        url: '/api/apontamentos/finish',
-        type: 'POST',
-        contentType: 'application/json',
-        data: JSON.stringify(data),
-        success: function(response) {
-            // Parar cronômetro
-            stopTimer();
-            
-            // Limpar apontamento atual
-            currentAppointment = null;
-            
-            // Atualizar interface
-            updateInterfaceForNoAppointment();
-            
-            // Recarregar fases do lote atual
-            const batchId = $('#batch-select').val();
-            if (batchId) {
-                loadBatchPhases(batchId);
-            }
-            
-            showAlert('success', 'Apontamento finalizado com sucesso!');
-        },
-        error: function(xhr) {
-            let message = 'Erro ao finalizar apontamento. Tente novamente.';
-            if (xhr.responseJSON && xhr.responseJSON.detail) {
-                message = xhr.responseJSON.detail;
-            }
-            
-            showAlert('danger', message);
-        }
-    });
+    // Registrar localmente; a fila envia ao servidor assim que houver conexão
+    registrarEvento('finish', data);
+    
+    // Parar cronômetro
+    stopTimer();
+    
+    // Limpar apontamento atual
+    currentAppointment = null;
+    
+    // Atualizar interface
+    updateInterfaceForNoAppointment();
+    
+    // Recarregar fases do lote atual
+    const batchId = $('#batch-select').val();
+    if (batchId) {
+        loadBatchPhases(batchId);
+    }
+    
+    showAlert('success', 'Apontamento finalizado com sucesso!');
 }
 
 // Funções para mostrar e processar checklist
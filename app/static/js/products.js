@@ -110,7 +110,7 @@ function loadProductsList() {
             console.error('Erro ao carregar produtos:', xhr.status, error);
             console.error('Resposta:', xhr.responseText);
             showAlert('danger', 'Erro ao carregar a lista de produtos.');
-            $('#products-table-body').html(`<tr><td colspan="6" class="text-center">Erro ao carregar produtos: ${xhr.status} ${error}</td></tr>`);
+            $('#products-table-body').html(`<tr><td colspan="8" class="text-center">Erro ao carregar produtos: ${xhr.status} ${error}</td></tr>`);
         }
     });
 }
@@ -134,6 +134,8 @@ function renderProductsTable(products) {
                     <td>${product.descricao || '-'}</td>
                     <td>UND</td> <!-- Valor padrão já que o campo não existe -->
                     <td>${product.num_fases || 0}</td>
+                    <td>${product.tempo_estimado_fases || 0} min</td>
+                    <td>${product.lotes_ativos || 0}</td>
                     <td>
                         <div class="btn-group btn-group-sm" role="group">
                             <button type="button" class="btn btn-info view-product" data-id="${product.id}" title="Visualizar">
@@ -152,7 +154,7 @@ function renderProductsTable(products) {
             tbody.append(row);
         });
     } else {
-        tbody.html('<tr><td colspan="6" class="text-center">Nenhum produto encontrado</td></tr>');
+        tbody.html('<tr><td colspan="8" class="text-center">Nenhum produto encontrado</td></tr>');
     }
 }
 
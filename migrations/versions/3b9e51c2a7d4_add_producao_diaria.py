@@ -0,0 +1,50 @@
+"""Add producao_diaria rollup table
+
+Revision ID: 3b9e51c2a7d4
+Revises: 00c97947538f
+Create Date: 2026-10-18 09:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from app.services import rollup
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e51c2a7d4'
+down_revision = '00c97947538f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'producao_diaria',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('data', sa.Date(), nullable=True),
+        sa.Column('produto_id', sa.Integer(), nullable=True),
+        sa.Column('fase_id', sa.Integer(), nullable=True),
+        sa.Column('operador_id', sa.Integer(), nullable=True),
+        sa.Column('apontamentos_finalizados', sa.Integer(), nullable=True),
+        sa.Column('tempo_total', sa.Integer(), nullable=True),
+        sa.Column('atrasos', sa.Integer(), nullable=True),
+        sa.Column('aderencia_soma', sa.Float(), nullable=True),
+        sa.Column('aderencia_count', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['fase_id'], ['fases.id']),
+        sa.ForeignKeyConstraint(['operador_id'], ['usuarios.id']),
+        sa.ForeignKeyConstraint(['produto_id'], ['produtos.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('data', 'produto_id', 'fase_id', 'operador_id', name='uq_producao_diaria_chave')
+    )
+    op.create_index(op.f('ix_producao_diaria_id'), 'producao_diaria', ['id'], unique=False)
+    op.create_index(op.f('ix_producao_diaria_data'), 'producao_diaria', ['data'], unique=False)
+
+    # Consolidar o histórico já existente (a mesma consulta de utils/rebuild_rollup.py)
+    rollup.reconstruir(Session(bind=op.get_bind()))
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_producao_diaria_data'), table_name='producao_diaria')
+    op.drop_index(op.f('ix_producao_diaria_id'), table_name='producao_diaria')
+    op.drop_table('producao_diaria')
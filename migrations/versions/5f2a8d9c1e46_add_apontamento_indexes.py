@@ -0,0 +1,42 @@
+"""Add composite, partial and date indexes for appointment queries
+
+Revision ID: 5f2a8d9c1e46
+Revises: 8c41f0d6e2b7
+Create Date: 2026-10-18 14:05:42.617093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a8d9c1e46'
+down_revision = '8c41f0d6e2b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_apontamentos_lote_produto_fase_status', 'apontamentos', ['lote_id', 'produto_id', 'fase_id', 'status'], unique=False)
+    op.create_index(
+        'ix_apontamentos_operador_aberto', 'apontamentos', ['operador_id'], unique=False,
+        postgresql_where=sa.text('data_fim IS NULL'),
+        sqlite_where=sa.text('data_fim IS NULL')
+    )
+    op.create_index('ix_apontamentos_operador_data_inicio', 'apontamentos', ['operador_id', 'data_inicio'], unique=False)
+    op.create_index('ix_apontamentos_data_inicio', 'apontamentos', ['data_inicio'], unique=False)
+    op.create_index('ix_fase_lotes_lote_ordem', 'fase_lotes', ['lote_id', 'ordem'], unique=False)
+    op.create_index('ix_produto_lotes_lote_id', 'produto_lotes', ['lote_id'], unique=False)
+    op.create_index('ix_checklist_respostas_apontamento_item', 'checklist_respostas', ['apontamento_id', 'checklist_item_id'], unique=False)
+    op.create_index('ix_fases_maquinas_fase_ordem', 'fases_maquinas', ['fase_id', 'ordem'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fases_maquinas_fase_ordem', table_name='fases_maquinas')
+    op.drop_index('ix_checklist_respostas_apontamento_item', table_name='checklist_respostas')
+    op.drop_index('ix_produto_lotes_lote_id', table_name='produto_lotes')
+    op.drop_index('ix_fase_lotes_lote_ordem', table_name='fase_lotes')
+    op.drop_index('ix_apontamentos_data_inicio', table_name='apontamentos')
+    op.drop_index('ix_apontamentos_operador_data_inicio', table_name='apontamentos')
+    op.drop_index('ix_apontamentos_operador_aberto', table_name='apontamentos')
+    op.drop_index('ix_apontamentos_lote_produto_fase_status', table_name='apontamentos')
@@ -0,0 +1,31 @@
+"""Add usuario_token_versoes for stateless auth revocation
+
+Revision ID: 8c41f0d6e2b7
+Revises: 3b9e51c2a7d4
+Create Date: 2026-10-18 10:47:05.918342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41f0d6e2b7'
+down_revision = '3b9e51c2a7d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'usuario_token_versoes',
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('versao', sa.Integer(), nullable=True),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('usuario_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('usuario_token_versoes')
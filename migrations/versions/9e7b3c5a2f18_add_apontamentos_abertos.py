@@ -0,0 +1,59 @@
+"""Add apontamentos_abertos registry of in-progress appointments
+
+Revision ID: 9e7b3c5a2f18
+Revises: 5f2a8d9c1e46
+Create Date: 2026-10-18 15:31:09.442871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e7b3c5a2f18'
+down_revision = '5f2a8d9c1e46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'apontamentos_abertos',
+        sa.Column('apontamento_id', sa.Integer(), nullable=False),
+        sa.Column('operador_id', sa.Integer(), nullable=False),
+        sa.Column('lote_id', sa.Integer(), nullable=False),
+        sa.Column('produto_id', sa.Integer(), nullable=False),
+        sa.Column('fase_id', sa.Integer(), nullable=False),
+        sa.Column('data_inicio', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['apontamento_id'], ['apontamentos.id']),
+        sa.ForeignKeyConstraint(['fase_id'], ['fases.id']),
+        sa.ForeignKeyConstraint(['lote_id'], ['lotes.id']),
+        sa.ForeignKeyConstraint(['operador_id'], ['usuarios.id']),
+        sa.ForeignKeyConstraint(['produto_id'], ['produtos.id']),
+        sa.PrimaryKeyConstraint('apontamento_id'),
+        sa.UniqueConstraint('operador_id', name='uq_apontamentos_abertos_operador'),
+        sa.UniqueConstraint('lote_id', 'produto_id', 'fase_id', name='uq_apontamentos_abertos_fase')
+    )
+    
+    # Carregar os apontamentos já em andamento; havendo duplicidade, vale o mais recente
+    op.execute("""
+        INSERT INTO apontamentos_abertos (apontamento_id, operador_id, lote_id, produto_id, fase_id, data_inicio)
+        SELECT a.id, a.operador_id, a.lote_id, a.produto_id, a.fase_id, a.data_inicio
+        FROM apontamentos a
+        WHERE a.status = 'iniciado' AND a.data_fim IS NULL
+          AND a.operador_id IS NOT NULL AND a.lote_id IS NOT NULL
+          AND a.produto_id IS NOT NULL AND a.fase_id IS NOT NULL
+          AND a.id = (
+              SELECT MAX(b.id) FROM apontamentos b
+              WHERE b.status = 'iniciado' AND b.data_fim IS NULL AND b.operador_id = a.operador_id
+          )
+          AND a.id = (
+              SELECT MAX(c.id) FROM apontamentos c
+              WHERE c.status = 'iniciado' AND c.data_fim IS NULL
+                AND c.lote_id = a.lote_id AND c.produto_id = a.produto_id AND c.fase_id = a.fase_id
+          )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('apontamentos_abertos')
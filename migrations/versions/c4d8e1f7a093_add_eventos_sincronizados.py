@@ -0,0 +1,39 @@
+"""Add eventos_sincronizados for idempotent operator event sync
+
+Revision ID: c4d8e1f7a093
+Revises: 9e7b3c5a2f18
+Create Date: 2026-10-18 16:12:48.305127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e1f7a093'
+down_revision = '9e7b3c5a2f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'eventos_sincronizados',
+        sa.Column('chave', sa.String(length=64), nullable=False),
+        sa.Column('operador_id', sa.Integer(), nullable=True),
+        sa.Column('tipo', sa.String(), nullable=True),
+        sa.Column('apontamento_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('detalhe', sa.String(), nullable=True),
+        sa.Column('ocorrido_em', sa.DateTime(), nullable=True),
+        sa.Column('processado_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['apontamento_id'], ['apontamentos.id']),
+        sa.ForeignKeyConstraint(['operador_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('chave')
+    )
+    op.create_index(op.f('ix_eventos_sincronizados_operador_id'), 'eventos_sincronizados', ['operador_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_eventos_sincronizados_operador_id'), table_name='eventos_sincronizados')
+    op.drop_table('eventos_sincronizados')
@@ -0,0 +1,34 @@
+"""Make lotes.data_criacao and apontamentos.data_inicio NOT NULL (keyset pagination keys)
+
+Revision ID: d7a2f4c9b815
+Revises: c4d8e1f7a093
+Create Date: 2026-10-18 19:42:10.518336
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a2f4c9b815'
+down_revision = 'c4d8e1f7a093'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Registros antigos sem data: usar a melhor data conhecida antes de exigir o valor
+    op.execute("UPDATE apontamentos SET data_inicio = COALESCE(data_fim, CURRENT_TIMESTAMP) WHERE data_inicio IS NULL")
+    op.execute("UPDATE lotes SET data_criacao = CURRENT_TIMESTAMP WHERE data_criacao IS NULL")
+
+    with op.batch_alter_table('apontamentos') as batch_op:
+        batch_op.alter_column('data_inicio', existing_type=sa.DateTime(), nullable=False)
+    with op.batch_alter_table('lotes') as batch_op:
+        batch_op.alter_column('data_criacao', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('lotes') as batch_op:
+        batch_op.alter_column('data_criacao', existing_type=sa.DateTime(), nullable=True)
+    with op.batch_alter_table('apontamentos') as batch_op:
+        batch_op.alter_column('data_inicio', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Adicionar o diretório raiz ao path para importar módulos da aplicação
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import Apontamento, ChecklistResposta, FaseLote, ProdutoLote
+from app.models.maquina import FaseMaquina
+
+# Consultas mais frequentes das rotas de apontamento e dos dashboards
+CONSULTAS = {
+    "apontamento em andamento (lote, produto, fase)": (
+        "SELECT id FROM apontamentos WHERE lote_id = :lote_id AND produto_id = :produto_id "
+        "AND fase_id = :fase_id AND status = 'iniciado'",
+        {"lote_id": 1, "produto_id": 1, "fase_id": 1}
+    ),
+    "apontamentos em aberto do operador": (
+        "SELECT id FROM apontamentos WHERE operador_id = :operador_id AND data_fim IS NULL",
+        {"operador_id": 1}
+    ),
+    "histórico do operador": (
+        "SELECT id, data_inicio FROM apontamentos WHERE operador_id = :operador_id "
+        "ORDER BY data_inicio DESC, id DESC LIMIT 100",
+        {"operador_id": 1}
+    ),
+    "apontamentos por período (dashboard)": (
+        "SELECT status, COUNT(id) FROM apontamentos WHERE data_inicio >= :desde GROUP BY status",
+        {"desde": datetime.utcnow() - timedelta(days=7)}
+    ),
+    "fases do lote": (
+        "SELECT id, fase_id FROM fase_lotes WHERE lote_id = :lote_id ORDER BY ordem",
+        {"lote_id": 1}
+    ),
+    "produtos do lote": (
+        "SELECT id, produto_id FROM produto_lotes WHERE lote_id = :lote_id",
+        {"lote_id": 1}
+    ),
+    "resposta do checklist": (
+        "SELECT id FROM checklist_respostas WHERE apontamento_id = :apontamento_id "
+        "AND checklist_item_id = :checklist_item_id",
+        {"apontamento_id": 1, "checklist_item_id": 1}
+    ),
+    "máquinas da fase": (
+        "SELECT maquina_id FROM fases_maquinas WHERE fase_id = :fase_id ORDER BY ordem",
+        {"fase_id": 1}
+    ),
+}
+
+def indices_avaliados():
+    """Índices criados pela migração de desempenho, agrupados pelos modelos."""
+    indices = []
+    for modelo in (Apontamento, FaseLote, ProdutoLote, ChecklistResposta, FaseMaquina):
+        indices.extend(sorted(modelo.__table__.indexes, key=lambda index: index.name))
+    return [index for index in indices if not index.columns[0].primary_key]
+
+def explicar(conn, sql, params):
+    """Retorna o plano de execução da consulta no formato do banco em uso."""
+    if conn.dialect.name == "sqlite":
+        linhas = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        return [linha[-1] for linha in linhas]
+    linhas = conn.execute(text("EXPLAIN " + sql), params).fetchall()
+    return [linha[0] for linha in linhas]
+
+def cronometrar(conn, sql, params, repeticoes):
+    """Tempo médio de execução da consulta, em milissegundos."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        conn.execute(text(sql), params).fetchall()
+    return (time.perf_counter() - inicio) * 1000 / repeticoes
+
+def medir(conn, tabelas, repeticoes):
+    """Executa EXPLAIN e cronometra cada consulta cujas tabelas existem."""
+    resultado = {}
+    for nome, (sql, params) in CONSULTAS.items():
+        tabela = sql.split(" FROM ")[1].split()[0]
+        if tabela not in tabelas:
+            continue
+        resultado[nome] = (explicar(conn, sql, params), cronometrar(conn, sql, params, repeticoes))
+    return resultado
+
+@contextmanager
+def engine_de_teste():
+    """
+    Engine usada no benchmark. No SQLite o DDL não é desfeito pelo rollback
+    (o pysqlite confirma DROP/CREATE INDEX fora de um BEGIN explícito), então a
+    medição roda em uma cópia temporária do arquivo; nos demais bancos o DDL é
+    transacional e roda no próprio banco, dentro de uma transação desfeita.
+    """
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        yield engine
+        return
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        copia = os.path.join(diretorio, "benchmark.db")
+        # A API de backup lê o banco sem alterá-lo (inclusive o modo de journal)
+        origem = sqlite3.connect(url.database)
+        destino = sqlite3.connect(copia)
+        try:
+            origem.backup(destino)
+        finally:
+            destino.close()
+            origem.close()
+        engine_copia = create_engine(f"sqlite:///{copia}")
+        try:
+            yield engine_copia
+        finally:
+            engine_copia.dispose()
+
+def main():
+    """Compara os planos de execução das consultas de apontamento sem e com os índices."""
+    parser = argparse.ArgumentParser(description="Mostra os planos de execução antes e depois dos índices de apontamentos.")
+    parser.add_argument("--repeticoes", type=int, default=50, help="Execuções de cada consulta para o tempo médio.")
+    args = parser.parse_args()
+
+    # Cópia temporária (SQLite) ou transação desfeita ao final: o banco não é alterado
+    with engine_de_teste() as engine_benchmark:
+        tabelas = set(inspect(engine_benchmark).get_table_names())
+        indices = [index for index in indices_avaliados() if index.table.name in tabelas]
+
+        with engine_benchmark.connect() as conn:
+            transacao = conn.begin()
+            try:
+                for index in indices:
+                    index.drop(conn, checkfirst=True)
+                antes = medir(conn, tabelas, args.repeticoes)
+
+                for index in indices:
+                    index.create(conn)
+                depois = medir(conn, tabelas, args.repeticoes)
+            finally:
+                transacao.rollback()
+
+    for nome in antes:
+        plano_antes, tempo_antes = antes[nome]
+        plano_depois, tempo_depois = depois[nome]
+        print(f"=== {nome}")
+        print(f"  antes  ({tempo_antes:.3f} ms):")
+        for linha in plano_antes:
+            print(f"    {linha}")
+        print(f"  depois ({tempo_depois:.3f} ms):")
+        for linha in plano_depois:
+            print(f"    {linha}")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import os
 import sys
-import qrcode
+import json
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from sqlalchemy.orm import Session
 from pathlib import Path
 
@@ -9,107 +13,128 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.core.database import get_db
 from app.models.models import Lote, Produto
+from app.services.qrcodes import FORMATOS, conteudo_etiqueta, gravar_arquivo, renderizar
 
 # Diretório para salvar os QR codes
 QR_CODE_DIR = Path(__file__).parent.parent / "app" / "static" / "qrcodes"
 
+# Manifesto com o hash do conteúdo de cada QR code gerado, por formato
+MANIFEST_PATH = QR_CODE_DIR / "manifest.json"
+
+# Linhas lidas do banco por vez
+LOTE_LEITURA = 1000
+
 def create_directories():
     """Cria os diretórios necessários para os QR codes."""
     lotes_dir = QR_CODE_DIR / "lotes"
     produtos_dir = QR_CODE_DIR / "produtos"
-    
+
     # Criar diretórios se não existirem
     lotes_dir.mkdir(parents=True, exist_ok=True)
     produtos_dir.mkdir(parents=True, exist_ok=True)
-    
+
     return lotes_dir, produtos_dir
 
-def generate_qr_for_lotes(db: Session, lotes_dir: Path):
-    """Gera QR codes para todos os lotes ativos."""
-    lotes = db.query(Lote).filter(Lote.ativo == True).all()
-    print(f"Gerando QR codes para {len(lotes)} lotes...")
-    
-    for lote in lotes:
-        qr_data = {
-            "type": "lote",
-            "id": lote.id,
-            "codigo": lote.codigo
-        }
-        
-        # Criar QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(str(qr_data))
-        qr.make(fit=True)
-        
-        # Criar imagem
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Salvar imagem
-        filename = f"{lote.codigo}.png"
-        filepath = lotes_dir / filename
-        img.save(filepath)
-        print(f"QR code gerado para lote {lote.codigo} em {filepath}")
-
-def generate_qr_for_produtos(db: Session, produtos_dir: Path):
-    """Gera QR codes para todos os produtos ativos."""
-    produtos = db.query(Produto).filter(Produto.ativo == True).all()
-    print(f"Gerando QR codes para {len(produtos)} produtos...")
-    
-    for produto in produtos:
-        qr_data = {
-            "type": "produto",
-            "id": produto.id,
-            "codigo": produto.codigo
-        }
-        
-        # Criar QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(str(qr_data))
-        qr.make(fit=True)
-        
-        # Criar imagem
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Salvar imagem
-        filename = f"{produto.codigo}.png"
-        filepath = produtos_dir / filename
-        img.save(filepath)
-        print(f"QR code gerado para produto {produto.codigo} em {filepath}")
+def load_manifest():
+    """Carrega o manifesto da última execução (vazio na primeira)."""
+    if not MANIFEST_PATH.exists():
+        return {}
+    with open(MANIFEST_PATH, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+def save_manifest(manifest):
+    """Grava o manifesto de forma atômica."""
+    gravar_arquivo(str(MANIFEST_PATH), json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+def qr_content(tipo, registro):
+    """Conteúdo do QR code de um lote ou produto (mesmo formato das etiquetas já impressas)."""
+    return conteudo_etiqueta(tipo, registro.id, registro.codigo)
+
+def render_task(tarefa):
+    """Renderiza e grava um QR code; executada nos processos do pool."""
+    chave, digest, conteudo, formato, caminho = tarefa
+    gravar_arquivo(caminho, renderizar(conteudo, formato))
+    return chave, formato, digest
+
+def iter_registros(db: Session, modelo, ids=None, since=None):
+    """Percorre os registros ativos em blocos, sem carregar a tabela inteira na memória."""
+    query = db.query(modelo.id, modelo.codigo).filter(modelo.ativo == True)
+    if ids:
+        query = query.filter(modelo.id.in_(ids))
+    if since and hasattr(modelo, "data_criacao"):
+        query = query.filter(modelo.data_criacao >= since)
+    return query.order_by(modelo.id).yield_per(LOTE_LEITURA)
+
+def plan_tasks(db: Session, alvos, formatos, manifest, ids=None, since=None, force=False):
+    """
+    Compara o conteúdo atual de cada QR code com o manifesto e retorna apenas
+    as renderizações necessárias: conteúdo alterado, formato novo ou arquivo ausente.
+    """
+    tarefas = []
+    for tipo, modelo, diretorio in alvos:
+        for registro in iter_registros(db, modelo, ids, since):
+            conteudo = qr_content(tipo, registro)
+            digest = hashlib.sha256(conteudo.encode()).hexdigest()
+            chave = f"{tipo}:{registro.id}"
+            for formato in formatos:
+                caminho = diretorio / f"{registro.codigo}.{formato}"
+                anterior = manifest.get(chave, {}).get(formato)
+                if not force and anterior == digest and caminho.exists():
+                    continue
+                tarefas.append((chave, digest, conteudo, formato, str(caminho)))
+    return tarefas
 
 def main():
     """Função principal para gerar QR codes."""
+    parser = argparse.ArgumentParser(description="Gera os QR codes de lotes e produtos, apenas os que mudaram desde a última execução.")
+    parser.add_argument("--tipo", choices=["lotes", "produtos", "todos"], default="todos", help="Registros a processar.")
+    parser.add_argument("--formato", choices=list(FORMATOS), action="append", help="Formato da imagem; repita para gerar mais de um (padrão: png).")
+    parser.add_argument("--ids", type=lambda valor: [int(item) for item in valor.split(",")], help="IDs separados por vírgula.")
+    parser.add_argument("--since", type=lambda valor: datetime.strptime(valor, "%Y-%m-%d"), help="Apenas lotes criados a partir da data (AAAA-MM-DD).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos de renderização.")
+    parser.add_argument("--force", action="store_true", help="Regenera mesmo os QR codes inalterados.")
+    args = parser.parse_args()
+    formatos = args.formato or ["png"]
+
     print("Iniciando geração de QR codes...")
-    
+
     # Criar diretórios
     lotes_dir, produtos_dir = create_directories()
-    
+    alvos = []
+    if args.tipo in ("lotes", "todos"):
+        alvos.append(("lote", Lote, lotes_dir))
+    if args.tipo in ("produtos", "todos"):
+        alvos.append(("produto", Produto, produtos_dir))
+
+    manifest = load_manifest()
+
     # Obter sessão do banco de dados
     db = next(get_db())
-    
+
+    try:
+        tarefas = plan_tasks(db, alvos, formatos, manifest, args.ids, args.since, args.force)
+    finally:
+        db.close()
+
+    print(f"{len(tarefas)} QR codes para gerar.")
+    if not tarefas:
+        return
+
+    # Renderização distribuída entre processos; blocos grandes reduzem a troca de mensagens
+    chunksize = max(1, len(tarefas) // (max(1, args.workers) * 4))
+    gerados = 0
     try:
-        # Gerar QR codes para lotes
-        generate_qr_for_lotes(db, lotes_dir)
-        
-        # Gerar QR codes para produtos
-        generate_qr_for_produtos(db, produtos_dir)
-        
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for chave, formato, digest in pool.map(render_task, tarefas, chunksize=chunksize):
+                manifest.setdefault(chave, {})[formato] = digest
+                gerados += 1
         print("Geração de QR codes concluída com sucesso!")
-        
     except Exception as e:
         print(f"Erro ao gerar QR codes: {e}")
-    
     finally:
-        db.close()
+        # Os arquivos já gerados ficam registrados mesmo se a execução for interrompida
+        save_manifest(manifest)
+        print(f"{gerados} QR codes gerados.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,38 @@
+import os
+import sys
+import argparse
+from datetime import date
+
+# Adicionar o diretório raiz ao path para importar módulos da aplicação
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import get_db
+from app.services.rollup import reconstruir
+
+def main():
+    """Recalcula o consolidado diário de produção (producao_diaria)."""
+    parser = argparse.ArgumentParser(description="Recalcula a tabela producao_diaria a partir dos apontamentos.")
+    parser.add_argument(
+        "--desde",
+        type=date.fromisoformat,
+        default=None,
+        help="Recalcular apenas a partir desta data (AAAA-MM-DD). Padrão: todo o histórico."
+    )
+    args = parser.parse_args()
+
+    print("Recalculando consolidado diário de produção...")
+
+    # Obter sessão do banco de dados
+    db = next(get_db())
+
+    try:
+        linhas = reconstruir(db, args.desde)
+        print(f"Consolidado recalculado: {linhas} linhas geradas.")
+    except Exception as e:
+        db.rollback()
+        print(f"Erro ao recalcular consolidado: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()